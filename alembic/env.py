@@ -2,9 +2,11 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
+from app.config import settings
 from app.models.models import Base
 
 
@@ -17,16 +19,25 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# The application's DATABASE_URL, unless one was given to alembic directly
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", settings.DB_URL.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
-# other values from the config, defined by the needs of env.py,
-# can be acquired:
-# my_important_option = config.get_main_option("my_important_option")
-# ... etc.
+# Each migration runs in its own transaction, so a migration can step out of
+# it with op.get_context().autocommit_block() (needed by CREATE/DROP INDEX
+# CONCURRENTLY) without leaving earlier migrations uncommitted.
+#
+# On a live database pass a lock timeout, so a DDL statement queued behind a
+# long transaction fails fast instead of blocking every query behind it:
+#
+#     alembic -x lock_timeout=5s upgrade head
+lock_timeout = context.get_x_argument(as_dictionary=True).get("lock_timeout")
 
 
 def run_migrations_offline() -> None:
@@ -47,6 +58,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -67,8 +79,13 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        if lock_timeout:
+            connection.execute(text("SELECT set_config('lock_timeout', :value, false)"), {"value": lock_timeout})
+            connection.commit()
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,61 @@
+"""trigram search indexes
+
+GIN trigram indexes so that substring searches (ILIKE '%...%', similarity)
+on client name/email and product description can use an index instead of
+scanning the table.
+
+Like the listing indexes, they are built with CREATE INDEX CONCURRENTLY,
+outside a transaction, so clients and products stay writable during the
+build; an INVALID index left by a failed build is dropped and rebuilt.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 01:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_clients_name_trgm', 'clients', 'name'),
+    ('ix_clients_email_trgm', 'clients', 'email'),
+    ('ix_products_description_trgm', 'products', 'description'),
+]
+
+
+def _drop_if_invalid(name: str) -> None:
+    op.execute(sa.text(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass('{0}') AND NOT indisvalid) THEN "
+        "DROP INDEX {0}; "
+        "END IF; END $$".format(name)
+    ))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            _drop_if_invalid(name)
+            op.create_index(
+                name, table, [column],
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, column in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,63 @@
+"""listing indexes
+
+Indexes for the filters and the (created_at, id) sort key of the listing
+endpoints, plus order_product.product_id, which the composite primary key
+(order_id, product_id) does not cover.
+
+The indexes are built with CREATE INDEX CONCURRENTLY, outside a transaction,
+so the tables stay writable while they are built on a loaded database. A
+concurrent build that fails leaves an INVALID index behind; it is dropped and
+rebuilt when the migration is run again.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 02:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_orders_status_created_at_id', 'orders', ['status', 'created_at', 'id']),
+    ('ix_orders_client_id_created_at_id', 'orders', ['client_id', 'created_at', 'id']),
+    ('ix_products_created_at_id', 'products', ['created_at', 'id']),
+    ('ix_products_section_created_at_id', 'products', ['section', 'created_at', 'id']),
+    ('ix_products_price', 'products', ['price']),
+    ('ix_order_product_product_id', 'order_product', ['product_id']),
+    ('ix_clients_created_at_id', 'clients', ['created_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+]
+
+
+def _drop_if_invalid(name: str) -> None:
+    op.execute(sa.text(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass('{0}') AND NOT indisvalid) THEN "
+        "DROP INDEX {0}; "
+        "END IF; END $$".format(name)
+    ))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            _drop_if_invalid(name)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""order item quantity
+
+Adds order_product.quantity, so an order line can hold more than one unit
+of a product. Existing lines get quantity 1.
+
+The column default is a constant, so adding it does not rewrite the table.
+The check constraint is added NOT VALID, and the brief ACCESS EXCLUSIVE
+lock of the two ALTERs is released by committing them. The constraint is
+then validated in a transaction of its own, whose scan only takes a SHARE
+UPDATE EXCLUSIVE lock, so writes to order_product go on while it runs.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 04:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('order_product', sa.Column('quantity', sa.Integer(), server_default='1', nullable=False))
+    op.execute(
+        "ALTER TABLE order_product ADD CONSTRAINT check_quantity_positive CHECK (quantity > 0) NOT VALID"
+    )
+    # autocommit_block() commits the ALTERs above before running the validation
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE order_product VALIDATE CONSTRAINT check_quantity_positive")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('check_quantity_positive', 'order_product', type_='check')
+    op.drop_column('order_product', 'quantity')
@@ -0,0 +1,45 @@
+"""response cache
+
+Adds response_cache, the UNLOGGED table of rendered catalog responses
+shared by the workers when RESPONSE_CACHE_BACKEND=database.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'response_cache',
+        sa.Column('key', sa.Text(), nullable=False),
+        sa.Column('tags', postgresql.ARRAY(sa.Text()), nullable=False),
+        sa.Column('headers', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('body', sa.LargeBinary(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        prefixes=['UNLOGGED'],
+    )
+    op.create_index('ix_response_cache_tags', 'response_cache', ['tags'], unique=False, postgresql_using='gin')
+    op.create_index(op.f('ix_response_cache_expires_at'), 'response_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_response_cache_expires_at'), table_name='response_cache')
+    op.drop_index('ix_response_cache_tags', table_name='response_cache', postgresql_using='gin')
+    op.drop_table('response_cache')
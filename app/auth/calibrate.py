@@ -0,0 +1,91 @@
+"""
+Pick password hashing parameters for the current hardware.
+
+    python -m app.auth.calibrate --target-ms 250
+    python -m app.auth.calibrate --scheme argon2 --target-ms 300
+
+Measures verify latency for increasing cost parameters and prints the most
+expensive setting whose median verify time stays within the target, as
+environment variables ready for .env. Existing hashes are upgraded to the
+new parameters on each user's next successful login.
+"""
+import argparse
+import statistics
+import time
+
+from app.auth.utils import build_password_context
+
+PASSWORD = "calibration-password"
+
+
+def median_verify_ms(context, samples: int) -> float:
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> dict:
+    best = None
+    for rounds in range(8, 20):
+        elapsed = median_verify_ms(build_password_context(["bcrypt"], bcrypt_rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds:<2} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = {"PASSWORD_SCHEMES": "bcrypt", "BCRYPT_ROUNDS": rounds}
+    return best or {"PASSWORD_SCHEMES": "bcrypt", "BCRYPT_ROUNDS": 8}
+
+
+def calibrate_argon2(target_ms: float, samples: int, time_cost: int, parallelism: int) -> dict:
+    best = None
+    memory_cost = 8 * 1024
+    while memory_cost <= 4 * 1024 * 1024:
+        context = build_password_context(
+            ["argon2", "bcrypt"],
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+        elapsed = median_verify_ms(context, samples)
+        print(f"  argon2id m={memory_cost // 1024:>5} MiB t={time_cost} p={parallelism} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = {
+            "PASSWORD_SCHEMES": "argon2,bcrypt",
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+        }
+        memory_cost *= 2
+    return best or {
+        "PASSWORD_SCHEMES": "argon2,bcrypt",
+        "ARGON2_TIME_COST": time_cost,
+        "ARGON2_MEMORY_COST": 8 * 1024,
+        "ARGON2_PARALLELISM": parallelism,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target median verify latency")
+    parser.add_argument("--samples", type=int, default=5, help="Verifications per candidate")
+    parser.add_argument("--argon2-time-cost", type=int, default=3)
+    parser.add_argument("--argon2-parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for a {args.target_ms:.0f} ms verify target:")
+    if args.scheme == "bcrypt":
+        result = calibrate_bcrypt(args.target_ms, args.samples)
+    else:
+        result = calibrate_argon2(args.target_ms, args.samples, args.argon2_time_cost, args.argon2_parallelism)
+    print()
+    for key, value in result.items():
+        print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,53 +2,100 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import get_db
 from app.models.models import User
-from app.auth.utils import decode_token
+from app.auth.jwt import decode_token
+from app.auth.principal_cache import Principal, principal_cache
+from app.auth.token_versions import token_versions
+from app.config import settings
+from app.models.models import UserRole
+from app.response_cache import response_cache
 from app.schemas.schemas import Token
 import logging
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 logger = logging.getLogger(__name__)
 
-def get_db():
+def principal_from_claims(payload: dict, db: Session) -> Principal | None:
     """
-    Dependency to provide a database session.
-    Ensures the session is closed after use.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    Build a principal from self-contained access token claims.
+
+    The token_version claim is checked against the in-memory version map.
+    Returns None for tokens minted without these claims, so the caller can
+    fall back to a user lookup.
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """
-    Retrieve the current authenticated user based on the provided JWT token.
-    
     Raises:
-        HTTPException: if the token is invalid or the user does not exists.
+        HTTPException: if the token has been revoked or the user no longer exists.
     """
-    credentials_exception = HTTPException(
+    if "role" not in payload or "token_version" not in payload:
+        return None
+    user_id = int(payload["sub"])
+    current = token_versions.get(db, user_id)
+    if current is None or current[0] != payload["token_version"]:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Principal(id=user_id, role=UserRole(payload["role"]), is_active=current[1])
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_access_token(token: str) -> tuple[dict, int]:
+    """
+    Verify an access token and return its payload and user id.
+
+    Raises:
+        HTTPException: if the token is invalid, expired or not an access token.
+    """
     try:
         payload = decode_token(token)
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError as e:
         logger.warning(f"Invalid Token: {e}")
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+        raise credentials_exception()
+    return payload, int(user_id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    Retrieve the current authenticated user based on the provided JWT token.
+
+    With AUTH_MODE=claims the principal comes straight from the token claims.
+    Otherwise the user is resolved through the principal cache, so the users
+    table is only queried on a cache miss.
+
+    Raises:
+        HTTPException: if the token is invalid or the user does not exists.
+    """
+    payload, user_id = decode_access_token(token)
+
+    # Writes committed through this session keep the user's reads on the primary
+    db.info["user_id"] = user_id
+
+    if settings.AUTH_MODE == "claims":
+        principal = principal_from_claims(payload, db)
+        if principal is not None:
+            return principal
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
-    return user
+        raise credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.set(principal)
+    return principal
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     Dependency to require 'admin' privileges.
     
@@ -62,11 +109,39 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
         )
     return current_user
 
-def require_user(current_user: User = Depends(get_current_user)) -> User:
+def require_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     Dependency to require an active user (can be admin or regular user).
     
     Raises:
         HTTPException: if the user is inactive.
     """
-    return current_user
\ No newline at end of file
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user"
+        )
+    return current_user
+
+def get_read_db(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)) -> Session:
+    """
+    Dependency marking the request's session as read-only.
+
+    Reads go to a replica when one is configured and fit to serve them, except
+    for users who committed a write in the last DB_READ_YOUR_WRITES_SECONDS.
+    The authentication lookup, if any, has already run on the primary.
+    """
+    db.info["read_only"] = True
+    return db
+
+def get_cached_read_db(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)) -> Session:
+    """
+    Dependency for reads served through the response cache.
+
+    Cache misses are loaded from the primary: a replica that has not replayed
+    the write that invalidated an entry would put the old rows back in the
+    cache. With the cache disabled this is get_read_db.
+    """
+    if not response_cache.enabled:
+        db.info["read_only"] = True
+    return db
@@ -0,0 +1,66 @@
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.deps import credentials_exception, decode_access_token, oauth2_scheme, principal_from_claims
+from app.auth.principal_cache import Principal, principal_cache
+from app.config import settings
+from app.database import get_async_db
+from app.models.models import User
+
+# Async versions of app.auth.deps, used by the DB_ASYNC routers. They resolve
+# the user on the request's AsyncSession, the same one the handler gets, so
+# an async request never checks out a connection from the sync pool.
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    """
+    Retrieve the current authenticated user (see app.auth.deps.get_current_user).
+
+    Raises:
+        HTTPException: if the token is invalid or the user does not exists.
+    """
+    payload, user_id = decode_access_token(token)
+
+    if settings.AUTH_MODE == "claims":
+        # The version map loads through a sync Session; run_sync lends it the async connection
+        principal = await db.run_sync(lambda session: principal_from_claims(payload, session))
+        if principal is not None:
+            return principal
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise credentials_exception()
+    principal = Principal.from_user(user)
+    principal_cache.set(principal)
+    return principal
+
+async def require_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """
+    Dependency to require 'admin' privileges.
+
+    Raises:
+        HTTPException: if the user is not an admin.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+async def require_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """
+    Dependency to require an active user (can be admin or regular user).
+
+    Raises:
+        HTTPException: if the user is inactive.
+    """
+    if not current_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Inactive user"
+        )
+    return current_user
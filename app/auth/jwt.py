@@ -1,40 +1,171 @@
-from datetime import datetime, timedelta, timezone
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
 from typing import Optional, Dict, Any
-from jose import jwt, JWTError
-from dotenv import load_dotenv
-import os
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Secret configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "default-secret-key")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
-REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
-
-def _create_token(data: Dict[str, Any], expires_delta: timedelta) -> str:
-    """Generate a JWT token with expiration."""
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + expires_delta
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import ExpiredSignatureError, JWTError
+from jose.utils import base64url_decode, base64url_encode
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """A parsed key from the key ring together with its pre-encoded JWT header."""
+    kid: str
+    algorithm: str
+    key: Key
+    header_segment: bytes
+
+
+class KeyRing:
+    """
+    Keys used to sign and verify tokens, parsed once.
+
+    Tokens are signed with the active key and carry its `kid` in the header;
+    any key still in the ring verifies, which allows rotating secrets without
+    invalidating tokens already issued.
+    """
+
+    def __init__(self, keys: list[dict], active_kid: str):
+        self._keys: dict[str, SigningKey] = {}
+        for entry in keys:
+            header = {"alg": entry["alg"], "kid": entry["kid"], "typ": "JWT"}
+            self._keys[entry["kid"]] = SigningKey(
+                kid=entry["kid"],
+                algorithm=entry["alg"],
+                key=jwk.construct(entry["key"], entry["alg"]),
+                header_segment=base64url_encode(json.dumps(header, separators=(",", ":")).encode()),
+            )
+        if active_kid not in self._keys:
+            raise ValueError(f"Active JWT key id {active_kid!r} is not in the key ring")
+        self.active = self._keys[active_kid]
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        """
+        Build the ring from JWT_KEYS (a JSON list of {"kid", "alg", "key"}) or,
+        when that is unset, from the single JWT_SECRET/JWT_ALGORITHM pair.
+        """
+        if settings.JWT_KEYS:
+            keys = json.loads(settings.JWT_KEYS)
+            return cls(keys, settings.JWT_ACTIVE_KID or keys[0]["kid"])
+        return cls([{"kid": "default", "alg": settings.JWT_ALGORITHM, "key": settings.JWT_SECRET}], "default")
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        if kid is None:
+            return self.active
+        return self._keys.get(kid)
+
+
+class TokenCodec:
+    """
+    Encodes and verifies JWTs against a KeyRing.
+
+    Verified payloads are memoised by token string (bounded LRU), so a client
+    presenting the same access token repeatedly only pays for signature
+    verification once; expiry is still checked on every call.
+    """
+
+    def __init__(self, key_ring: KeyRing, memo_size: int = 4096):
+        self.key_ring = key_ring
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, claims: Dict[str, Any], expires_delta: timedelta) -> str:
+        """Sign claims with the active key, adding an `exp` claim."""
+        signing_key = self.key_ring.active
+        payload = dict(claims)
+        payload["exp"] = int(time.time() + expires_delta.total_seconds())
+        signing_input = signing_key.header_segment + b"." + base64url_encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        )
+        signature = base64url_encode(signing_key.key.sign(signing_input))
+        return (signing_input + b"." + signature).decode()
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token and return its payload.
+
+        Raises:
+            jose.JWTError: if the token is malformed, badly signed or expired.
+        """
+        with self._lock:
+            payload = self._memo.get(token)
+            if payload is not None:
+                self._memo.move_to_end(token)
+        if payload is None:
+            payload = self._verify(token)
+            with self._lock:
+                self._memo[token] = payload
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        exp = payload.get("exp")
+        if exp is None:
+            raise JWTError("Token has no expiration")
+        if exp <= time.time():
+            raise ExpiredSignatureError("Signature has expired.")
+        return payload
+
+    def _verify(self, token: str) -> Dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.encode().split(b".")
+            header = json.loads(base64url_decode(header_segment))
+            signing_key = self.key_ring.get(header.get("kid"))
+            if signing_key is None or header.get("alg") != signing_key.algorithm:
+                raise JWTError("Unknown signing key")
+            signature = base64url_decode(signature_segment)
+            if not signing_key.key.verify(header_segment + b"." + payload_segment, signature):
+                raise JWTError("Signature verification failed")
+            payload = json.loads(base64url_decode(payload_segment))
+        except JWTError:
+            raise
+        except Exception as e:
+            raise JWTError(f"Invalid token: {e}")
+        if not isinstance(payload, dict):
+            raise JWTError("Invalid token payload")
+        return payload
+
+
+token_codec = TokenCodec(KeyRing.from_settings(), memo_size=settings.JWT_VERIFY_MEMO_SIZE)
+
+# Value of the `typ` claim; both kinds share a format, so this is what keeps
+# a refresh token from being used as a bearer token and vice versa
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
 
 def create_access_token(data: Dict[str, Any], expires_minutes: Optional[int] = None) -> str:
     """Create an access token with a default or custom expiration."""
-    delta = timedelta(minutes=expires_minutes or ACCESS_TOKEN_EXPIRE_MINUTES)
-    return _create_token(data, delta)
+    return token_codec.encode({**data, "typ": ACCESS_TOKEN}, timedelta(minutes=expires_minutes or settings.JWT_EXPIRES))
 
 def create_refresh_token(data: Dict[str, Any], expires_days: Optional[int] = None) -> str:
     """Create a refresh token with a default or custom expiration."""
-    delta = timedelta(days=expires_days or REFRESH_TOKEN_EXPIRE_DAYS)
-    return _create_token(data, delta)
+    return token_codec.encode({**data, "typ": REFRESH_TOKEN}, timedelta(days=expires_days or settings.JWT_REFRESH_EXPIRES))
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> Dict[str, Any]:
+    """
+    Decode and verify a JWT token of the given type and return its payload.
+
+    Raises:
+        jose.JWTError: if the token is invalid, expired or of another type.
+    """
+    payload = token_codec.decode(token)
+    if payload.get("typ") != token_type:
+        raise JWTError(f"Expected a {token_type!r} token")
+    return payload
 
-def verify_token(token: str, secret_key: str = SECRET_KEY, algorithms: list[str] = [ALGORITHM]) -> Optional[Dict[str, Any]]:
+def verify_token(token: str, token_type: str = ACCESS_TOKEN) -> Optional[Dict[str, Any]]:
     """
-    Decode and verify a JWT token. Returns payload or None if invalid.
+    Decode and verify a JWT token of the given type. Returns payload or None if invalid.
     """
     try:
-        return jwt.decode(token, secret_key, algorithms=algorithms)
+        return decode_token(token, token_type)
     except JWTError:
         return None
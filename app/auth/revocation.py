@@ -0,0 +1,249 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import engine
+from app.models.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    Answers "definitely not present" exactly and "maybe present" with the
+    configured false-positive rate once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class _PendingRevocation:
+    __slots__ = ("jti", "user_id", "expires_at", "done", "accepted", "error")
+
+    def __init__(self, jti: str, user_id: int, expires_at: datetime):
+        self.jti = jti
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.done = threading.Event()
+        self.accepted: Optional[bool] = None
+        self.error: Optional[Exception] = None
+
+
+class RevocationStore:
+    """
+    Single-use bookkeeping for refresh token ids (jti).
+
+    The revoked_tokens table is the source of truth: its primary key makes a
+    jti consumable exactly once, across all workers. Consumptions are queued
+    and written by a background flusher as one multi-row
+    INSERT ... ON CONFLICT DO NOTHING RETURNING per batch window, so a burst
+    of refreshes costs one write per window rather than one per request.
+
+    A pair of Bloom filters (current and previous generation) remembers the
+    jtis this worker has seen revoked, which lets replayed tokens be rejected
+    without waiting for the database. The same thread periodically deletes
+    rows whose tokens have expired anyway.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        bloom_capacity: int,
+        bloom_error_rate: float,
+        compact_interval: float,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.compact_interval = compact_interval
+        self._bloom = BloomFilter(bloom_capacity, bloom_error_rate)
+        self._previous_bloom: Optional[BloomFilter] = None
+        self._queue: list[_PendingRevocation] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._last_compaction = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+        self.bloom_rejections = 0
+        self.flushes = 0
+        self.compacted = 0
+
+    def _remember(self, jti: str) -> None:
+        if self._bloom.count >= self.bloom_capacity:
+            self._previous_bloom = self._bloom
+            self._bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        self._bloom.add(jti)
+
+    def maybe_revoked(self, jti: str) -> bool:
+        """
+        False means this worker has definitely not seen jti revoked.
+        """
+        return jti in self._bloom or (self._previous_bloom is not None and jti in self._previous_bloom)
+
+    def consume(self, jti: str, user_id: int, expires_at: datetime, timeout: float = 5.0) -> bool:
+        """
+        Mark a refresh token id as used.
+
+        Returns True the first time a jti is consumed and False on any reuse.
+
+        Raises:
+            RuntimeError: if the revocation could not be persisted.
+        """
+        if self.maybe_revoked(jti):
+            # Seen before on this worker (or a rare false positive); either
+            # way the batch insert below would be the authority, so confirm
+            # against the table only in this uncommon case.
+            with engine.connect() as conn:
+                if conn.execute(select(RevokedToken.jti).where(RevokedToken.jti == jti)).first():
+                    self.rejected += 1
+                    self.bloom_rejections += 1
+                    return False
+
+        pending = _PendingRevocation(jti, user_id, expires_at)
+        with self._cond:
+            self._ensure_flusher()
+            self._queue.append(pending)
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        if not pending.done.wait(timeout):
+            raise RuntimeError("Timed out waiting for refresh token revocation")
+        if pending.error is not None:
+            raise RuntimeError("Could not persist refresh token revocation") from pending.error
+        return bool(pending.accepted)
+
+    def start(self) -> None:
+        """
+        Start the background flusher/compactor (it is also started lazily).
+        """
+        with self._cond:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="revocation-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._queue and not self._stopping:
+                    self._cond.wait(self.compact_interval)
+                if self._queue and len(self._queue) < self.batch_size and not self._stopping:
+                    # Give concurrent refreshes a moment to join this batch
+                    self._cond.wait(self.flush_interval)
+                batch, self._queue = self._queue, []
+                stopping = self._stopping
+            if batch:
+                self._flush(batch)
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self.compact()
+            if stopping:
+                return
+
+    def _flush(self, batch: list[_PendingRevocation]) -> None:
+        first_by_jti: dict[str, _PendingRevocation] = {}
+        for pending in batch:
+            first_by_jti.setdefault(pending.jti, pending)
+        rows = [
+            {"jti": p.jti, "user_id": p.user_id, "expires_at": p.expires_at}
+            for p in first_by_jti.values()
+        ]
+        try:
+            with engine.begin() as conn:
+                inserted = set(conn.execute(
+                    insert(RevokedToken).values(rows)
+                    .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+                    .returning(RevokedToken.jti)
+                ).scalars())
+        except Exception as e:
+            logger.exception("Failed to persist %d refresh token revocations", len(rows))
+            for pending in batch:
+                pending.error = e
+                pending.done.set()
+            return
+        self.flushes += 1
+        for pending in batch:
+            pending.accepted = pending.jti in inserted and first_by_jti[pending.jti] is pending
+            if pending.accepted:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            self._remember(pending.jti)
+            pending.done.set()
+
+    def compact(self) -> int:
+        """
+        Delete revocations for tokens that have expired and can no longer be replayed.
+        """
+        self._last_compaction = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                removed = conn.execute(
+                    delete(RevokedToken).where(RevokedToken.expires_at < datetime.now(timezone.utc))
+                ).rowcount
+        except Exception:
+            logger.exception("Failed to compact revoked tokens")
+            return 0
+        self.compacted += removed
+        return removed
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "bloom_rejections": self.bloom_rejections,
+            "bloom_items": self._bloom.count,
+            "flushes": self.flushes,
+            "compacted": self.compacted,
+        }
+
+
+revocation_store = RevocationStore(
+    batch_size=settings.REVOCATION_BATCH_SIZE,
+    flush_interval=settings.REVOCATION_FLUSH_INTERVAL,
+    bloom_capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    bloom_error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    compact_interval=settings.REVOCATION_COMPACT_INTERVAL,
+)
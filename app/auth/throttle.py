@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import engine
+from app.models.models import ThrottleBucket
+
+
+class LoginThrottled(Exception):
+    """Raised when a login attempt is shed by the throttle."""
+
+    def __init__(self, retry_after: float, scope: str):
+        super().__init__(f"Too many login attempts for {scope}")
+        self.retry_after = retry_after
+        self.scope = scope
+
+
+class InMemoryBucketBackend:
+    """
+    Token buckets held in this process. Suitable for a single worker and tests.
+    """
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        """
+        Try to take `cost` tokens from the bucket for key.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they would be available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (cost - tokens) / rate
+
+    def give(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> None:
+        """Put `cost` tokens back into the bucket for key, up to its capacity."""
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._buckets:
+                return
+            tokens, updated = self._buckets[key]
+            self._buckets[key] = (min(capacity, tokens + (now - updated) * rate + cost), now)
+
+
+class DatabaseBucketBackend:
+    """
+    Token buckets stored in the throttle_buckets table, shared by every worker.
+
+    Each attempt is a single atomic upsert that refills the bucket from the
+    elapsed time and takes a token only if one is available.
+    """
+    blocking = True
+
+    def __init__(self, prune_every: int = 1000, idle_ttl: timedelta = timedelta(days=1)):
+        self.prune_every = prune_every
+        self.idle_ttl = idle_ttl
+        self._calls = 0
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        table = ThrottleBucket.__table__
+        refilled = func.least(
+            capacity,
+            table.c.tokens + func.extract("epoch", func.now() - table.c.updated_at) * rate,
+        )
+        stmt = (
+            insert(table)
+            .values(key=key, tokens=capacity - cost, allowed=True, updated_at=func.now())
+            .on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={
+                    "allowed": refilled >= cost,
+                    "tokens": case((refilled >= cost, refilled - cost), else_=refilled),
+                    "updated_at": func.now(),
+                },
+            )
+            .returning(table.c.tokens, table.c.allowed)
+        )
+        with engine.begin() as conn:
+            tokens, allowed = conn.execute(stmt).one()
+        self._calls += 1
+        if self._calls % self.prune_every == 0:
+            self.prune()
+        return 0.0 if allowed else (cost - tokens) / rate
+
+    def give(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> None:
+        """Put `cost` tokens back into the bucket for key, up to its capacity."""
+        table = ThrottleBucket.__table__
+        refilled = func.least(
+            capacity,
+            table.c.tokens + func.extract("epoch", func.now() - table.c.updated_at) * rate,
+        )
+        with engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key)
+                .values(tokens=func.least(capacity, refilled + cost), updated_at=func.now())
+            )
+
+    def prune(self) -> None:
+        cutoff = datetime.now(timezone.utc) - self.idle_ttl
+        with engine.begin() as conn:
+            conn.execute(delete(ThrottleBucket).where(ThrottleBucket.updated_at < cutoff))
+
+
+class LoginThrottle:
+    """
+    Token-bucket throttle for login attempts, keyed by normalized email and by
+    client IP. It runs before any password hashing so a credential-stuffing
+    burst is shed without spending bcrypt time on it.
+
+    Every attempt is charged to its IP and to the email. The email's token is
+    given back when the login succeeds, so only failures use up its burst and
+    a user logging in often, from several devices or behind a shared NAT,
+    does not lock their own account. Because the token is taken before the
+    password check, parallel attempts on one email are held to the burst.
+    """
+
+    def __init__(self, backend, email_rate: float, email_burst: float, ip_rate: float, ip_burst: float):
+        self.backend = backend
+        self.email_rate = email_rate
+        self.email_burst = email_burst
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.allowed = 0
+        self.refunded = 0
+        self.shed = {"ip": 0, "email": 0}
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        return email.strip().lower()
+
+    def _email_key(self, email: str) -> str:
+        return f"login:email:{self.normalize_email(email)}"
+
+    def check(self, email: str, client_ip: str | None) -> None:
+        """
+        Charge one attempt to the IP bucket and to the email bucket.
+
+        Raises:
+            LoginThrottled: if either bucket is empty.
+        """
+        if client_ip:
+            retry_after = self.backend.take(f"login:ip:{client_ip}", self.ip_rate, self.ip_burst)
+            if retry_after:
+                self.shed["ip"] += 1
+                raise LoginThrottled(retry_after, "ip")
+        retry_after = self.backend.take(self._email_key(email), self.email_rate, self.email_burst)
+        if retry_after:
+            self.shed["email"] += 1
+            raise LoginThrottled(retry_after, "email")
+        self.allowed += 1
+
+    def record_success(self, email: str) -> None:
+        """Give back the email token taken by check() for a successful login."""
+        self.backend.give(self._email_key(email), self.email_rate, self.email_burst)
+        self.refunded += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "allowed": self.allowed,
+            "refunded": self.refunded,
+            "shed": dict(self.shed),
+        }
+
+
+def _build_backend():
+    if settings.LOGIN_THROTTLE_BACKEND == "database":
+        return DatabaseBucketBackend()
+    return InMemoryBucketBackend()
+
+
+login_throttle = LoginThrottle(
+    backend=_build_backend(),
+    email_rate=settings.LOGIN_THROTTLE_EMAIL_RATE,
+    email_burst=settings.LOGIN_THROTTLE_EMAIL_BURST,
+    ip_rate=settings.LOGIN_THROTTLE_IP_RATE,
+    ip_burst=settings.LOGIN_THROTTLE_IP_BURST,
+)
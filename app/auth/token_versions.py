@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.models import User
+
+
+class TokenVersionMap:
+    """
+    In-memory map of user id -> (token_version, is_active) used to validate
+    self-contained access tokens without touching the users table per request.
+
+    The whole map is reloaded with a single query once it is older than
+    `refresh_interval` seconds, so a revocation made on another worker takes
+    effect within that window. Changes made by this worker apply immediately.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._versions: dict[int, tuple[int, bool]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.lookups = 0
+
+    def _refresh(self, db: Session) -> None:
+        rows = db.query(User.id, User.token_version, User.is_active).all()
+        self._versions = {row.id: (row.token_version, row.is_active) for row in rows}
+        self._loaded_at = time.monotonic()
+        self.refreshes += 1
+
+    def _refresh_if_stale(self, db: Session) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        # Only one thread reloads; the others keep serving the previous
+        # snapshot unless there is none yet.
+        if not self._lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                self._refresh(db)
+        finally:
+            self._lock.release()
+
+    def get(self, db: Session, user_id: int) -> Optional[tuple[int, bool]]:
+        """
+        Return (token_version, is_active) for user_id, or None if the user does not exist.
+        """
+        self._refresh_if_stale(db)
+        entry = self._versions.get(user_id)
+        if entry is None:
+            # Users created after the last bulk load are fetched individually.
+            self.lookups += 1
+            row = db.query(User.token_version, User.is_active).filter(User.id == user_id).first()
+            if row is None:
+                return None
+            entry = (row.token_version, row.is_active)
+            self._versions[user_id] = entry
+        return entry
+
+    def set(self, user_id: int, token_version: int, is_active: bool) -> None:
+        self._versions[user_id] = (token_version, is_active)
+
+    def forget(self, user_id: int) -> None:
+        self._versions.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._versions),
+            "refresh_interval": self.refresh_interval,
+            "age": time.monotonic() - self._loaded_at if self._loaded_at is not None else None,
+            "refreshes": self.refreshes,
+            "single_lookups": self.lookups,
+        }
+
+
+token_versions = TokenVersionMap(refresh_interval=settings.TOKEN_VERSION_REFRESH_SECONDS)
@@ -1,17 +1,50 @@
 from passlib.context import CryptContext
-from datetime import datetime, timedelta, timezone
-from jose import jwt
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_password_context(
+    schemes: list[str] | None = None,
+    bcrypt_rounds: int | None = None,
+    argon2_time_cost: int | None = None,
+    argon2_memory_cost: int | None = None,
+    argon2_parallelism: int | None = None,
+) -> CryptContext:
+    """
+    Builds the password hashing policy, by default from Settings.
+
+    The first scheme hashes new passwords; the others are only accepted for
+    verification and reported by needs_update, as are hashes whose cost
+    parameters differ from the configured ones.
+
+    Returns:
+        CryptContext: the configured context.
+    """
+    schemes = schemes or [s.strip() for s in settings.PASSWORD_SCHEMES.split(",") if s.strip()]
+    bcrypt_rounds = bcrypt_rounds or settings.BCRYPT_ROUNDS
+    options = {}
+    if "bcrypt" in schemes:
+        options.update(
+            bcrypt__default_rounds=bcrypt_rounds,
+            bcrypt__min_rounds=bcrypt_rounds,
+            bcrypt__max_rounds=bcrypt_rounds,
+        )
+    if "argon2" in schemes:
+        options.update(
+            argon2__type="ID",
+            argon2__time_cost=argon2_time_cost or settings.ARGON2_TIME_COST,
+            argon2__memory_cost=argon2_memory_cost or settings.ARGON2_MEMORY_COST,
+            argon2__parallelism=argon2_parallelism or settings.ARGON2_PARALLELISM,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+pwd_context = build_password_context()
 
 def hash_password(password: str) -> str:
     """
-    Hashes a plain password using bcrypt.
-    
+    Hashes a plain password with the configured default scheme.
+
     Args:
         password (str): The plain password to be hashed.
-        
+
     Returns:
         str: the hashed password.
     """
@@ -20,59 +53,28 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     """
     Verifies a plain password against a hashed password.
-    
+
     Args:
         password (str): The plain password input.
         hashed (str): The previously hashed password.
-        
+
     Returns:
         bool: True if the password matches, False otherwise.
     """
     return pwd_context.verify(password, hashed)
 
-def create_access_token(data: dict, expires_minutes: int = settings.JWT_EXPIRES):
+def verify_password_and_policy(password: str, hashed: str) -> tuple[bool, bool]:
     """
-    Creates a JWT access token with an expiration time.
-    
-    Args:
-        data (dict): The data to encode in the token (e.g., User ID or email).
-        expires_minutes (int, optional): Token expiration in minutes. Defaults to settings.JWT_EXPIRES.
-        
-    Returns:
-        str: The encoded JWT access token.
-    """
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    Verifies a password and reports whether its hash is outdated.
 
-def create_refresh_token(data: dict, expires_days: int = settings.JWT_REFRESH_EXPIRES):
-    """
-    Creates a JWT refresh token with a longer expiration time.
-    
     Args:
-        data(dict): the data to encode in the token.
-        expires_days (int, Optional): Token expiration in days. Defaults to settings.JWT_REFRESH_EXPIRES.
-        
-    Returns:
-        str: The encoded JWT refresh token.
-    """
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(days=expires_days)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+        password (str): The plain password input.
+        hashed (str): The previously hashed password.
 
-def decode_token(token: str):
-    """
-    Decodes a JWT token and returns its payload.
-    
-    Args:
-        token (str): str the JWT token to decode.
-        
     Returns:
-        dict: The payload extracted from the token.
-        
-    Raises:
-        jose.JWTError: if the token is invalid or expired.
+        tuple[bool, bool]: (matches, needs_update). needs_update is only True
+        for a matching password whose hash no longer fits the policy.
     """
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    if not pwd_context.verify(password, hashed):
+        return False, False
+    return True, pwd_context.needs_update(hashed)
@@ -0,0 +1,47 @@
+from sqlalchemy import Integer, Select, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.models.models import Client, Order, Product, order_product
+
+# Consultas das exportações: só colunas (sem objetos ORM), na ordem das
+# listagens, com as mesmas condições de app.crud.filters.
+
+def client_export_query(conditions: list) -> Select:
+    return (
+        select(Client.id, Client.name, Client.email, Client.cpf, Client.created_at, Client.updated_at)
+        .where(*conditions)
+        .order_by(Client.created_at, Client.id)
+    )
+
+# Mesmas colunas aceitas por POST /products/import, então o CSV exportado
+# pode ser reimportado
+def product_export_query(conditions: list) -> Select:
+    return (
+        select(
+            Product.id, Product.description, Product.price, Product.barcode, Product.section,
+            Product.available_stock.label("stock"), Product.expiry_date, Product.images, Product.created_at, Product.updated_at,
+        )
+        .where(*conditions)
+        .order_by(Product.created_at, Product.id)
+    )
+
+# Os itens de cada pedido vêm em subconsultas correlacionadas (product_ids e
+# quantities alinhados), então a exportação inteira é uma consulta só
+def _items_array(item_column):
+    items = (
+        select(item_column)
+        .where(order_product.c.order_id == Order.id)
+        .order_by(order_product.c.product_id)
+        .scalar_subquery()
+    )
+    return func.array(items, type_=ARRAY(Integer))
+
+def order_export_query(conditions: list) -> Select:
+    return (
+        select(
+            Order.id, Order.client_id, Order.status, Order.created_at, Order.updated_at,
+            _items_array(order_product.c.product_id).label("product_ids"),
+            _items_array(order_product.c.quantity).label("quantities"),
+        )
+        .where(*conditions)
+        .order_by(Order.created_at, Order.id)
+    )
@@ -0,0 +1,57 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+from app.models.models import Client, Order, Product
+
+# Condições de filtro das listagens, compartilhadas pelos handlers síncronos,
+# assíncronos e pelas exportações: query.filter(*conds) / select.where(*conds).
+
+def client_filters(name: Optional[str] = None, email: Optional[str] = None) -> list:
+    conditions = []
+    if name:
+        conditions.append(Client.name.ilike(f"%{name}%"))
+    if email:
+        conditions.append(Client.email.ilike(f"%{email}%"))
+    return conditions
+
+def product_filters(
+    section: Optional[str] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    available: Optional[bool] = None,
+) -> list:
+    conditions = []
+    if section:
+        conditions.append(Product.section == section)
+    if min_price is not None:
+        conditions.append(Product.price >= min_price)
+    if max_price is not None:
+        conditions.append(Product.price <= max_price)
+    if available is not None:
+        conditions.append(Product.available_stock > 0 if available else Product.available_stock <= 0)
+    return conditions
+
+# O filtro por seção usa EXISTS, então cada pedido aparece uma vez só
+def order_filters(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    section: Optional[str] = None,
+    order_id: Optional[int] = None,
+    status: Optional[str] = None,
+    client_id: Optional[int] = None,
+) -> list:
+    conditions = []
+    if order_id:
+        conditions.append(Order.id == order_id)
+    if status:
+        conditions.append(Order.status == status)
+    if client_id:
+        conditions.append(Order.client_id == client_id)
+    if start_date:
+        conditions.append(Order.created_at >= datetime.combine(start_date, datetime.min.time()))
+    if end_date:
+        conditions.append(Order.created_at <= datetime.combine(end_date, datetime.max.time()))
+    if section:
+        conditions.append(Order.products.any(Product.section == section))
+    return conditions
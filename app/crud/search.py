@@ -0,0 +1,35 @@
+from sqlalchemy import Select, func, or_, select
+from app.models.models import Client, Product
+
+# Busca por substring em clientes e produtos. O ILIKE '%termo%' é atendido
+# pelos índices GIN de trigramas (pg_trgm) a partir de 3 caracteres; o
+# ranking usa a similaridade de trigramas, com o id como desempate.
+MIN_QUERY_LENGTH = 3
+
+def _contains(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+# Clientes cujo nome ou email contém o termo, mais parecidos primeiro
+def search_clients_query(term: str, limit: int = 10, skip: int = 0) -> Select:
+    pattern = _contains(term)
+    rank = func.greatest(func.similarity(Client.name, term), func.similarity(Client.email, term))
+    return (
+        select(Client)
+        .where(or_(Client.name.ilike(pattern, escape="\\"), Client.email.ilike(pattern, escape="\\")))
+        .order_by(rank.desc(), Client.id)
+        .offset(skip)
+        .limit(limit)
+    )
+
+# Produtos cuja descrição contém o termo; word_similarity favorece descrições
+# em que o termo aparece como palavra inteira
+def search_products_query(term: str, limit: int = 10, skip: int = 0) -> Select:
+    rank = func.word_similarity(term, Product.description)
+    return (
+        select(Product)
+        .where(Product.description.ilike(_contains(term), escape="\\"))
+        .order_by(rank.desc(), Product.id)
+        .offset(skip)
+        .limit(limit)
+    )
@@ -0,0 +1,191 @@
+from typing import Optional
+
+from sqlalchemy import Integer, Update, column, delete, func, insert, select, update, values
+from sqlalchemy.orm import Session
+from app.models.models import Product, ProductStockShard
+
+# Reserva de estoque de um pedido num único UPDATE condicional: cada produto
+# só é debitado se tiver a quantidade pedida, e o RETURNING devolve os que
+# foram. Se faltar algum, quem chama desfaz a transação. Os locks das linhas
+# duram do UPDATE até o commit, sem idas e vindas no meio.
+#
+# Produtos "quentes" (stock_shards > 0) ficam de fora desse UPDATE: o estoque
+# deles está dividido em ProductStockShard e é reservado por reserve_hot_stock.
+
+def reserve_stock_statement(quantities: dict[int, int]) -> Update:
+    products = Product.__table__
+    requested = values(
+        column("product_id", Integer), column("quantity", Integer), name="requested"
+    ).data(sorted(quantities.items()))
+    # O UPDATE trava as linhas na ordem em que o plano do join as encontra,
+    # que não é a da lista; a CTE trava antes, em ordem de id, para pedidos
+    # concorrentes não se travarem em ordens opostas. MATERIALIZED garante que
+    # ela roda inteira antes do UPDATE.
+    locked = (
+        select(products.c.id)
+        .where(products.c.id.in_(sorted(quantities)), products.c.stock_shards == 0)
+        .order_by(products.c.id)
+        .with_for_update(key_share=True)
+        .cte("locked")
+        .prefix_with("MATERIALIZED")
+    )
+    return (
+        update(products)
+        .where(
+            products.c.id == locked.c.id,
+            products.c.id == requested.c.product_id,
+            products.c.stock >= requested.c.quantity,
+            products.c.stock_shards == 0,
+        )
+        .values(stock=products.c.stock - requested.c.quantity)
+        .returning(products.c.id)
+    )
+
+# Divide `total` em `shards` partes quase iguais (as primeiras levam o resto)
+def split_stock(total: int, shards: int) -> list[int]:
+    return [total // shards + (1 if shard < total % shards else 0) for shard in range(shards)]
+
+# Ordem dos locks, em todo lugar: linha do produto (FOR NO KEY UPDATE, que não
+# bloqueia o KEY SHARE das FKs dos itens de pedido), depois os shards por número
+def _lock_product(db: Session, product_id: int, skip_locked: bool = False) -> bool:
+    locked = db.execute(
+        select(Product.id).where(Product.id == product_id).with_for_update(key_share=True, skip_locked=skip_locked)
+    ).first()
+    return locked is not None
+
+def _lock_shards(db: Session, product_id: int) -> dict[int, int]:
+    shards = ProductStockShard.__table__
+    rows = db.execute(
+        select(shards.c.shard, shards.c.stock)
+        .where(shards.c.product_id == product_id)
+        .order_by(shards.c.shard)
+        .with_for_update()
+    ).all()
+    return dict(rows)
+
+def _write_shards(db: Session, product_id: int, stocks: dict[int, int]) -> None:
+    shards = ProductStockShard.__table__
+    new = values(column("shard", Integer), column("stock", Integer), name="new").data(sorted(stocks.items()))
+    db.execute(
+        update(shards)
+        .where(shards.c.product_id == product_id, shards.c.shard == new.c.shard)
+        .values(stock=new.c.stock)
+    )
+
+def _spread(db: Session, product_id: int, stocks: dict[int, int], total: int) -> None:
+    _write_shards(db, product_id, dict(zip(sorted(stocks), split_stock(total, len(stocks)))))
+
+# Caminho rápido: debita um shard com saldo suficiente que nenhum outro pedido
+# esteja segurando (SKIP LOCKED), escolhido ao acaso para espalhar a carga
+def _take_from_one_shard(db: Session, product_id: int, quantity: int) -> bool:
+    shards = ProductStockShard.__table__
+    pick = (
+        select(shards.c.shard)
+        .where(shards.c.product_id == product_id, shards.c.stock >= quantity)
+        .order_by(func.random())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    taken = db.execute(
+        update(shards)
+        .where(shards.c.product_id == product_id, shards.c.shard == pick, shards.c.stock >= quantity)
+        .values(stock=shards.c.stock - quantity)
+        .returning(shards.c.shard)
+    ).first()
+    return taken is not None
+
+# Caminho lento (estoque baixo ou fragmentado, ou shards ocupados): trava
+# todos os shards e tira dos maiores até completar a quantidade
+def _take_from_all_shards(db: Session, product_id: int, quantity: int) -> bool:
+    stocks = _lock_shards(db, product_id)
+    if sum(stocks.values()) < quantity:
+        return False
+    remaining = quantity
+    for shard in sorted(stocks, key=stocks.get, reverse=True):
+        taken = min(stocks[shard], remaining)
+        stocks[shard] -= taken
+        remaining -= taken
+        if not remaining:
+            break
+    _write_shards(db, product_id, stocks)
+    return True
+
+def reserve_hot_stock(db: Session, quantities: dict[int, int]) -> set[int]:
+    """
+    Reserve the lines of hot products among `quantities` (product id to
+    units) from their stock shards, in product id order. Returns the ids
+    reserved; a product without shards is never reserved here.
+    """
+    reserved = set()
+    for product_id, quantity in sorted(quantities.items()):
+        if _take_from_one_shard(db, product_id, quantity) or _take_from_all_shards(db, product_id, quantity):
+            reserved.add(product_id)
+    return reserved
+
+def lock_stock(db: Session, product_ids) -> dict[int, int]:
+    """
+    Lock the products, then the shards of the hot ones, in id order, and
+    return their available stock. Ids that do not exist are left out.
+    """
+    rows = db.execute(
+        select(Product.id, Product.stock, Product.stock_shards)
+        .where(Product.id.in_(sorted(product_ids)))
+        .order_by(Product.id)
+        .with_for_update(key_share=True)
+    ).all()
+    return {
+        product_id: sum(_lock_shards(db, product_id).values()) if shards else stock
+        for product_id, stock, shards in rows
+    }
+
+def take_locked_stock(db: Session, quantities: dict[int, int]) -> None:
+    """Decrement stock locked by lock_stock(), which must cover `quantities`."""
+    plain = set(db.execute(reserve_stock_statement(quantities)).scalars())
+    for product_id in sorted(set(quantities) - plain):
+        _take_from_all_shards(db, product_id, quantities[product_id])
+
+def set_hot_stock_total(db: Session, product_id: int, total: int) -> None:
+    """Replace the stock of a hot product by `total`, spread evenly over its shards."""
+    _lock_product(db, product_id)
+    stocks = _lock_shards(db, product_id)
+    if stocks:
+        _spread(db, product_id, stocks, total)
+    db.execute(update(Product.__table__).where(Product.id == product_id).values(stock=total))
+
+def consolidate_hot_stock(db: Session, product_id: int) -> Optional[tuple[int, bool]]:
+    """
+    Fold the shards of a hot product back into Product.stock, and even them
+    out when one has fallen below half of its share. Returns (total,
+    rebalanced), or None when the product is locked by someone else (an
+    admin change, or another worker consolidating it). The caller commits.
+    """
+    if not _lock_product(db, product_id, skip_locked=True):
+        return None
+    stocks = _lock_shards(db, product_id)
+    if not stocks:
+        return None
+    total = sum(stocks.values())
+    rebalanced = min(stocks.values()) < total // len(stocks) // 2
+    if rebalanced:
+        _spread(db, product_id, stocks, total)
+    products = Product.__table__
+    db.execute(update(products).where(products.c.id == product_id, products.c.stock != total).values(stock=total))
+    return total, rebalanced
+
+def set_stock_shards(db: Session, product: Product, shards: int) -> None:
+    """
+    Switch a product between plain (0) and sharded (1..MAX_STOCK_SHARDS)
+    stock, or change its number of shards, keeping its current stock.
+    The caller commits.
+    """
+    db.refresh(product, with_for_update={"key_share": True})
+    total = sum(_lock_shards(db, product.id).values()) if product.stock_shards else product.stock
+    db.execute(delete(ProductStockShard).where(ProductStockShard.product_id == product.id))
+    if shards:
+        db.execute(
+            insert(ProductStockShard),
+            [{"product_id": product.id, "shard": shard, "stock": stock} for shard, stock in enumerate(split_stock(total, shards))],
+        )
+    product.stock = total
+    product.stock_shards = shards
@@ -2,25 +2,27 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserUpdate
-from passlib.context import CryptContext
+from app.auth.principal_cache import principal_cache
+from app.auth.token_versions import token_versions
+from app.auth.utils import hash_password, verify_password as _verify_password
+from app.pagination import seek
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Utilitário para hashear senha
+# Utilitário para hashear senha (política única em app.auth.utils)
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 # Verificar se senha está correta
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _verify_password(plain_password, hashed_password)
 
 # Criar usuário novo
-def create_user(db: Session, user: UserCreate) -> User:
+def create_user(db: Session, user: UserCreate, hashed_password: str | None = None) -> User:
     if get_user_by_email(db, user.email):
         raise ValueError("Email já cadastrado.")
     
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         name=user.name,
         email=user.email,
@@ -46,9 +48,26 @@ def get_user_by_email(db: Session, email: str) -> User | None:
 def get_user_by_id(db: Session, user_id: int) -> User | None:
     return db.query(User).filter(User.id == user_id).first()
 
-# Listar todos os usuários
-def list_users(db: Session) -> list[User]:
-    return db.query(User).all()
+# Listar usuários, uma página por vez; seek() busca um registro a mais para
+# indicar se há próxima página (ver app/pagination.next_page)
+USER_SORT_KEY = (User.created_at, User.id)
+
+def list_users(db: Session, limit: int = 100, skip: int = 0, cursor: str | None = None) -> list[User]:
+    return seek(db.query(User), USER_SORT_KEY, limit, skip, cursor, scope="users").all()
+
+# Regravar hash de senha (mesma senha, política nova); não revoga tokens.
+# Só grava se o hash ainda for o verificado no login: uma troca de senha
+# feita nesse meio-tempo não é sobrescrita. Retorna se gravou.
+def update_password_hash(db: Session, user_id: int, old_hash: str, hashed_password: str) -> bool:
+    try:
+        updated = db.query(User).filter(User.id == user_id, User.hashed_password == old_hash).update(
+            {User.hashed_password: hashed_password}, synchronize_session=False
+        )
+        db.commit()
+        return updated == 1
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise e
 
 # Atualizar usuário
 def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User | None:
@@ -57,12 +76,20 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate) -> User | No
         return None
     
     update_data = user_update.dict(exclude_unset=True)
+    password = update_data.pop("password", None)
+    if password is not None:
+        db_user.hashed_password = get_password_hash(password)
+    # Role and password changes revoke access tokens issued before them
+    if password is not None or ("role" in update_data and update_data["role"] != db_user.role):
+        db_user.token_version = (db_user.token_version or 0) + 1
     for key, value in update_data.items():
         setattr(db_user, key, value)
         
     try: 
         db.commit()
         db.refresh(db_user)
+        principal_cache.invalidate(user_id)
+        token_versions.set(db_user.id, db_user.token_version, db_user.is_active)
         return db_user
     except SQLAlchemyError as e:
         db.rollback()
@@ -77,6 +104,8 @@ def delete_user(db: Session, user_id: int) -> bool:
     try:
         db.delete(db_user)
         db.commit()
+        principal_cache.invalidate(user_id)
+        token_versions.forget(user_id)
         return True
     except SQLAlchemyError:
         db.rollback()
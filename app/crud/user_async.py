@@ -0,0 +1,106 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import User
+from app.schemas.schemas import UserCreate, UserUpdate
+from app.auth.principal_cache import principal_cache
+from app.auth.token_versions import token_versions
+from app.crud.user import USER_SORT_KEY, get_password_hash
+from app.pagination import seek
+
+# Versões assíncronas de app.crud.user, usadas quando DB_ASYNC está ativo.
+# O hash de senha roda fora do event loop.
+
+# Criar usuário novo
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: str | None = None) -> User:
+    if await get_user_by_email(db, user.email):
+        raise ValueError("Email já cadastrado.")
+
+    if hashed_password is None:
+        hashed_password = await run_in_threadpool(get_password_hash, user.password)
+    db_user = User(
+        name=user.name,
+        email=user.email,
+        hashed_password=hashed_password,
+        role=user.role,
+        is_active=True,
+        is_admin=user.role.lower() == "admin"
+    )
+    try:
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise e
+
+# Buscar usuário por email
+async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
+
+# Buscar usuário por ID
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User | None:
+    return await db.get(User, user_id)
+
+# Listar usuários, uma página por vez (ver app.crud.user.list_users)
+async def list_users(db: AsyncSession, limit: int = 100, skip: int = 0, cursor: str | None = None) -> list[User]:
+    query = seek(select(User), USER_SORT_KEY, limit, skip, cursor, scope="users")
+    return list((await db.execute(query)).scalars().all())
+
+# Regravar hash de senha só se ainda for o verificado (ver app.crud.user.update_password_hash)
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, hashed_password: str) -> bool:
+    try:
+        result = await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=hashed_password)
+        )
+        await db.commit()
+        return result.rowcount == 1
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise e
+
+# Atualizar usuário
+async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> User | None:
+    db_user = await get_user_by_id(db, user_id)
+    if not db_user:
+        return None
+
+    update_data = user_update.dict(exclude_unset=True)
+    password = update_data.pop("password", None)
+    if password is not None:
+        db_user.hashed_password = await run_in_threadpool(get_password_hash, password)
+    # Role and password changes revoke access tokens issued before them
+    if password is not None or ("role" in update_data and update_data["role"] != db_user.role):
+        db_user.token_version = (db_user.token_version or 0) + 1
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+
+    try:
+        await db.commit()
+        await db.refresh(db_user)
+        principal_cache.invalidate(user_id)
+        token_versions.set(db_user.id, db_user.token_version, db_user.is_active)
+        return db_user
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise e
+
+# Deletar usuário
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    db_user = await get_user_by_id(db, user_id)
+    if not db_user:
+        return False
+
+    try:
+        await db.delete(db_user)
+        await db.commit()
+        principal_cache.invalidate(user_id)
+        token_versions.forget(user_id)
+        return True
+    except SQLAlchemyError:
+        await db.rollback()
+        return False
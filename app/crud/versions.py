@@ -0,0 +1,42 @@
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from app.models.models import Client, Order, Product, order_product
+
+# Versões das respostas, para os ETags: tudo o que muda quando a resposta
+# muda. Produtos e clientes saem da própria linha; um pedido também mostra o
+# cliente e os produtos, então a versão dele vem de subconsultas
+# correlacionadas, lidas sem carregar o grafo de objetos.
+
+def product_version(product) -> tuple:
+    # available_stock cobre os shards dos produtos quentes, que mudam sem
+    # tocar em updated_at
+    return (product.id, product.created_at, product.updated_at, product.available_stock)
+
+def client_version(client) -> tuple:
+    return (client.id, client.created_at, client.updated_at)
+
+def order_version_columns() -> list:
+    client = (
+        select(func.coalesce(Client.updated_at, Client.created_at))
+        .where(Client.id == Order.client_id)
+        .scalar_subquery()
+        .label("client_version")
+    )
+    line = func.concat_ws(
+        ":",
+        order_product.c.product_id,
+        order_product.c.quantity,
+        func.coalesce(Product.updated_at, Product.created_at),
+        Product.available_stock,
+    )
+    lines = (
+        select(func.array_agg(aggregate_order_by(line, order_product.c.product_id)))
+        .select_from(order_product.join(Product, Product.id == order_product.c.product_id))
+        .where(order_product.c.order_id == Order.id)
+        .scalar_subquery()
+        .label("lines_version")
+    )
+    return [Order.updated_at, Order.status, client, lines]
+
+def order_version_query(order_id: int) -> Select:
+    return select(Order.id, Order.created_at, *order_version_columns()).where(Order.id == order_id)
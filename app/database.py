@@ -1,17 +1,68 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 from app.config import settings
+from app.db_pool import engine_options, pool_telemetry
+from app.db_routing import ReplicaRouter, RoutingSession
 
-engine = create_engine(settings.DB_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.DB_URL, **engine_options(settings.DB_URL))
+pool_telemetry.register("primary", engine)
+
+replica_engines = []
+for index, url in enumerate(u.strip() for u in settings.DB_REPLICA_URLS.split(",") if u.strip()):
+    replica_engines.append(create_engine(url, **engine_options(url)))
+    pool_telemetry.register(f"replica_{index}", replica_engines[-1])
+
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.DB_REPLICA_MAX_LAG,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replica_router=replica_router
+)
+
+def async_database_url(url: str) -> str:
+    """
+    Same database as `url`, addressed through the asyncpg driver.
+    """
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+def create_async_database(url: str) -> tuple[AsyncEngine, async_sessionmaker]:
+    """
+    Async engine for `url` and the session factory bound to it.
+    """
+    async_url = async_database_url(url)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, is_async=True))
+    return async_engine, async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# The async engine only exists when DB_ASYNC is enabled, so asyncpg stays optional.
+async_engine, AsyncSessionLocal = create_async_database(settings.DB_URL) if settings.DB_ASYNC else (None, None)
+if async_engine is not None:
+    pool_telemetry.register("async", async_engine.sync_engine)
 
 Base = declarative_base()
 
 def get_db() -> Generator[Session, None, None]:
+    """
+    Request-scoped session shared by the auth dependencies and the handler.
+
+    FastAPI resolves it once per request, and the session only checks out a
+    connection on its first query, so a request served from the principal
+    cache that never touches the database holds no connection at all.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access requires DB_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
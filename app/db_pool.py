@@ -0,0 +1,171 @@
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolTelemetry:
+    """
+    Live statistics for the connection pools of this worker.
+
+    Checkout wait time is measured by the instrumented pool classes below;
+    connect/invalidate counters come from pool events. Gauges (checked out,
+    overflow, idle) are read from the pool itself when stats() is called.
+    """
+
+    def __init__(self):
+        self._engines: dict[str, Engine] = {}
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict] = {}
+
+    def _new_counters(self) -> dict:
+        return {
+            "checkouts": 0,
+            "timeouts": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "wait_ms_sum": 0.0,
+            "wait_ms_max": 0.0,
+            "wait_buckets": [0] * (len(WAIT_BUCKETS_MS) + 1),
+        }
+
+    def register(self, name: str, engine: Engine) -> None:
+        """
+        Track `engine` (a sync Engine, or AsyncEngine.sync_engine) under `name`.
+        """
+        engine.pool.telemetry_name = name
+        with self._lock:
+            self._engines[name] = engine
+            self._counters.setdefault(name, self._new_counters())
+
+        def on_connect(dbapi_connection, connection_record):
+            self._incr(name, "connects")
+
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self._incr(name, "invalidations")
+
+        event.listen(engine, "connect", on_connect)
+        event.listen(engine, "invalidate", on_invalidate)
+
+    def _incr(self, name: str, key: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(name, self._new_counters())
+            counters[key] += 1
+
+    def observe_wait(self, name: str, seconds: float, timed_out: bool = False) -> None:
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            counters = self._counters.setdefault(name, self._new_counters())
+            if timed_out:
+                counters["timeouts"] += 1
+            else:
+                counters["checkouts"] += 1
+            counters["wait_ms_sum"] += elapsed_ms
+            counters["wait_ms_max"] = max(counters["wait_ms_max"], elapsed_ms)
+            counters["wait_buckets"][bisect.bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+
+    def stats(self) -> dict:
+        pools = {}
+        with self._lock:
+            engines = dict(self._engines)
+            counters = {name: dict(c, wait_buckets=list(c["wait_buckets"])) for name, c in self._counters.items()}
+        for name, engine in engines.items():
+            pool = engine.pool
+            c = counters[name]
+            # Cumulative buckets, Prometheus style: le_<ms> counts waits <= ms
+            cumulative, total = {}, 0
+            for bound, count in zip(WAIT_BUCKETS_MS + ("inf",), c["wait_buckets"]):
+                total += count
+                cumulative[f"le_{bound}"] = total
+            observed = c["checkouts"] + c["timeouts"]
+            pools[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "checkouts": c["checkouts"],
+                "timeouts": c["timeouts"],
+                "connects": c["connects"],
+                "invalidations": c["invalidations"],
+                "wait_ms_avg": round(c["wait_ms_sum"] / observed, 3) if observed else 0.0,
+                "wait_ms_max": round(c["wait_ms_max"], 3),
+                "wait_ms_buckets": cumulative,
+            }
+        return {"pid": os.getpid(), "pools": pools}
+
+
+pool_telemetry = PoolTelemetry()
+
+
+class _InstrumentedPoolMixin:
+    """Times every checkout, including waits for a free connection and pre-ping."""
+
+    telemetry_name = "default"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_telemetry.observe_wait(self.telemetry_name, time.perf_counter() - started, timed_out=True)
+            raise
+        pool_telemetry.observe_wait(self.telemetry_name, time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting under the same name
+        pool = super().recreate()
+        pool.telemetry_name = self.telemetry_name
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _session_settings() -> dict:
+    """Per-connection server settings applied at connect time."""
+    options = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_WORK_MEM:
+        options["work_mem"] = settings.DB_WORK_MEM
+    return options
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine/create_async_engine built from the
+    DB_POOL_* and per-connection settings.
+    """
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    server_settings = _session_settings()
+    driver = make_url(url).get_driver_name()
+    if driver == "asyncpg":
+        options["connect_args"] = {"server_settings": server_settings}
+    elif make_url(url).get_backend_name() == "postgresql":
+        # libpq-based drivers: application_name is a connection parameter,
+        # everything else goes through the startup "options" string.
+        connect_args = {"application_name": server_settings.pop("application_name")}
+        if server_settings:
+            connect_args["options"] = " ".join(f"-c {k}={v}" for k, v in server_settings.items())
+        options["connect_args"] = connect_args
+    return options
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind its primary; 0 for a server that is not in
+# recovery, so a plain second instance can stand in for a replica locally.
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """
+    Chooses a read replica for read-only sessions.
+
+    Replica lag is measured at most every `check_interval` seconds (by one
+    thread, the others use the last measurement); a replica that lags more
+    than `max_lag` seconds, or could not be reached, is skipped until the next
+    check. A user who committed a write is kept on the primary for
+    `sticky_seconds` so they read their own writes; expired entries are swept
+    on the next write at least `sticky_seconds` after the previous sweep.
+    """
+
+    def __init__(self, replicas: list[Engine], max_lag: float, check_interval: float, sticky_seconds: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._lag: dict[int, float] = {}
+        self._checked_at: Optional[float] = None
+        self._check_lock = threading.Lock()
+        self._cycle = itertools.cycle(range(len(replicas)))
+        self._recent_writers: dict[int, float] = {}
+        self._writers_lock = threading.Lock()
+        self._swept_at = time.monotonic()
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+
+    def measure_lag(self, replica: Engine) -> float:
+        with replica.connect() as conn:
+            return float(conn.execute(LAG_QUERY).scalar())
+
+    def _check_lag_if_stale(self) -> None:
+        if self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if not self._check_lock.acquire(blocking=self._checked_at is None):
+            return
+        try:
+            for index, replica in enumerate(self.replicas):
+                try:
+                    self._lag[index] = self.measure_lag(replica)
+                except Exception as e:
+                    logger.warning(f"Replica {index} unavailable: {e}")
+                    self._lag[index] = float("inf")
+            self._checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def mark_write(self, user_id: Optional[int]) -> None:
+        if user_id is None or self.sticky_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._writers_lock:
+            self._recent_writers[user_id] = now + self.sticky_seconds
+            if now - self._swept_at >= self.sticky_seconds:
+                self._recent_writers = {
+                    writer: until for writer, until in self._recent_writers.items() if until > now
+                }
+                self._swept_at = now
+
+    def is_sticky(self, user_id: Optional[int]) -> bool:
+        if user_id is None:
+            return False
+        until = self._recent_writers.get(user_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            with self._writers_lock:
+                if self._recent_writers.get(user_id) == until:
+                    del self._recent_writers[user_id]
+            return False
+        return True
+
+    def pick(self, user_id: Optional[int] = None) -> Optional[Engine]:
+        """
+        Return a replica fit to serve this user's reads, or None for the primary.
+        """
+        if not self.replicas:
+            return None
+        if self.is_sticky(user_id):
+            self.sticky_reads += 1
+            return None
+        self._check_lag_if_stale()
+        for _ in range(len(self.replicas)):
+            index = next(self._cycle)
+            if self._lag.get(index, float("inf")) <= self.max_lag:
+                self.replica_reads += 1
+                return self.replicas[index]
+        self.primary_reads += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "replicas": len(self.replicas),
+            "max_lag": self.max_lag,
+            "lag": {str(index): lag for index, lag in self._lag.items()},
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "sticky_users": len(self._recent_writers),
+        }
+
+
+class RoutingSession(Session):
+    """
+    Session that sends read-only work to a replica.
+
+    A session is read-only when created with info={"read_only": True}. It picks
+    a replica once, on first use, and falls back to the primary when the
+    router has none fit to serve, when the user is sticky, or as soon as the
+    session flushes or executes a write. info["user_id"] identifies the user for
+    read-your-writes stickiness across requests.
+    """
+
+    def __init__(self, *args, replica_router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_router = replica_router
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.replica_router is not None
+            and self.info.get("read_only")
+            and not self.info.get("wrote")
+            and not self._flushing
+        ):
+            if "replica" not in self.info:
+                self.info["replica"] = self.replica_router.pick(self.info.get("user_id"))
+            if self.info["replica"] is not None:
+                return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+# Core INSERT/UPDATE/DELETE run through Session.execute() never flush; text()
+# and COPY on the session's connection must set info["wrote"] themselves
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _remember_statement_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_writer(session):
+    if session.info.get("wrote") and session.replica_router is not None:
+        session.replica_router.mark_write(session.info.get("user_id"))
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+ETAG_HEADER = "ETag"
+
+
+def weak_etag(*parts) -> str:
+    """
+    Weak validator for a representation built from `parts` (ids, timestamps,
+    anything that changes when the response would).
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Put `etag` on the response. When the client already has that version,
+    return the 304 to send instead (with the headers set so far, e.g. the
+    pagination ones); otherwise None, and the route builds the body as usual.
+    """
+    response.headers[ETAG_HEADER] = etag
+    if not etag_matches(request, etag):
+        return None
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(status_code=304, headers=headers)
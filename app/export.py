@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def encode_rows(fmt: ExportFormat, keys: Sequence[str], rows: Sequence, header: bool = False) -> bytes:
+    """
+    One chunk of an export: `rows` as NDJSON lines or CSV records, preceded
+    by the CSV header row when `header` is set. Decimals are written as
+    strings, as in the JSON API, and lists in CSV cells as JSON arrays.
+    """
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(keys, row)), default=_json_default) + "\n" for row in rows
+        ).encode()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(keys)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def _stream(db: Session, statement: Select, fmt: ExportFormat) -> Iterator[bytes]:
+    result = db.execute(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+    keys = list(result.keys())
+    header = fmt == "csv"
+    if header:
+        yield encode_rows(fmt, keys, [], header=True)
+    for partition in result.partitions():
+        yield encode_rows(fmt, keys, partition)
+    # Ends the read-only transaction, so the connection goes back to the pool
+    db.rollback()
+
+async def _stream_async(db: AsyncSession, statement: Select, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    result = await db.stream(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+    keys = list(result.keys())
+    if fmt == "csv":
+        yield encode_rows(fmt, keys, [], header=True)
+    async for partition in result.partitions():
+        yield encode_rows(fmt, keys, partition)
+    await db.rollback()
+
+def _headers(name: str, fmt: ExportFormat) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+
+def export_response(db: Session, statement: Select, fmt: ExportFormat, name: str) -> StreamingResponse:
+    """
+    Stream the rows of a column select() as a CSV or NDJSON download.
+
+    The query runs once, through a server-side cursor (yield_per), and rows
+    are encoded and sent EXPORT_BATCH_SIZE at a time as they arrive, so
+    memory stays bounded however many rows there are and the first bytes go
+    out as soon as the first batch is fetched.
+    """
+    return StreamingResponse(_stream(db, statement, fmt), media_type=MEDIA_TYPES[fmt], headers=_headers(name, fmt))
+
+def export_response_async(db: AsyncSession, statement: Select, fmt: ExportFormat, name: str) -> StreamingResponse:
+    """AsyncSession counterpart of export_response()."""
+    return StreamingResponse(_stream_async(db, statement, fmt), media_type=MEDIA_TYPES[fmt], headers=_headers(name, fmt))
@@ -0,0 +1,392 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.auth.jwt import decode_token
+from app.config import settings
+from app.database import engine
+from app.models.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey.__table__.c.key.type.length
+
+# Not replayed as stored: recomputed for the replayed body, or per response
+_UNSTORED_HEADERS = {b"content-length", b"date", b"server"}
+
+# Client errors that a retry of the same request would get again. Others,
+# such as 401/403 (credentials or role change), 409 and 429, can pass on a
+# retry, so like 5xx they release the key instead of being stored.
+_FINAL_CLIENT_ERRORS = {400, 404, 422}
+
+
+def _is_final(status_code: int) -> bool:
+    return 200 <= status_code < 300 or status_code in _FINAL_CLIENT_ERRORS
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    headers: list  # [name, value] pairs
+    body: bytes
+
+
+class IdempotencyStore:
+    """
+    Responses of mutating requests, keyed by (user, Idempotency-Key).
+
+    The idempotency_keys table is the source of truth across workers: the
+    first request to insert a key owns it and runs; the others replay its
+    stored response. An LRU of recent responses answers replays without a
+    query, and requests in flight on this worker are tracked in memory, so
+    a duplicate arriving while the original runs waits for it instead of
+    racing it to the database. A duplicate of a request in flight on
+    another worker polls the table until the response is stored.
+
+    Responses with a 5xx status are not stored; the key is released and the
+    next retry runs the request again.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        lock_timeout: float,
+        wait_timeout: float,
+        poll_interval: float,
+        cache_size: int,
+        compact_interval: float,
+    ):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.cache_size = cache_size
+        self.compact_interval = compact_interval
+        self._cache: "OrderedDict[tuple[int, str], tuple[float, StoredResponse]]" = OrderedDict()
+        self._in_flight: set[tuple[int, str]] = set()
+        self._lock = threading.Lock()
+        self._last_compaction = time.monotonic()
+        self.executed = 0
+        self.cache_replays = 0
+        self.db_replays = 0
+        self.waits = 0
+        self.mismatches = 0
+        self.timeouts = 0
+        self.released = 0
+        self.compacted = 0
+
+    def _cached(self, k: tuple[int, str]) -> Optional[StoredResponse]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(k)
+            if entry is None:
+                return None
+            if entry[0] < now:
+                del self._cache[k]
+                return None
+            self._cache.move_to_end(k)
+            return entry[1]
+
+    def _remember(self, k: tuple[int, str], stored: StoredResponse, ttl: float) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[k] = (time.monotonic() + ttl, stored)
+            self._cache.move_to_end(k)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _claim(self, user_id: int, key: str, fingerprint: str) -> tuple[str, Optional[StoredResponse]]:
+        """
+        Take the key, or find who has it: ("owner", None), ("stored", response),
+        ("busy", None) while another worker runs it, or ("mismatch", None) if
+        it is running a different request.
+        """
+        now = datetime.now(timezone.utc)
+        table = IdempotencyKey.__table__
+        claim = {
+            "fingerprint": fingerprint,
+            "status_code": None,
+            "headers": None,
+            "body": None,
+            "locked_until": now + timedelta(seconds=self.lock_timeout),
+            "expires_at": now + timedelta(seconds=self.ttl),
+        }
+        statement = insert(table).values(user_id=user_id, key=key, **claim)
+        # An expired row, or a claim held past locked_until (its owner died), is taken over
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.key],
+            set_={**claim, "created_at": now},
+            where=or_(
+                table.c.expires_at < now,
+                (table.c.status_code.is_(None)) & (table.c.locked_until < now),
+            ),
+        ).returning(table.c.key)
+        with engine.begin() as conn:
+            if conn.execute(statement).first() is not None:
+                return "owner", None
+            row = conn.execute(
+                select(table.c.fingerprint, table.c.status_code, table.c.headers, table.c.body, table.c.expires_at)
+                .where(table.c.user_id == user_id, table.c.key == key)
+            ).first()
+        if row is None:
+            # Released between the two statements; the next attempt will take it
+            return "busy", None
+        if row.status_code is None:
+            return ("busy" if row.fingerprint == fingerprint else "mismatch"), None
+        stored = StoredResponse(row.fingerprint, row.status_code, row.headers or [], row.body or b"")
+        self._remember((user_id, key), stored, max(0.0, (row.expires_at - now).total_seconds()))
+        return "stored", stored
+
+    async def begin(self, user_id: int, key: str, fingerprint: str) -> tuple[str, Optional[StoredResponse]]:
+        """
+        Decide what to do with a request carrying an Idempotency-Key:
+
+        - ("owner", None): run it, then call finish();
+        - ("replay", response): answer with the stored response;
+        - ("mismatch", None): the key was used for a different request;
+        - ("timeout", None): the original is still running after wait_timeout.
+        """
+        k = (user_id, key)
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        while True:
+            stored = self._cached(k)
+            outcome = None
+            if stored is None:
+                with self._lock:
+                    running_here = k in self._in_flight
+                    if not running_here:
+                        self._in_flight.add(k)
+                if not running_here:
+                    try:
+                        outcome, stored = await run_in_threadpool(self._claim, user_id, key, fingerprint)
+                    finally:
+                        if outcome != "owner":
+                            with self._lock:
+                                self._in_flight.discard(k)
+                    if outcome == "owner":
+                        self.executed += 1
+                        return "owner", None
+                    if outcome == "mismatch":
+                        self.mismatches += 1
+                        return "mismatch", None
+                    if stored is not None:
+                        self.db_replays += 1
+            else:
+                self.cache_replays += 1
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    self.mismatches += 1
+                    return "mismatch", None
+                return "replay", stored
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                return "timeout", None
+            if not waited:
+                self.waits += 1
+                waited = True
+            await asyncio.sleep(self.poll_interval)
+
+    def _store(self, user_id: int, key: str, stored: Optional[StoredResponse]) -> None:
+        table = IdempotencyKey.__table__
+        owned = (table.c.user_id == user_id) & (table.c.key == key) & table.c.status_code.is_(None)
+        with engine.begin() as conn:
+            if stored is None:
+                conn.execute(delete(table).where(owned))
+            else:
+                conn.execute(
+                    update(table).where(owned).values(
+                        status_code=stored.status_code, headers=stored.headers, body=stored.body, locked_until=None
+                    )
+                )
+        if time.monotonic() - self._last_compaction >= self.compact_interval:
+            self.compact()
+
+    async def finish(self, user_id: int, key: str, stored: Optional[StoredResponse]) -> None:
+        """
+        Store the owner's response for replay, or release the key when
+        `stored` is None (failed request). Always ends the in-flight claim.
+        """
+        k = (user_id, key)
+        try:
+            if stored is None:
+                self.released += 1
+            else:
+                # Waiters on this worker replay from the cache as soon as it is there
+                self._remember(k, stored, self.ttl)
+            await run_in_threadpool(self._store, user_id, key, stored)
+        except Exception:
+            logger.exception("Failed to store the response for an idempotency key")
+            with self._lock:
+                self._cache.pop(k, None)
+        finally:
+            with self._lock:
+                self._in_flight.discard(k)
+
+    def compact(self) -> int:
+        """Delete keys whose responses have expired."""
+        self._last_compaction = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                removed = conn.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc))
+                ).rowcount
+        except Exception:
+            logger.exception("Failed to compact idempotency keys")
+            return 0
+        self.compacted += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "cache_replays": self.cache_replays,
+            "db_replays": self.db_replays,
+            "waits": self.waits,
+            "mismatches": self.mismatches,
+            "timeouts": self.timeouts,
+            "released": self.released,
+            "compacted": self.compacted,
+        }
+
+
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL,
+    lock_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_TIMEOUT,
+    poll_interval=settings.IDEMPOTENCY_POLL_INTERVAL,
+    cache_size=settings.IDEMPOTENCY_CACHE_SIZE,
+    compact_interval=settings.IDEMPOTENCY_COMPACT_INTERVAL,
+)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for header, value in scope["headers"]:
+        if header == name:
+            return value.decode("latin-1")
+    return None
+
+def _user_id(scope) -> Optional[int]:
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return int(decode_token(token)["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key support for the POST endpoints in `paths`.
+
+    A request with the header is run once per (user, key); retries with the
+    same key and body get the stored response back, marked with
+    Idempotent-Replayed: true, and a retry sent while the original is still
+    running waits for it rather than running a second time. Only successes
+    and 400/404/422 are stored; other responses release the key so the
+    request can be retried. Reusing a key for a different request is a 422. Requests without the header, or
+    without a valid bearer token (left for the route to reject), pass
+    through untouched.
+    """
+
+    def __init__(self, app, paths: Iterable[str], store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.paths = set(paths)
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        key = _header(scope, b"idempotency-key")
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key.strip() or len(key) > MAX_KEY_LENGTH:
+            return await _respond(send, 400, {"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"})
+        user_id = _user_id(scope)
+        if user_id is None:
+            return await self.app(scope, receive, send)
+
+        body, more = [], True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(body)
+        fingerprint = hashlib.sha256(b"\n".join([b"POST", scope["path"].encode(), body])).hexdigest()
+
+        outcome, stored = await self.store.begin(user_id, key, fingerprint)
+        if outcome == "replay":
+            headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+            headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+            return await _send(send, stored.status_code, headers, stored.body)
+        if outcome == "mismatch":
+            return await _respond(send, 422, {"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"})
+        if outcome == "timeout":
+            return await _respond(send, 409, {"detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} is still in progress"})
+
+        replayed = False
+
+        async def replay_body():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        start, chunks = None, []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        result = None
+        try:
+            await self.app(scope, replay_body, capture)
+            if start is not None and _is_final(start["status"]):
+                result = StoredResponse(
+                    fingerprint,
+                    start["status"],
+                    [
+                        [name.decode("latin-1"), value.decode("latin-1")]
+                        for name, value in start.get("headers", [])
+                        if name.lower() not in _UNSTORED_HEADERS
+                    ],
+                    b"".join(chunks),
+                )
+        finally:
+            await self.store.finish(user_id, key, result)
+
+
+async def _send(send, status_code: int, headers: list, body: bytes) -> None:
+    headers = headers + [(b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def _respond(send, status_code: int, content: dict) -> None:
+    await _send(send, status_code, [(b"content-type", b"application/json")], json.dumps(content).encode())
@@ -1,35 +1,86 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.config import settings
+from app import database
 from app.routers.auth import router as auth_router
-from app.routers.clientes import router as clientes_router
-from app.routers.orders import router as orders_router
-from app.routers.products import router as products_router
-from app.routers.users import router as users_router
-
-from app.auth.deps import get_current_user
-
-app = FastAPI(
-    title="WhatsApp API",
-    version="1.0.0"
-)
-
-# CORS middleware with secure, production-ready settings
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["https://yourdomain.com"],  # Change to your production domain
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-)
-
-# Secure all routes with authentication
-app.include_router(auth_router, prefix="/auth")
-app.include_router(clientes_router, prefix="/clients", dependencies=[Depends(get_current_user)])
-app.include_router(orders_router, prefix="/orders", dependencies=[Depends(get_current_user)])
-app.include_router(products_router, prefix="/products", dependencies=[Depends(get_current_user)])
-app.include_router(users_router, prefix="/users", dependencies=[Depends(get_current_user)])
+from app.routers.metrics import router as metrics_router
+from app.services.hashing import hashing_pool
+from app.auth.revocation import revocation_store
+from app.services.stock_consolidator import stock_consolidator
+from app.idempotency import IdempotencyMiddleware
+from app.response_cache import response_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    revocation_store.start()
+    stock_consolidator.start()
+    response_cache.start()
+    yield
+    response_cache.stop()
+    stock_consolidator.stop()
+    revocation_store.stop()
+    hashing_pool.shutdown()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+def create_app(db_async: bool = settings.DB_ASYNC) -> FastAPI:
+    """
+    Build the application with the sync routers, or with the AsyncSession
+    routers and auth dependencies when `db_async` is set.
+    """
+    if db_async:
+        from app.auth.deps_async import get_current_user, require_admin
+        from app.routers.aio.clientes import router as clientes_router
+        from app.routers.aio.orders import router as orders_router
+        from app.routers.aio.products import router as products_router
+        from app.routers.aio.search import router as search_router
+        from app.routers.aio.users import router as users_router
+    else:
+        from app.auth.deps import get_current_user, require_admin
+        from app.routers.clientes import router as clientes_router
+        from app.routers.orders import router as orders_router
+        from app.routers.products import router as products_router
+        from app.routers.search import router as search_router
+        from app.routers.users import router as users_router
+
+    app = FastAPI(
+        title="WhatsApp API",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Idempotency-Key on the create endpoints; added before CORS so replayed
+    # responses get the CORS headers too
+    app.add_middleware(
+        IdempotencyMiddleware,
+        paths={"/orders/", "/orders/batch", "/clients/", "/clients/batch", "/products/"},
+    )
+
+    # CORS middleware with secure, production-ready settings
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://yourdomain.com"],  # Change to your production domain
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Mode", "Idempotent-Replayed", "ETag"],
+    )
+
+    # Secure all routes with authentication
+    app.include_router(auth_router, prefix="/auth")
+    app.include_router(clientes_router, prefix="/clients", dependencies=[Depends(get_current_user)])
+    app.include_router(orders_router, prefix="/orders", dependencies=[Depends(get_current_user)])
+    app.include_router(products_router, prefix="/products", dependencies=[Depends(get_current_user)])
+    app.include_router(users_router, prefix="/users", dependencies=[Depends(get_current_user)])
+    app.include_router(search_router, prefix="/search", dependencies=[Depends(get_current_user)])
+    app.include_router(metrics_router, prefix="/metrics", dependencies=[Depends(require_admin)])
+    return app
 
+app = create_app()
 
 if __name__ == "__main__":
     import os
@@ -1,14 +1,18 @@
 from sqlalchemy import (
-    Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Table, Text, Enum, Boolean, CheckConstraint
+    Column, Integer, String, Numeric, Float, Date, DateTime, ForeignKey, Table, Text, Enum, Boolean, CheckConstraint, LargeBinary,
+    DDL, Index, case, event, select
 )
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.orm import column_property, relationship, declarative_base
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 import enum
 from decimal import Decimal
 
 Base = declarative_base()
 
+# Trigram indexes (substring search on clients and products) need pg_trgm
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 class StringEnum(str, enum.Enum):
     """"""
     def __str__(self):
@@ -36,7 +40,11 @@ order_product = Table(
     "order_product",
     Base.metadata,
     Column("order_id", Integer, ForeignKey("orders.id"), primary_key=True),
-    Column("product_id", Integer, ForeignKey("products.id"), primary_key=True)
+    Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
+    Column("quantity", Integer, nullable=False, default=1, server_default="1"),
+    CheckConstraint("quantity > 0", name="check_quantity_positive"),
+    # The primary key starts with order_id; lookups by product need their own index
+    Index("ix_order_product_product_id", "product_id"),
 )
 
 class User(Base, TimestampMixin):
@@ -51,6 +59,12 @@ class User(Base, TimestampMixin):
     hashed_password = Column(String(128), nullable=False)
     role = Column(Enum(UserRole), nullable=False, default=UserRole.USER)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Bumped whenever issued access tokens must stop being honoured
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     @property
     def is_admin(self) -> bool:
@@ -69,6 +83,79 @@ class User(Base, TimestampMixin):
     def __repr__(self):
         return f"<User(id={self.id}, name={self.name}, role={self.role})>"
 
+class RevokedToken(Base):
+    """
+    Refresh token ids (jti) that have already been used or revoked.
+    Rows can be deleted once expires_at has passed.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<RevokedToken(jti={self.jti}, user_id={self.user_id})>"
+
+class ThrottleBucket(Base):
+    """
+    Shared token bucket state for rate limiting (login throttle database backend).
+    """
+    __tablename__ = "throttle_buckets"
+
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ThrottleBucket(key={self.key}, tokens={self.tokens})>"
+
+class IdempotencyKey(Base):
+    """
+    Responses stored under a client-supplied Idempotency-Key, so a retried
+    request is answered with the original response instead of running again.
+    A row without status_code is a request still in flight; past
+    locked_until its owner is presumed dead and another worker may take it
+    over. Rows can be deleted once expires_at has passed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of method, path and body
+    status_code = Column(Integer, nullable=True)
+    headers = Column(JSONB, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key={self.key}, status_code={self.status_code})>"
+
+class ResponseCacheEntry(Base):
+    """
+    Rendered catalog responses shared by every worker (see app/response_cache.py).
+    Each row lists the tags it depends on, so a write deletes exactly the
+    responses it made stale. UNLOGGED: losing it on a crash only costs misses.
+    """
+    __tablename__ = "response_cache"
+    __table_args__ = (
+        Index("ix_response_cache_tags", "tags", postgresql_using="gin"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    key = Column(Text, primary_key=True)
+    tags = Column(ARRAY(Text), nullable=False)
+    headers = Column(JSONB, nullable=False)
+    body = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ResponseCacheEntry(key={self.key}, expires_at={self.expires_at})>"
+
 class Client(Base, TimestampMixin):
     """
     Client model representing customers who place orders.
@@ -80,11 +167,40 @@ class Client(Base, TimestampMixin):
     email = Column(String(120), unique=True, nullable=False, index=True)
     cpf = Column(String(14), unique=True, nullable=False, index=True)
 
+    __table_args__ = (
+        Index("ix_clients_created_at_id", "created_at", "id"),
+        Index("ix_clients_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_clients_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
     orders = relationship("Order", back_populates="client")
     
     def __repr__(self):
         return f"<Client(id={self.id}, name={self.name})>"
 
+MAX_STOCK_SHARDS = 64
+
+class ProductStockShard(Base):
+    """
+    One of the sub-counters holding the stock of a hot product.
+
+    Orders decrement different shards in parallel instead of queueing on the
+    product row; app.services.stock_consolidator folds them back into
+    Product.stock and evens them out.
+    """
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    stock = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("stock >= 0", name="check_shard_stock_non_negative"),
+    )
+
+    def __repr__(self):
+        return f"<ProductStockShard(product_id={self.product_id}, shard={self.shard}, stock={self.stock})>"
+
 class Product(Base, TimestampMixin):
     """
     Product model representing items available for sale.
@@ -99,9 +215,32 @@ class Product(Base, TimestampMixin):
     stock = Column(Integer, nullable=False)
     expiry_date = Column(Date, nullable=True)
     images = Column(JSONB, nullable=True)  
+    # 0: stock lives in `stock`. N > 0: a hot product whose stock is split
+    # across N ProductStockShard rows, and `stock` is the last consolidated total.
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0")
+    # Current stock either way, summing the shards of a hot product
+    available_stock = column_property(
+        case(
+            (
+                stock_shards > 0,
+                select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+                .where(ProductStockShard.product_id == id)
+                .correlate_except(ProductStockShard)
+                .scalar_subquery(),
+            ),
+            else_=stock,
+        )
+    )
     
     __table_args__ = (
         CheckConstraint("stock >= 0", name="check_stock_non_negative"),
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_section_created_at_id", "section", "created_at", "id"),
+        Index("ix_products_price", "price"),
+        Index(
+            "ix_products_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"},
+        ),
     )
 
     orders = relationship(
@@ -124,12 +263,33 @@ class Order(Base, TimestampMixin):
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
     status = Column(Enum(OrderStatus), nullable=False, default=OrderStatus.PENDING)
 
+    # Listing indexes lead with the filter column and end with the listing's
+    # sort key (created_at, id), so a filtered page is read in index order.
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_client_id_created_at_id", "client_id", "created_at", "id"),
+    )
+
     client = relationship("Client", back_populates="orders")
     products = relationship(
         "Product",
         secondary=order_product,
         back_populates="orders"
     )
+    # Same rows as `products`, with their quantities; written with plain
+    # INSERTs when the order is created
+    items = relationship("OrderItem", viewonly=True, order_by="OrderItem.product_id")
     
     def __repr__(self):
         return f"<Order(id={self.id}, client_id={self.client_id}, status={self.status})>"
+
+
+class OrderItem(Base):
+    """
+    A line of an order: `quantity` units of one product (a row of order_product).
+    """
+    __table__ = order_product
+
+    def __repr__(self):
+        return f"<OrderItem(order_id={self.order_id}, product_id={self.product_id}, quantity={self.quantity})>"
@@ -0,0 +1,214 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_MODE_HEADER = "X-Total-Count-Mode"
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that is malformed, tampered with or from another listing."""
+
+
+def _sign(body: bytes) -> bytes:
+    return hmac.new(settings.CURSOR_SECRET.encode(), body, hashlib.sha256).digest()[:16]
+
+def _encode_value(value):
+    return {"dt": value.isoformat()} if isinstance(value, datetime) else value
+
+def _decode_value(value):
+    return datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+
+def encode_cursor(scope: str, values: Sequence) -> str:
+    """
+    Opaque, signed cursor pointing just after the row with the given sort key.
+    `scope` names the listing, so a cursor is only accepted where it was issued.
+    """
+    body = json.dumps([scope, [_encode_value(v) for v in values]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(_sign(body) + body).decode().rstrip("=")
+
+def decode_cursor(scope: str, cursor: str) -> list:
+    """
+    Raises:
+        InvalidCursor: if the cursor does not verify or belongs to another scope.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        signature, body = raw[:16], raw[16:]
+        if not hmac.compare_digest(signature, _sign(body)):
+            raise InvalidCursor("Bad cursor signature")
+        cursor_scope, values = json.loads(body)
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if cursor_scope != scope:
+        raise InvalidCursor("Cursor issued for another listing")
+    return [_decode_value(v) for v in values]
+
+def seek(query, sort_key: Sequence, limit: int, skip: int = 0, cursor: Optional[str] = None, scope: str = ""):
+    """
+    Order `query` (an ORM Query or a select()) by `sort_key` and restrict it to
+    one page.
+
+    With a cursor the page starts right after the cursor's row (keyset
+    pagination, cost independent of depth). Without one, `skip` rows are
+    skipped with OFFSET, kept for clients that still page that way. One row
+    more than `limit` is fetched so next_page() can tell whether another page
+    exists.
+
+    Raises:
+        HTTPException: 400 if the cursor is invalid.
+    """
+    query = query.order_by(*sort_key)
+    if cursor:
+        try:
+            values = decode_cursor(scope, cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        query = query.filter(tuple_(*sort_key) > tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def next_page(rows: Sequence, sort_key: Sequence, limit: int, scope: str, response: Response) -> list:
+    """
+    Trim the extra row fetched by seek() and, when there are more rows, set the
+    cursor for the next page in the X-Next-Cursor response header.
+    """
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(scope, [getattr(last, column.key) for column in sort_key])
+    return rows
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, with its parameters bound as usual."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+@compiles(ExplainJSON, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+class TotalCounter:
+    """
+    Result totals for listings, in one of two modes:
+
+    - "exact" counts matching rows, but stops at `exact_cap`; past the cap the
+      planner estimate is returned instead (never less than the cap).
+    - "estimated" asks the planner: pg_class.reltuples for an unfiltered
+      listing, the EXPLAIN row estimate otherwise. Cheap, but only as good as
+      the table statistics.
+
+    Totals are memoised for `ttl` seconds keyed by listing, mode and the
+    normalized filter set, so paging through one result set counts it once.
+    """
+
+    def __init__(self, exact_cap: int, ttl: float, maxsize: int = 1024):
+        self.exact_cap = exact_cap
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, tuple[float, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_counts = 0
+        self.estimates = 0
+
+    @staticmethod
+    def _key(table_name: str, mode: str, filters: dict) -> tuple:
+        return table_name, mode, tuple(sorted((k, str(v)) for k, v in filters.items() if v is not None))
+
+    def _exact(self, db: Session, query) -> int:
+        capped = query.order_by(None).limit(self.exact_cap + 1).subquery()
+        return db.execute(select(func.count()).select_from(capped)).scalar()
+
+    def _estimate(self, db: Session, query, table_name: str, filtered: bool) -> int:
+        if not filtered:
+            reltuples = db.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"), {"name": table_name}
+            ).scalar()
+            # -1 until the table has been vacuumed or analyzed
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+        plan = db.execute(ExplainJSON(getattr(query, "statement", query).order_by(None))).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def count(self, db: Session, query, table_name: str, filters: dict, mode: str) -> tuple[int, str]:
+        """
+        Return (total, mode actually used) for the rows of `table_name` matched
+        by `query`; `filters` are the listing's filter values, None when unset.
+        """
+        key = self._key(table_name, mode, filters)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+
+        filtered = any(v is not None for v in filters.values())
+        if mode == "exact":
+            self.exact_counts += 1
+            total, used = self._exact(db, query), "exact"
+            if total > self.exact_cap:
+                self.estimates += 1
+                total = max(self._estimate(db, query, table_name, filtered), self.exact_cap)
+                used = "estimated"
+        else:
+            self.estimates += 1
+            total, used = self._estimate(db, query, table_name, filtered), "estimated"
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, total, used)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return total, used
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "exact_cap": self.exact_cap,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "exact_counts": self.exact_counts,
+            "estimates": self.estimates,
+        }
+
+
+total_counter = TotalCounter(exact_cap=settings.TOTAL_COUNT_EXACT_CAP, ttl=settings.TOTAL_COUNT_CACHE_TTL)
+
+def set_total_count(response: Response, db: Session, query, table_name: str, filters: dict, mode: str) -> None:
+    """
+    Put the listing total in the X-Total-Count header, and the mode that
+    produced it in X-Total-Count-Mode.
+    """
+    total, used = total_counter.count(db, query, table_name, filters, mode)
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    response.headers[TOTAL_COUNT_MODE_HEADER] = used
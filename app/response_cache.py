@@ -0,0 +1,621 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import selectors
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import engine
+from app.etag import ETAG_HEADER, etag_matches
+from app.models.models import ResponseCacheEntry
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_COUNT_MODE_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Headers that belong to a cached response and are replayed with it
+CACHED_HEADERS = (ETAG_HEADER, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_COUNT_MODE_HEADER)
+NOTIFY_CHANNEL = "response_cache"
+# NOTIFY payloads are capped at 8000 bytes; an invalidation naming more tags
+# than this tells the other workers to drop everything instead
+MAX_NOTIFY_TAGS = 200
+
+
+def cache_key(scope: str, **params) -> str:
+    """
+    Key for a read of `scope` with the given, already parsed, query params.
+
+    Params that are None are left out and the rest sorted, so the order of
+    the query string and equivalent spellings (10 and 10.00, True and true)
+    share an entry.
+    """
+    parts = []
+    for name in sorted(params):
+        value = params[name]
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, Decimal):
+            value = value.normalize()
+        parts.append(f"{name}={value}")
+    return f"{scope}?{'&'.join(parts)}"
+
+def product_tags(*product_ids: int) -> tuple[str, ...]:
+    """Tags a write to these products invalidates: the listings and each product."""
+    return ("products", *(f"product:{product_id}" for product_id in product_ids))
+
+def client_tags(*client_ids: int) -> tuple[str, ...]:
+    """Tags a write to these clients invalidates: the listings and each client."""
+    return ("clients", *(f"client:{client_id}" for client_id in client_ids))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """A rendered JSON body with the headers that go with it."""
+    body: bytes
+    headers: dict
+
+    @classmethod
+    def render(cls, adapter: TypeAdapter, value, response: Response) -> "CachedResponse":
+        """
+        Serialize `value` as the route's response_model would, keeping the
+        cacheable headers the route set on `response`.
+        """
+        body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        return cls(body=body, headers=headers)
+
+    def respond(self, request: Request) -> Response:
+        """The response to send: a 304 if the client already has this version."""
+        etag = self.headers.get(ETAG_HEADER)
+        if etag and etag_matches(request, etag):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+class LocalCacheBackend:
+    """
+    Shared entries and invalidations within this process. A stand-in for
+    DatabaseCacheBackend in tests, where several ResponseCache instances play
+    the workers.
+    """
+    blocking = False
+
+    def __init__(self):
+        self._entries: dict[str, tuple[float, tuple[str, ...], CachedResponse]] = {}
+        self._subscribers: list[Callable[[Optional[tuple[str, ...]]], None]] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, callback: Callable[[Optional[tuple[str, ...]]], None]) -> None:
+        self._subscribers.append(callback)
+
+    def get(self, key: str) -> Optional[tuple[tuple[str, ...], CachedResponse, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1], entry[2], entry[0] - time.monotonic()
+
+    def set(self, key: str, tags: tuple[str, ...], value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+
+    def publish(self, tags: Optional[tuple[str, ...]]) -> None:
+        with self._lock:
+            if tags is None:
+                self._entries.clear()
+            else:
+                wanted = set(tags)
+                self._entries = {key: entry for key, entry in self._entries.items() if wanted.isdisjoint(entry[1])}
+            self.published += 1
+        for callback in self._subscribers:
+            callback(tags)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "published": self.published}
+
+
+class DatabaseCacheBackend:
+    """
+    Entries shared by every worker in the UNLOGGED response_cache table, and
+    invalidations broadcast to every worker over LISTEN/NOTIFY.
+
+    Only lookups run on the request path, on a primary connection of their
+    own: replicas cannot read UNLOGGED tables, so the route's session, which
+    may be on one, is not used. Stores and invalidations are queued
+    for a background thread, which writes them in order (an invalidation
+    deletes the matching rows and sends its NOTIFY in one transaction) and
+    also LISTENs, handing every invalidation to the subscribers. That
+    includes this worker's own, which drops whatever was read from the table
+    between the local invalidation and the delete. If the LISTEN connection
+    fails, everything is dropped once it is back, since notifications may
+    have been missed in between.
+    """
+    blocking = True
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL, compact_interval: float = 600):
+        self.channel = channel
+        self.compact_interval = compact_interval
+        self._subscribers: list[Callable[[Optional[tuple[str, ...]]], None]] = []
+        self._queue: list[tuple] = []
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._last_compaction = time.monotonic()
+        self.stored = 0
+        self.published = 0
+        self.received = 0
+        self.compacted = 0
+        self.failures = 0
+
+    def subscribe(self, callback: Callable[[Optional[tuple[str, ...]]], None]) -> None:
+        self._subscribers.append(callback)
+
+    def get(self, key: str) -> Optional[tuple[tuple[str, ...], CachedResponse, float]]:
+        table = ResponseCacheEntry.__table__
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(
+                    select(
+                        table.c.tags, table.c.headers, table.c.body,
+                        func.extract("epoch", table.c.expires_at - func.now()).label("ttl"),
+                    ).where(table.c.key == key, table.c.expires_at > func.now())
+                ).first()
+        except Exception:
+            # The cache only saves work; without it the route reads the rows itself
+            self.failures += 1
+            logger.exception("Failed to read the shared response cache")
+            return None
+        if row is None:
+            return None
+        return tuple(row.tags), CachedResponse(body=bytes(row.body), headers=row.headers), float(row.ttl)
+
+    def set(self, key: str, tags: tuple[str, ...], value: CachedResponse, ttl: float) -> None:
+        self._enqueue(("set", key, tags, value, ttl))
+
+    def publish(self, tags: Optional[tuple[str, ...]]) -> None:
+        self._enqueue(("publish", tags))
+
+    def _enqueue(self, op: tuple) -> None:
+        with self._lock:
+            self._queue.append(op)
+            self._ensure_thread()
+        os.write(self._wake_w, b"\0")
+
+    def start(self) -> None:
+        """Start listening for other workers' invalidations (also started lazily)."""
+        with self._lock:
+            self._ensure_thread()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="response-cache", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        listener = None
+        while not self._stopping.is_set():
+            try:
+                if listener is None:
+                    listener = self._listen()
+                    # Whatever was sent while nobody listened is lost
+                    self._deliver(None)
+                self._wait(listener)
+                self._receive(listener)
+            except Exception:
+                self.failures += 1
+                logger.exception("Lost the response cache LISTEN connection")
+                listener = self._close(listener)
+                self._stopping.wait(1)
+            self._flush()
+            if time.monotonic() - self._last_compaction >= self.compact_interval:
+                self.compact()
+        self._flush()
+        self._close(listener)
+
+    def _listen(self):
+        conn = engine.raw_connection()
+        dbapi = conn.driver_connection
+        # LISTEN belongs to the session, so this connection never goes back to the pool
+        conn.detach()
+        dbapi.rollback()
+        dbapi.autocommit = True
+        with dbapi.cursor() as cursor:
+            cursor.execute(f"LISTEN {self.channel}")
+        return dbapi
+
+    def _wait(self, listener) -> None:
+        with selectors.DefaultSelector() as selector:
+            selector.register(listener, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            selector.select(timeout=min(self.compact_interval, 5))
+        try:
+            os.read(self._wake_r, 4096)
+        except BlockingIOError:
+            pass
+
+    def _receive(self, listener) -> None:
+        listener.poll()
+        while listener.notifies:
+            notification = listener.notifies.pop(0)
+            self.received += 1
+            tags = json.loads(notification.payload)["tags"]
+            self._deliver(tuple(tags) if tags is not None else None)
+
+    def _deliver(self, tags: Optional[tuple[str, ...]]) -> None:
+        for callback in self._subscribers:
+            callback(tags)
+
+    @staticmethod
+    def _close(listener) -> None:
+        if listener is not None:
+            try:
+                listener.close()
+            except Exception:
+                pass
+        return None
+
+    def _flush(self) -> None:
+        with self._lock:
+            ops, self._queue = self._queue, []
+        if not ops:
+            return
+        table = ResponseCacheEntry.__table__
+        try:
+            with engine.begin() as conn:
+                # Consecutive stores go in as one upsert; invalidations keep their place
+                for kind, group in itertools.groupby(ops, key=lambda op: op[0]):
+                    if kind == "set":
+                        now = datetime.now(timezone.utc)
+                        rows = {
+                            key: {
+                                "key": key, "tags": list(tags), "headers": value.headers, "body": value.body,
+                                "expires_at": now + timedelta(seconds=ttl),
+                            }
+                            for _, key, tags, value, ttl in group
+                        }
+                        self._store(conn, table, list(rows.values()))
+                    else:
+                        for _, tags in group:
+                            self._invalidate(conn, table, tags)
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to write %d response cache operations", len(ops))
+
+    def _store(self, conn, table, rows: list[dict]) -> None:
+        stmt = insert(table)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={column: stmt.excluded[column] for column in ("tags", "headers", "body", "expires_at")},
+            ),
+            rows,
+        )
+        self.stored += len(rows)
+
+    def _invalidate(self, conn, table, tags: Optional[tuple[str, ...]]) -> None:
+        if tags is None:
+            conn.execute(delete(table))
+        else:
+            conn.execute(delete(table).where(table.c.tags.overlap(list(tags))))
+        payload = list(tags) if tags is not None and len(tags) <= MAX_NOTIFY_TAGS else None
+        conn.execute(select(func.pg_notify(self.channel, json.dumps({"tags": payload}))))
+        self.published += 1
+
+    def compact(self) -> int:
+        """Delete expired rows."""
+        self._last_compaction = time.monotonic()
+        try:
+            with engine.begin() as conn:
+                removed = conn.execute(delete(ResponseCacheEntry).where(ResponseCacheEntry.expires_at <= func.now())).rowcount
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to compact the response cache")
+            return 0
+        self.compacted += removed
+        return removed
+
+    def stop(self) -> None:
+        self._stopping.set()
+        os.write(self._wake_w, b"\0")
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "stored": self.stored,
+            "published": self.published,
+            "received": self.received,
+            "compacted": self.compacted,
+            "failures": self.failures,
+        }
+
+
+class ResponseCache:
+    """
+    Rendered read responses, per worker: an LRU with a TTL, optionally in
+    front of a cache shared with the other workers.
+
+    Entries carry tags naming what they show ("products" for the product
+    listings, "product:42" for one product). A write invalidates its tags
+    here at once and, through the backend, in every other worker. Concurrent
+    misses on one key are coalesced: one request loads and the others get its
+    result. A load that overlaps an invalidation is returned but not kept,
+    since it may have read the rows before the write.
+
+    Safe to share between the threadpool workers serving sync routes; the
+    async routes coalesce on the event loop instead.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, backend=None, wait_timeout: float = 10.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self.wait_timeout = wait_timeout
+        self._entries: "OrderedDict[str, tuple[float, tuple[str, ...], CachedResponse]]" = OrderedDict()
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._flights: dict[str, Future] = {}
+        self._async_flights: dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a load can tell whether one overlapped it
+        self._generation = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.discarded = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if backend is not None:
+            backend.subscribe(self._drop)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get_or_load(self, key: str, tags: tuple[str, ...], load: Callable[[], CachedResponse]) -> CachedResponse:
+        """
+        The cached response for `key`, or the one `load` renders, kept under `tags`.
+        Exceptions from `load` (e.g. a 404) are raised to every waiting caller and not cached.
+        """
+        if not self.enabled:
+            return load()
+        generation = self._generation
+        cached = self._get_local(key) or self._get_shared(key, generation)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                generation = self._generation
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return flight.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                return load()
+
+        self.misses += 1
+        try:
+            value = load()
+        except BaseException as e:
+            self._land(key, self._flights)
+            flight.set_exception(e)
+            raise
+        self._store(key, tags, value, generation)
+        self._land(key, self._flights)
+        flight.set_result(value)
+        return value
+
+    async def aget_or_load(
+        self, key: str, tags: tuple[str, ...], load: Callable[[], Awaitable[CachedResponse]]
+    ) -> CachedResponse:
+        """get_or_load for the async routes, with `load` a coroutine function."""
+        if not self.enabled:
+            return await load()
+        generation = self._generation
+        cached = self._get_local(key)
+        if cached is None and self.backend is not None:
+            if self.backend.blocking:
+                cached = await run_in_threadpool(self._get_shared, key, generation)
+            else:
+                cached = self._get_shared(key, generation)
+        if cached is not None:
+            return cached
+
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(flight), self.wait_timeout)
+            except asyncio.TimeoutError:
+                return await load()
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The leader was cancelled, not this request
+                return await load()
+
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        generation = self._generation
+        self.misses += 1
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            self._land(key, self._async_flights)
+            flight.cancel()
+            raise
+        except BaseException as e:
+            self._land(key, self._async_flights)
+            flight.set_exception(e)
+            # Marks it retrieved, so a flight nobody waited on is not logged
+            flight.exception()
+            raise
+        self._store(key, tags, value, generation)
+        self._land(key, self._async_flights)
+        flight.set_result(value)
+        return value
+
+    def _land(self, key: str, flights: dict) -> None:
+        with self._lock:
+            flights.pop(key, None)
+
+    def _get_local(self, key: str) -> Optional[CachedResponse]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < now:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def _get_shared(self, key: str, generation: int) -> Optional[CachedResponse]:
+        if self.backend is None:
+            return None
+        found = self.backend.get(key)
+        if found is None:
+            return None
+        tags, value, ttl = found
+        self.shared_hits += 1
+        self._put_local(key, tags, value, ttl, generation)
+        return value
+
+    def _store(self, key: str, tags: tuple[str, ...], value: CachedResponse, generation: int) -> None:
+        if self._put_local(key, tags, value, self.ttl, generation) and self.backend is not None:
+            self.backend.set(key, tags, value, self.ttl)
+
+    def _put_local(self, key: str, tags: tuple[str, ...], value: CachedResponse, ttl: float, generation: int) -> bool:
+        with self._lock:
+            if generation != self._generation:
+                self.discarded += 1
+                return False
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, tags, value)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _remove(self, key: str) -> None:
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def _drop(self, tags: Optional[Iterable[str]]) -> None:
+        """Forget the entries under `tags`, or every entry for None."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if tags is None:
+                self._entries.clear()
+                self._keys_by_tag.clear()
+                return
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def invalidate(self, *tags: str) -> None:
+        """
+        Drop the responses showing `tags` in this worker and, through the
+        backend, in every other one. Call it once the write has committed.
+        """
+        if not self.enabled:
+            return
+        self._drop(tags)
+        if self.backend is not None:
+            self.backend.publish(tags)
+
+    def clear(self) -> None:
+        """Drop every response, in every worker."""
+        if not self.enabled:
+            return
+        self._drop(None)
+        if self.backend is not None:
+            self.backend.publish(None)
+
+    def start(self) -> None:
+        if self.enabled and self.backend is not None:
+            self.backend.start()
+
+    def stop(self) -> None:
+        if self.backend is not None:
+            self.backend.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses + self.coalesced
+            stats = {
+                "backend": type(self.backend).__name__ if self.backend is not None else None,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (self.hits + self.shared_hits + self.coalesced) / lookups if lookups else 0.0,
+                "discarded": self.discarded,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+        if self.backend is not None:
+            stats["shared"] = self.backend.stats()
+        return stats
+
+
+def _build_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "database":
+        return DatabaseCacheBackend(compact_interval=settings.RESPONSE_CACHE_COMPACT_INTERVAL)
+    return None
+
+
+response_cache = ResponseCache(
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    backend=_build_backend(),
+    wait_timeout=settings.RESPONSE_CACHE_WAIT_TIMEOUT,
+)
@@ -0,0 +1,183 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Literal, Optional
+
+from app.database import get_async_db
+from app.models.models import Client
+from app.schemas.schemas import ClientBatchCreate, ClientBatchResult, ClientCreate, ClientUpdate, ClientResponse
+from app.auth.deps_async import get_current_user, require_admin
+from app.crud.filters import client_filters
+from app.crud.exports import client_export_query
+from app.crud.versions import client_version
+from app.etag import ETAG_HEADER, weak_etag
+from app.export import ExportFormat, export_response_async
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import CachedResponse, cache_key, client_tags, response_cache
+from app.services.client_batch import create_clients
+
+router = APIRouter(tags=["clients"])
+
+CLIENT = TypeAdapter(ClientResponse)
+CLIENT_LIST = TypeAdapter(List[ClientResponse])
+
+@router.get("/", response_model=List[ClientResponse])
+async def list_clients(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
+    name: Optional[str] = Query(None, description="Filter by client name"),
+    email: Optional[str] = Query(None, description="Filter by client email"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Retrieve a list of clients with optional filters by name and email.
+    Suports pagination using skip and limit.
+    See app.routers.clientes.list_clients.
+    """
+    async def load() -> CachedResponse:
+        query = select(Client).where(*client_filters(name, email))
+        if count:
+            filters = {"name": name, "email": email}
+            await db.run_sync(lambda session: set_total_count(response, session, query, "clients", filters, count))
+        sort_key = (Client.created_at, Client.id)
+        query = seek(query, sort_key, limit, skip, cursor, scope="clients")
+        clients = next_page((await db.execute(query)).scalars().all(), sort_key, limit, "clients", response)
+        response.headers[ETAG_HEADER] = weak_etag([client_version(c) for c in clients], response.headers.get(NEXT_CURSOR_HEADER))
+        return CachedResponse.render(CLIENT_LIST, clients, response)
+
+    key = cache_key(
+        "clients", name=name, email=email, skip=None if cursor else skip, limit=limit, cursor=cursor, count=count,
+    )
+    return (await response_cache.aget_or_load(key, ("clients",), load)).respond(request)
+
+@router.get("/export")
+async def export_clients(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    name: Optional[str] = Query(None, description="Filter by client name"),
+    email: Optional[str] = Query(None, description="Filter by client email"),
+):
+    """
+    Download every client matching the filters, as CSV or NDJSON.
+    See app.routers.clientes.export_clients.
+    """
+    return export_response_async(db, client_export_query(client_filters(name, email)), format, "clients")
+
+@router.post("/", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
+async def create_client(
+    client_in: ClientCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Create a new client.
+    Ensures email and CPF are unique.
+    Requires admin privileges
+    """
+    if (await db.execute(select(Client.id).where(Client.email == client_in.email))).first():
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if (await db.execute(select(Client.id).where(Client.cpf == client_in.cpf))).first():
+        raise HTTPException(status_code=400, detail="CPF already registered")
+
+    client = Client(name=client_in.name, email=client_in.email, cpf=client_in.cpf)
+    db.add(client)
+    try:
+        await db.commit()
+        await db.refresh(client)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email or CPF already registered")
+    response_cache.invalidate(*client_tags(client.id))
+    return client
+
+@router.post("/batch", response_model=ClientBatchResult)
+async def create_clients_batch(
+    batch: ClientBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Create many clients at once.
+    See app.routers.clientes.create_clients_batch.
+    """
+    return await db.run_sync(lambda session: create_clients(session, batch.clients))
+
+@router.get("/{id}", response_model=ClientResponse)
+async def get_client(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    retrieve a specific client's information by ID.
+    """
+    async def load() -> CachedResponse:
+        client = await db.get(Client, id)
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        response.headers[ETAG_HEADER] = weak_etag(client_version(client))
+        return CachedResponse.render(CLIENT, client, response)
+
+    return (await response_cache.aget_or_load(cache_key("client", id=id), (f"client:{id}",), load)).respond(request)
+
+@router.put("/{id}", response_model=ClientResponse)
+async def update_client(
+    id: int,
+    client_in: ClientUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Update an existing client's information by ID.
+    Validates unique email and CPF if update.
+    Requires admin privileges.
+    """
+    client = await db.get(Client, id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    if client_in.email and client_in.email != client.email:
+        if (await db.execute(select(Client.id).where(Client.email == client_in.email))).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+        client.email = client_in.email
+
+    if client_in.cpf and client_in.cpf != client.cpf:
+        if (await db.execute(select(Client.id).where(Client.cpf == client_in.cpf))).first():
+            raise HTTPException(status_code=400, detail="CPF already registered")
+        client.cpf = client_in.cpf
+
+    if client_in.name is not None:
+        client.name = client_in.name
+
+    await db.commit()
+    response_cache.invalidate(*client_tags(id))
+    await db.refresh(client)
+    return client
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_client(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Delete a specific client by ID.
+    Requires admin privileges.
+    """
+    client = await db.get(Client, id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    await db.delete(client)
+    await db.commit()
+    response_cache.invalidate(*client_tags(id))
+    return None
@@ -0,0 +1,239 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Literal, Optional
+from datetime import date
+
+from app.database import get_async_db
+from app.models.models import Order, OrderItem, Product, Client
+from app.schemas.schemas import OrderBatchCreate, OrderBatchResult, OrderCreate, OrderUpdate, OrderResponse
+from app.auth.deps_async import require_user, require_admin
+from app.crud.filters import order_filters
+from app.crud.exports import order_export_query
+from app.crud.stock import reserve_hot_stock, reserve_stock_statement
+from app.crud.versions import order_version_columns, order_version_query
+from app.etag import not_modified, weak_etag
+from app.export import ExportFormat, export_response_async
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import product_tags, response_cache
+from app.services.order_batch import create_orders
+
+router = APIRouter(tags=["orders"])
+
+def _order_with_relations():
+    # Lazy loading is not available under AsyncSession, so everything the
+    # response serializes is loaded up front.
+    return select(Order).options(selectinload(Order.products), selectinload(Order.items), joinedload(Order.client))
+
+async def _load_order(db: AsyncSession, id: int) -> Optional[Order]:
+    result = await db.execute(
+        _order_with_relations().where(Order.id == id).execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+@router.get(
+    "/",
+    response_model=List[OrderResponse],
+    summary="List orders",
+    description="Retrieve a list of orders with optional filter for date range, section, order ID, status, and client.",
+    response_description= "A list of orders matching the filters."
+)
+async def list_orders(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_user),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    section: Optional[str] = Query(None, description="Product section"),
+    order_id: Optional[int] = Query(None, description="Order ID"),
+    status: Optional[str] = Query(None, description="Order status"),
+    client_id: Optional[int] = Query(None, description="Client ID"),
+    skip: int = Query(0, ge=0, description="Records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
+ ):
+    """
+    Retrieve a list of orders from the database with optional filters.
+    See app.routers.orders.list_orders: the page of ids and versions comes
+    first, and the orders are only loaded when the ETag does not match.
+    """
+    query = select(Order.id, Order.created_at).where(*order_filters(start_date, end_date, section, order_id, status, client_id))
+    if count:
+        filters = {
+            "start_date": start_date, "end_date": end_date, "section": section,
+            "order_id": order_id, "status": status, "client_id": client_id,
+        }
+        await db.run_sync(lambda session: set_total_count(response, session, query, "orders", filters, count))
+    sort_key = (Order.created_at, Order.id)
+    page_query = seek(query.add_columns(*order_version_columns()), sort_key, limit, skip, cursor, scope="orders")
+    page = next_page((await db.execute(page_query)).all(), sort_key, limit, "orders", response)
+    etag = weak_etag([tuple(row) for row in page], response.headers.get(NEXT_CURSOR_HEADER))
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+    if not page:
+        return []
+
+    ids = [row.id for row in page]
+    orders = (await db.execute(_order_with_relations().where(Order.id.in_(ids)))).scalars().all()
+    by_id = {order.id: order for order in orders}
+    return [by_id[id] for id in ids if id in by_id]
+
+@router.get("/export")
+async def export_orders(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    section: Optional[str] = Query(None, description="Product section"),
+    order_id: Optional[int] = Query(None, description="Order ID"),
+    status: Optional[str] = Query(None, description="Order status"),
+    client_id: Optional[int] = Query(None, description="Client ID"),
+):
+    """
+    Download every order matching the filters, as CSV or NDJSON.
+    See app.routers.orders.export_orders.
+    """
+    return export_response_async(db, order_export_query(order_filters(start_date, end_date, section, order_id, status, client_id)), format, "orders")
+
+@router.post(
+    "/",
+    response_model=OrderResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a new Order",
+    description="Create a new order for a client with one or more products, each in a given quantity. Reserves the stock.",
+    response_description="The created order.",
+)
+async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_async_db), current_user= Depends(require_admin)):
+    """
+    Create a new order with associated products and client.
+
+    Raises:
+        HTTPException: if the client or any products is not found, or if stock is insufficient.
+    """
+    client = await db.get(Client, order_in.client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    quantities = order_in.quantities()
+    order = Order(client_id=order_in.client_id, status=order_in.status)
+    db.add(order)
+    try:
+        await db.flush()
+        await db.execute(
+            insert(OrderItem),
+            [{"order_id": order.id, "product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()],
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="One or more products not found")
+
+    # Stock is reserved last, so the product rows stay locked only until the commit
+    reserved = set((await db.execute(reserve_stock_statement(quantities))).scalars())
+    if len(reserved) != len(quantities):
+        pending = {p: q for p, q in quantities.items() if p not in reserved}
+        reserved |= await db.run_sync(lambda session: reserve_hot_stock(session, pending))
+    if len(reserved) != len(quantities):
+        await db.rollback()
+        insufficient = sorted(set(quantities) - reserved)
+        raise HTTPException(status_code=400, detail=f"Insufficient stock for products: {insufficient}")
+
+    await db.commit()
+    response_cache.invalidate(*product_tags(*quantities))
+    return await _load_order(db, order.id)
+
+@router.post(
+    "/batch",
+    response_model=OrderBatchResult,
+    summary="Create orders in bulk",
+    description="Create many orders at once; each is accepted or rejected on its own.",
+    response_description="One result per order, in batch order.",
+)
+async def create_orders_batch(batch: OrderBatchCreate, db: AsyncSession = Depends(get_async_db), current_user= Depends(require_admin)):
+    """
+    Create many orders at once.
+    See app.routers.orders.create_orders_batch.
+    """
+    return await db.run_sync(lambda session: create_orders(session, batch.orders))
+
+@router.get(
+    "/{id}",
+    response_model=OrderResponse,
+    summary="Get order by ID",
+    description="Retrieve a specific order by its ID.",
+    response_description="The order with the specified ID."
+)
+async def get_order(id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user= Depends(require_user)):
+    """
+    Retrieve a specific order by its ID.
+    With a matching If-None-Match the answer is a 304, without loading it.
+
+    Raises:
+        HTTPException: if the order is not found.
+    """
+    version = (await db.execute(order_version_query(id))).first()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    unchanged = not_modified(request, response, weak_etag(tuple(version)))
+    if unchanged:
+        return unchanged
+    order = await _load_order(db, id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+@router.put(
+    "/{id}",
+    response_model=OrderResponse,
+    summary="Update order status or products",
+    description="Update the status of an order and/or its products.",
+    response_description="The update order."
+)
+async def update_order(id: int, order_in: OrderUpdate, db: AsyncSession = Depends(get_async_db), current_user= Depends(require_admin)):
+    """
+    Update the status or products of an existing order.
+
+    Raises:
+        HTTPException: if the order or any of the specifies products are not found.
+    """
+    order = await _load_order(db, id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    if order_in.status is not None:
+        order.status = order_in.status
+
+    if order_in.product_ids is not None:
+        products = (await db.execute(select(Product).where(Product.id.in_(order_in.product_ids)))).scalars().all()
+        if len (products) != len(order_in.product_ids):
+            raise HTTPException(status_code=404, detail="One or more products not found")
+        order.products = list(products)
+
+    await db.commit()
+    return await _load_order(db, id)
+
+@router.delete(
+    "/{id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete order",
+    description="Delete an order by its ID.",
+    response_description="No content."
+)
+async def delete_order(id: int, db: AsyncSession = Depends(get_async_db), current_user= Depends(require_admin)):
+    """
+    Delete an order by its ID.
+
+    Raises:
+        HTTPException: if the order is not found.
+    """
+    order = await _load_order(db, id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    await db.delete(order)
+    await db.commit()
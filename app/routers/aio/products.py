@@ -0,0 +1,211 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Literal, Optional
+from decimal import Decimal
+
+from app.database import SessionLocal, get_async_db
+from app.models.models import Product
+from app.schemas.schemas import ProductCreate, ProductUpdate, ProductResponse, ProductImportReport, ProductStockShardsUpdate
+from app.auth.deps_async import require_admin, require_user
+from app.crud.filters import product_filters
+from app.crud.exports import product_export_query
+from app.crud.stock import set_hot_stock_total, set_stock_shards
+from app.crud.versions import product_version
+from app.etag import ETAG_HEADER, weak_etag
+from app.export import ExportFormat, export_response_async
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import CachedResponse, cache_key, product_tags, response_cache
+from app.services.product_import import import_products, read_records, upload_format
+
+import json
+
+router = APIRouter(tags=["products"])
+
+PRODUCT = TypeAdapter(ProductResponse)
+PRODUCT_LIST = TypeAdapter(List[ProductResponse])
+
+@router.get("/", response_model=List[ProductResponse])
+async def list_products(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_user),
+    section: Optional[str] = Query(None, description="Filter by section/category"),
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Maximum price"),
+    available: Optional[bool] = Query(None, description="Only available products (stock > 0)"),
+    skip: int = Query(0, ge=0, description="Number of record to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
+    ):
+    """
+    Retrieve a list of products with optional filters and pagination.
+    See app.routers.products.list_products.
+    """
+    async def load() -> CachedResponse:
+        query = select(Product).where(*product_filters(section, min_price, max_price, available))
+        if count:
+            filters = {"section": section, "min_price": min_price, "max_price": max_price, "available": available}
+            await db.run_sync(lambda session: set_total_count(response, session, query, "products", filters, count))
+        sort_key = (Product.created_at, Product.id)
+        query = seek(query, sort_key, limit, skip, cursor, scope="products")
+        products = next_page((await db.execute(query)).scalars().all(), sort_key, limit, "products", response)
+        response.headers[ETAG_HEADER] = weak_etag([product_version(p) for p in products], response.headers.get(NEXT_CURSOR_HEADER))
+        return CachedResponse.render(PRODUCT_LIST, products, response)
+
+    key = cache_key(
+        "products", section=section, min_price=min_price, max_price=max_price, available=available,
+        skip=None if cursor else skip, limit=limit, cursor=cursor, count=count,
+    )
+    return (await response_cache.aget_or_load(key, ("products",), load)).respond(request)
+
+@router.get("/export")
+async def export_products(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    section: Optional[str] = Query(None, description="Filter by section/category"),
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Maximum price"),
+    available: Optional[bool] = Query(None, description="Only available products (stock > 0)"),
+):
+    """
+    Download every product matching the filters, as CSV or NDJSON.
+    See app.routers.products.export_products.
+    """
+    return export_response_async(db, product_export_query(product_filters(section, min_price, max_price, available)), format, "products")
+
+@router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
+async def create_product(product_in: ProductCreate, db: AsyncSession = Depends(get_async_db), current_user = Depends(require_admin)):
+    """
+    Create a new product.
+    """
+    if (await db.execute(select(Product.id).where(Product.barcode == product_in.barcode))).first():
+        raise HTTPException(status_code=400, detail="Barcode already registered")
+
+    images = json.dumps(product_in.images) if product_in.images else None
+
+    product = Product(
+        description=product_in.description,
+        price=product_in.price,
+        barcode=product_in.barcode,
+        section=product_in.section,
+        stock=product_in.stock,
+        expiry_date=product_in.expiry_date,
+        images=images
+    )
+    db.add(product)
+    try:
+        await db.commit()
+        await db.refresh(product)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Barcode already registered")
+    response_cache.invalidate(*product_tags(product.id))
+    return product
+
+def _import_upload(file, fmt: str) -> dict:
+    # COPY goes through the sync driver, so the import runs on a worker
+    # thread with its own session
+    try:
+        with SessionLocal() as db:
+            return import_products(db, read_records(file, fmt))
+    finally:
+        response_cache.invalidate("products", "product:*")
+
+@router.post("/import", response_model=ProductImportReport)
+async def bulk_import_products(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON (one product per line)"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Upload format; guessed from the file name or content type when omitted"),
+    current_user = Depends(require_admin),
+):
+    """
+    Create or update products in bulk, matched by barcode.
+    See app.routers.products.bulk_import_products.
+    """
+    fmt = format or upload_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unknown upload format; pass format=csv or format=ndjson")
+    return await run_in_threadpool(_import_upload, file.file, fmt)
+
+@router.get("/{id}", response_model=ProductResponse)
+async def get_product(id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user = Depends(require_user)):
+    """Retrieve product details by ID"""
+    async def load() -> CachedResponse:
+        product = await db.get(Product, id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        response.headers[ETAG_HEADER] = weak_etag(product_version(product))
+        return CachedResponse.render(PRODUCT, product, response)
+
+    return (await response_cache.aget_or_load(cache_key("product", id=id), (f"product:{id}", "product:*"), load)).respond(request)
+
+@router.put("/{id}", response_model=ProductResponse)
+async def update_product(id: int, product_in: ProductUpdate, db: AsyncSession = Depends(get_async_db), current_user = Depends(require_admin)):
+    """
+    Update an existing product by ID
+
+    -Checks for barcode duplication
+    -Updates only provided fields
+    """
+    product = await db.get(Product, id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    if product_in.barcode and product_in.barcode != product.barcode:
+        duplicate = await db.execute(
+            select(Product.id).where(Product.barcode == product_in.barcode, Product.id != id)
+        )
+        if duplicate.first():
+            raise HTTPException(status_code=400, detail="Barcode already registered")
+        product.barcode = product_in.barcode
+    if product_in.description is not None:
+        product.description = product_in.description
+    if product_in.price is not None:
+        product.price = product_in.price
+    if product_in.section is not None:
+        product.section = product_in.section
+    if product_in.stock is not None:
+        if product.stock_shards:
+            await db.run_sync(lambda session: set_hot_stock_total(session, id, product_in.stock))
+        else:
+            product.stock = product_in.stock
+    if product_in.expiry_date is not None:
+        product.expiry_date = product_in.expiry_date
+    if product_in.images is not None:
+        product.images = json.dumps(product_in.images)
+    await db.commit()
+    response_cache.invalidate(*product_tags(id))
+    await db.refresh(product)
+    return product
+
+@router.put("/{id}/stock-shards", response_model=ProductResponse)
+async def update_stock_shards(id: int, shards_in: ProductStockShardsUpdate, db: AsyncSession = Depends(get_async_db), current_user = Depends(require_admin)):
+    """
+    Turn sharded stock on or off for a product.
+    See app.routers.products.update_stock_shards.
+    """
+    product = await db.get(Product, id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await db.run_sync(lambda session: set_stock_shards(session, product, shards_in.shards))
+    await db.commit()
+    response_cache.invalidate(*product_tags(id))
+    await db.refresh(product)
+    return product
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_product(id: int, db: AsyncSession = Depends(get_async_db), current_user = Depends(require_admin)):
+    """Delete a product by ID"""
+    product = await db.get(Product, id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    await db.delete(product)
+    await db.commit()
+    response_cache.invalidate(*product_tags(id))
+    return None
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.schemas.schemas import UserResponse, UserUpdate
+from app.crud import user_async as user_crud
+from app.database import get_async_db
+from app.auth.deps_async import require_admin, get_current_user
+from app.auth.principal_cache import Principal
+from app.pagination import next_page
+
+router = APIRouter(
+    tags=["users"],
+)
+
+@router.get("/", response_model=List[UserResponse], dependencies=[Depends(require_admin)])
+async def list_users(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = Query(0, ge=0, description="Records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+):
+    users = await user_crud.list_users(db, limit, skip, cursor)
+    return next_page(users, user_crud.USER_SORT_KEY, limit, "users", response)
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    db_user = await user_crud.get_user_by_id(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not (current_user.is_admin or current_user.id == user_id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return db_user
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    db_user = await user_crud.get_user_by_id(db, user_id)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not (current_user.is_admin or current_user.id == user_id):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Users may edit their own profile, but only an admin grants roles
+    if user_update.role is not None and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can change roles")
+    return await user_crud.update_user(db, user_id, user_update)
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    success = await user_crud.delete_user(db, user_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found")
+    return
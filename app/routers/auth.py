@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 
+from app.config import settings
 from app.database import get_db
 from app.schemas.schemas import UserCreate, UserResponse, TokenRefreshRequest, Token, TokenWithUser
 from app.services.auth import AuthService
@@ -10,16 +11,34 @@ router = APIRouter(tags=["auth"])
 
 auth_service = AuthService()  # Dependência explícita (ou injetável futuramente)
 
+def client_ip(request: Request) -> str | None:
+    """
+    Source address of the request, honouring X-Forwarded-For only when the
+    deployment sits behind a trusted proxy.
+    """
+    if settings.LOGIN_THROTTLE_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED, operation_id="register_custom")
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: Session = Depends(get_db)):
     try:
-        return auth_service.register_user(db, user_in)
+        return await auth_service.register_user(db, user_in)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/login", response_model=TokenWithUser, operation_id="login_custom")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    tokens = auth_service.login_user(db, form_data.username, form_data.password)
+async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+):
+    tokens = await auth_service.login_user(
+        db, form_data.username, form_data.password, client_ip(request), background_tasks
+    )
     if not tokens:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return tokens
@@ -30,3 +49,8 @@ def refresh_token(payload: TokenRefreshRequest, db: Session = Depends(get_db)):
     if not token:
         raise HTTPException(status_code=401, detail="Invalid refresh token or user")
     return token
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, operation_id="logout_custom")
+def logout(payload: TokenRefreshRequest):
+    auth_service.revoke_refresh_token(payload.refresh_token)
+    return None
@@ -1,34 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from app.database import get_db
 from app.models.models import Client
-from app.schemas.schemas import ClientCreate, ClientUpdate, ClientResponse
-from app.auth.deps import get_current_user, require_admin
+from app.schemas.schemas import ClientBatchCreate, ClientBatchResult, ClientCreate, ClientUpdate, ClientResponse
+from app.auth.deps import get_cached_read_db, get_current_user, get_read_db, require_admin
+from app.crud.filters import client_filters
+from app.crud.exports import client_export_query
+from app.crud.versions import client_version
+from app.etag import ETAG_HEADER, weak_etag
+from app.export import ExportFormat, export_response
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import CachedResponse, cache_key, client_tags, response_cache
+from app.services.client_batch import create_clients
 
 router = APIRouter(tags=["clients"])
 
+CLIENT = TypeAdapter(ClientResponse)
+CLIENT_LIST = TypeAdapter(List[ClientResponse])
+
 @router.get("/", response_model=List[ClientResponse])
 def list_clients(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
     name: Optional[str] = Query(None, description="Filter by client name"),
     email: Optional[str] = Query(None, description="Filter by client email"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_cached_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Retrieve a list of clients with optional filters by name and email.
-    Suports pagination using skip and limit.
+    Suports pagination using skip and limit, or with the cursor returned in
+    the X-Next-Cursor header of the previous page. With count=exact or
+    count=estimated the total is returned in the X-Total-Count header.
+    The page carries a weak ETag; a request whose If-None-Match still
+    matches gets a 304 without a body. Pages are served from the response
+    cache until a client write invalidates them.
+    """
+    def load() -> CachedResponse:
+        query = db.query(Client).filter(*client_filters(name, email))
+        if count:
+            filters = {"name": name, "email": email}
+            set_total_count(response, db, query, "clients", filters, count)
+        sort_key = (Client.created_at, Client.id)
+        clients = seek(query, sort_key, limit, skip, cursor, scope="clients").all()
+        clients = next_page(clients, sort_key, limit, "clients", response)
+        response.headers[ETAG_HEADER] = weak_etag([client_version(c) for c in clients], response.headers.get(NEXT_CURSOR_HEADER))
+        return CachedResponse.render(CLIENT_LIST, clients, response)
+
+    key = cache_key(
+        "clients", name=name, email=email, skip=None if cursor else skip, limit=limit, cursor=cursor, count=count,
+    )
+    return response_cache.get_or_load(key, ("clients",), load).respond(request)
+
+@router.get("/export")
+def export_clients(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    name: Optional[str] = Query(None, description="Filter by client name"),
+    email: Optional[str] = Query(None, description="Filter by client email"),
+):
+    """
+    Download every client matching the filters, as CSV or NDJSON.
+
+    Takes the same filters as the listing, without pagination: the rows come
+    from a single query through a server-side cursor and are streamed as
+    they are read, so the download starts at once whatever its size.
     """
-    query = db.query(Client)
-    if name:
-        query = query.filter(Client.name.ilike(f"%{name}%"))
-    if email:
-        query = query.filter(Client.email.ilike(f"%{email}%"))
-    return query.offset(skip).limit(limit).all()
+    return export_response(db, client_export_query(client_filters(name, email)), format, "clients")
 
 @router.post("/", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
 def create_client(
@@ -54,21 +101,45 @@ def create_client(
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Email or CPF already registered")
+    response_cache.invalidate(*client_tags(client.id))
     return client
 
+@router.post("/batch", response_model=ClientBatchResult)
+def create_clients_batch(
+    batch: ClientBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Create many clients at once, e.g. from an imported lead list.
+    Rows with an invalid CPF or email, repeated within the batch, or already
+    registered are skipped and listed in `errors` with their position in
+    the batch; the others are created.
+    Requires admin privileges
+    """
+    return create_clients(db, batch.clients)
+
 @router.get("/{id}", response_model=ClientResponse)
 def get_client(
     id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_cached_read_db),
     current_user: dict = Depends(get_current_user)
 ):
     """
     retrieve a specific client's information by ID.
+    Carries a weak ETag; with a matching If-None-Match the answer is a 304.
+    Served from the response cache while the client is unchanged.
     """
-    client = db.query(Client).filter(Client.id == id).first()
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found")
-    return client
+    def load() -> CachedResponse:
+        client = db.query(Client).filter(Client.id == id).first()
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        response.headers[ETAG_HEADER] = weak_etag(client_version(client))
+        return CachedResponse.render(CLIENT, client, response)
+
+    return response_cache.get_or_load(cache_key("client", id=id), (f"client:{id}",), load).respond(request)
 
 @router.put("/{id}", response_model=ClientResponse)
 def update_client(
@@ -100,6 +171,7 @@ def update_client(
         client.name = client_in.name
         
     db.commit()
+    response_cache.invalidate(*client_tags(id))
     db.refresh(client)
     return client
 
@@ -118,4 +190,5 @@ def delete_clint(
         raise HTTPException(status_code=404, detail="Client not found")
     db.delete(client)
     db.commit()
+    response_cache.invalidate(*client_tags(id))
     return None
\ No newline at end of file
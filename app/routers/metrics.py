@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+
+from app.auth.principal_cache import principal_cache
+from app.auth.token_versions import token_versions
+from app.auth.revocation import revocation_store
+from app.auth.throttle import login_throttle
+from app.services.hashing import hashing_pool
+from app.services.stock_consolidator import stock_consolidator
+from app.db_pool import pool_telemetry
+from app.database import replica_router
+from app.pagination import total_counter
+from app.idempotency import idempotency_store
+from app.response_cache import response_cache
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/")
+def get_metrics():
+    """
+    Per-worker runtime counters, meant to be scraped by monitoring.
+    Requires admin privileges (mounted behind require_admin in app.main).
+    """
+    return {
+        "principal_cache": principal_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "refresh_revocations": revocation_store.stats(),
+        "login_throttle": login_throttle.stats(),
+        "hashing_pool": hashing_pool.stats(),
+        "db_pool": pool_telemetry.stats(),
+        "replicas": replica_router.stats(),
+        "total_counts": total_counter.stats(),
+        "stock_consolidator": stock_consolidator.stats(),
+        "idempotency": idempotency_store.stats(),
+        "response_cache": response_cache.stats(),
+    }
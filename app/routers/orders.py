@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
-from typing import List, Optional
-from datetime import datetime, date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, insert
+from sqlalchemy.exc import IntegrityError
+from typing import List, Literal, Optional
+from datetime import date
 
 from app.database import get_db
-from app.models.models import Order, Product, Client
-from app.schemas.schemas import OrderCreate, OrderUpdate, OrderResponse
-from app.auth.deps import require_user, require_admin
+from app.models.models import Order, OrderItem, Product, Client
+from app.schemas.schemas import OrderBatchCreate, OrderBatchResult, OrderCreate, OrderUpdate, OrderResponse
+from app.auth.deps import get_read_db, require_user, require_admin
+from app.crud.filters import order_filters
+from app.crud.exports import order_export_query
+from app.crud.stock import reserve_hot_stock, reserve_stock_statement
+from app.crud.versions import order_version_columns, order_version_query
+from app.etag import not_modified, weak_etag
+from app.export import ExportFormat, export_response
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import product_tags, response_cache
+from app.services.order_batch import create_orders
 
 router = APIRouter(tags=["orders"])
 
@@ -19,7 +29,9 @@ router = APIRouter(tags=["orders"])
     response_description= "A list of orders matching the filters."
 )
 def list_orders(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user = Depends(require_user),
     start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
@@ -29,6 +41,8 @@ def list_orders(
     client_id: Optional[int] = Query(None, description="Client ID"),
     skip: int = Query(0, ge=0, description="Records to skip"),
     limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
  ):
     """
     Retrieve a list of orders from the database with optional filters.
@@ -43,40 +57,88 @@ def list_orders(
         client_id (Optional[int]): Filter by client ID.
         skip (int): Number of records to skip.
         limit(int): Maximum number of records to return.
+        cursor (Optional[str]): Continue after the previous page (takes precedence over skip).
+        count (Optional[str]): "exact" or "estimated" total in the X-Total-Count header.
         
     Returns:
-        List[OrderResponse]: A list of orders matching the filters.
+        List[OrderResponse]: A list of orders matching the filters. When more
+        orders follow, the cursor for the next page is returned in the
+        X-Next-Cursor header. The page carries a weak ETag; with a matching
+        If-None-Match the answer is a 304, and phase 2 is skipped.
     """
-    query = db.query(Order).options(
-        joinedload(Order.products),
-        joinedload(Order.client)
+    # Phase 1: the page of order ids, with their versions for the ETag.
+    # Filtering on section with EXISTS keeps one row per order, so LIMIT
+    # counts orders rather than order lines.
+    query = db.query(Order.id, Order.created_at).filter(
+        *order_filters(start_date, end_date, section, order_id, status, client_id)
     )
-    if order_id:
-        query = query.filter(Order.id == order_id)
-    if status:
-        query = query.filter(Order.status == status)
-    if client_id:
-        query = query.filter(Order.client_id == client_id)
-    if start_date:
-        query = query.filter(Order.created_at >= datetime.combine(start_date, datetime.min.time()))
-    if end_date:
-        query = query.filter(Order.created_at <= datetime.combine(end_date, datetime.max.time()))
-    if section:
-        query = query.join(Order.products).filter(Product.section == section)
-    return query.offset(skip).limit(limit).all()
+    if count:
+        filters = {
+            "start_date": start_date, "end_date": end_date, "section": section,
+            "order_id": order_id, "status": status, "client_id": client_id,
+        }
+        set_total_count(response, db, query, "orders", filters, count)
+    sort_key = (Order.created_at, Order.id)
+    query = query.add_columns(*order_version_columns())
+    page = next_page(seek(query, sort_key, limit, skip, cursor, scope="orders").all(), sort_key, limit, "orders", response)
+    etag = weak_etag([tuple(row) for row in page], response.headers.get(NEXT_CURSOR_HEADER))
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+    if not page:
+        return []
+
+    # Phase 2: those orders with their products, items and clients, one IN query each
+    ids = [row.id for row in page]
+    orders = (
+        db.query(Order)
+        .options(selectinload(Order.products), selectinload(Order.items), selectinload(Order.client))
+        .filter(Order.id.in_(ids))
+        .all()
+    )
+    by_id = {order.id: order for order in orders}
+    return [by_id[id] for id in ids if id in by_id]
+
+@router.get("/export")
+def export_orders(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(require_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    start_date: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="End date (YYYY-MM-DD)"),
+    section: Optional[str] = Query(None, description="Product section"),
+    order_id: Optional[int] = Query(None, description="Order ID"),
+    status: Optional[str] = Query(None, description="Order status"),
+    client_id: Optional[int] = Query(None, description="Client ID"),
+):
+    """
+    Download every order matching the filters, as CSV or NDJSON.
+
+    Takes the same filters as the listing, without pagination: the rows come
+    from a single query through a server-side cursor and are streamed as
+    they are read, so the download starts at once whatever its size.
+    Orders carry their lines as product_ids with matching quantities.
+    """
+    return export_response(db, order_export_query(order_filters(start_date, end_date, section, order_id, status, client_id)), format, "orders")
 
 @router.post(
     "/",
     response_model=OrderResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new Order",
-    description="Create a new order for a client with one or more products. Validates stock availability.",
+    description="Create a new order for a client with one or more products, each in a given quantity. Reserves the stock.",
     response_description="The created order.",
 )
 def create_order(order_in: OrderCreate, db: Session = Depends(get_db), current_user= Depends(require_admin)):
     """
     Create a new order with associated products and client.
-    
+
+    Lines come from `items` (product and quantity) and/or `product_ids` (one
+    unit each). The stock of every product is decremented in a single
+    conditional UPDATE, hot products (sharded stock) from one of their
+    shards; if any product lacks the quantity, nothing is reserved and the
+    order is not created.
+
     Args:
         order_ir (OrderCreate): Input data for the new order.
         db(session): SQLAlchemy database session.
@@ -90,28 +152,54 @@ def create_order(order_in: OrderCreate, db: Session = Depends(get_db), current_u
     client = db.query(Client).filter(Client.id == order_in.client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    
-    products = db.query(Product).filter(Product.id.in_(order_in.product_ids)).with_for_update().all()
-    if len(products) != len(order_in.product_ids):
+
+    quantities = order_in.quantities()
+    order = Order(client_id=order_in.client_id, status=order_in.status)
+    db.add(order)
+    try:
+        db.flush()
+        db.execute(
+            insert(OrderItem),
+            [{"order_id": order.id, "product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()],
+        )
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=404, detail="One or more products not found")
-    
-    insufficient = [p.id for p in products if p.stock < 1]
-    if insufficient:
+
+    # Stock is reserved last, so the product rows stay locked only until the commit
+    reserved = set(db.execute(reserve_stock_statement(quantities)).scalars())
+    if len(reserved) != len(quantities):
+        reserved |= reserve_hot_stock(db, {p: q for p, q in quantities.items() if p not in reserved})
+    if len(reserved) != len(quantities):
+        db.rollback()
+        insufficient = sorted(set(quantities) - reserved)
         raise HTTPException(status_code=400, detail=f"Insufficient stock for products: {insufficient}")
-    
-    for p in products:
-        p.stock -=1
-        
-    order = Order(
-        client_id=order_in.client_id,
-        status=order_in.status,
-        products=products
-    )
-    db.add(order)
+
     db.commit()
+    response_cache.invalidate(*product_tags(*quantities))
     db.refresh(order)
     return order
 
+@router.post(
+    "/batch",
+    response_model=OrderBatchResult,
+    summary="Create orders in bulk",
+    description="Create many orders at once; each is accepted or rejected on its own.",
+    response_description="One result per order, in batch order.",
+)
+def create_orders_batch(batch: OrderBatchCreate, db: Session = Depends(get_db), current_user= Depends(require_admin)):
+    """
+    Create many orders at once, e.g. a burst uploaded by a POS terminal
+    after a connectivity drop.
+
+    Each order takes the same fields as POST /orders/. Orders are handled in
+    batch order within one transaction: one with an invalid payload, an
+    unknown client or product, or not enough stock left is rejected with its
+    reason and reserves nothing; the others are created.
+    Requires admin privileges.
+    """
+    return create_orders(db, batch.orders)
+
 @router.get(
     "/{id}",
     response_model=OrderResponse,
@@ -119,9 +207,13 @@ def create_order(order_in: OrderCreate, db: Session = Depends(get_db), current_u
     description="Retrieve a specific order by its ID.",
     response_description="The order with the specified ID."
 )
-def get_order(id: int, db: Session = Depends(get_db), current_user= Depends(require_user)):
+def get_order(id: int, request: Request, response: Response, db: Session = Depends(get_read_db), current_user= Depends(require_user)):
     """
     Retrieve a specific order by its ID.
+
+    The weak ETag comes from a single-row query over the order's, client's
+    and lines' versions; with a matching If-None-Match the answer is a 304
+    and the order, its products and client are never loaded.
     
     Args:
         id (int): ID of the order.
@@ -133,8 +225,16 @@ def get_order(id: int, db: Session = Depends(get_db), current_user= Depends(requ
     Returns:
         OrderResponse: The order data.
     """
+    version = db.execute(order_version_query(id)).first()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    unchanged = not_modified(request, response, weak_etag(tuple(version)))
+    if unchanged:
+        return unchanged
+
     order = db.query(Order).options(
         joinedload(Order.products),
+        selectinload(Order.items),
         joinedload(Order.client)
     ).filter(Order.id == id).first()
     
@@ -1,21 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import List, Literal, Optional
 from decimal import Decimal
 
 from app.database import get_db
 from app.models.models import Product
-from app.schemas.schemas import ProductCreate, ProductUpdate, ProductResponse
-from app.auth.deps import get_current_user, require_admin, require_user
+from app.schemas.schemas import ProductCreate, ProductUpdate, ProductResponse, ProductImportReport, ProductStockShardsUpdate
+from app.auth.deps import get_cached_read_db, get_current_user, get_read_db, require_admin, require_user
+from app.crud.filters import product_filters
+from app.crud.exports import product_export_query
+from app.crud.stock import set_hot_stock_total, set_stock_shards
+from app.crud.versions import product_version
+from app.etag import ETAG_HEADER, weak_etag
+from app.export import ExportFormat, export_response
+from app.pagination import NEXT_CURSOR_HEADER, next_page, seek, set_total_count
+from app.response_cache import CachedResponse, cache_key, product_tags, response_cache
+from app.services.product_import import import_products, read_records, upload_format
 
 import json
 
 router = APIRouter(tags=["products"])
 
+PRODUCT = TypeAdapter(ProductResponse)
+PRODUCT_LIST = TypeAdapter(List[ProductResponse])
+
 @router.get("/", response_model=List[ProductResponse])
 def list_products(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_cached_read_db),
     current_user = Depends(require_user),
     section: Optional[str] = Query(None, description="Filter by section/category"),
     min_price: Optional[Decimal] = Query(None, ge=0, description="Minimum price"),
@@ -23,6 +38,8 @@ def list_products(
     available: Optional[bool] = Query(None, description="Only available products (stock > 0)"),
     skip: int = Query(0, ge=0, description="Number of record to skip"),
     limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    count: Optional[Literal["exact", "estimated"]] = Query(None, description="Return the total in X-Total-Count: exact (capped) or estimated"),
     ):
     """
     Retrieve a list of products with optional filters and pagination.
@@ -33,21 +50,51 @@ def list_products(
     -available: Only products in stock
     -skip: Records to skip
     -limit: Max records to return
+    -cursor: Continue after the previous page (takes precedence over skip)
+    -count: "exact" or "estimated" total in the X-Total-Count header
+
+    When more products follow, the cursor for the next page is returned in
+    the X-Next-Cursor header. The page carries a weak ETag; a request whose
+    If-None-Match still matches gets a 304 without a body.
+
+    Pages are served from the response cache until a product write or an
+    order's stock reservation invalidates them.
     """
-    query = db.query(Product)
-    if section:
-        query = query.filter(Product.section == section)
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
-    if available is not None:
-        if available:
-            query = query.filter(Product.stock > 0)
-        else:
-            query = query.filter(Product.stock <= 0)
-    products = query.offset(skip).limit(limit).all()
-    return products
+    def load() -> CachedResponse:
+        query = db.query(Product).filter(*product_filters(section, min_price, max_price, available))
+        if count:
+            filters = {"section": section, "min_price": min_price, "max_price": max_price, "available": available}
+            set_total_count(response, db, query, "products", filters, count)
+        sort_key = (Product.created_at, Product.id)
+        products = seek(query, sort_key, limit, skip, cursor, scope="products").all()
+        products = next_page(products, sort_key, limit, "products", response)
+        response.headers[ETAG_HEADER] = weak_etag([product_version(p) for p in products], response.headers.get(NEXT_CURSOR_HEADER))
+        return CachedResponse.render(PRODUCT_LIST, products, response)
+
+    key = cache_key(
+        "products", section=section, min_price=min_price, max_price=max_price, available=available,
+        skip=None if cursor else skip, limit=limit, cursor=cursor, count=count,
+    )
+    return response_cache.get_or_load(key, ("products",), load).respond(request)
+
+@router.get("/export")
+def export_products(
+    db: Session = Depends(get_read_db),
+    current_user = Depends(require_user),
+    format: ExportFormat = Query("ndjson", description="csv or ndjson"),
+    section: Optional[str] = Query(None, description="Filter by section/category"),
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Maximum price"),
+    available: Optional[bool] = Query(None, description="Only available products (stock > 0)"),
+):
+    """
+    Download every product matching the filters, as CSV or NDJSON.
+
+    Takes the same filters as the listing, without pagination: the rows come
+    from a single query through a server-side cursor and are streamed as
+    they are read, so the download starts at once whatever its size.
+    """
+    return export_response(db, product_export_query(product_filters(section, min_price, max_price, available)), format, "products")
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 def create_product(product_in: ProductCreate, db: Session = Depends(get_db), current_user = Depends(require_admin)):
@@ -86,15 +133,50 @@ def create_product(product_in: ProductCreate, db: Session = Depends(get_db), cur
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Barcode already registered")
+    response_cache.invalidate(*product_tags(product.id))
     return product
 
+@router.post("/import", response_model=ProductImportReport)
+def bulk_import_products(
+    file: UploadFile = File(..., description="CSV with a header row, or NDJSON (one product per line)"),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Upload format; guessed from the file name or content type when omitted"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin),
+):
+    """
+    Create or update products in bulk, matched by barcode.
+
+    Fields are the same as for creating a product. Rows are loaded in chunks,
+    one transaction per chunk; invalid rows are skipped and listed in the
+    report with their row number, so a partly bad file still loads the rest.
+    Requires admin privileges.
+    """
+    fmt = format or upload_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unknown upload format; pass format=csv or format=ndjson")
+    try:
+        return import_products(db, read_records(file.file, fmt))
+    finally:
+        # Chunks commit as they go, and any product may be among them
+        response_cache.invalidate("products", "product:*")
+
 @router.get("/{id}", response_model=ProductResponse)
-def get_product(id: int, db: Session = Depends(get_db), current_user = Depends(require_user)):
-    """Retrieve product details by ID"""
-    product = db.query(Product).filter(Product.id == id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+def get_product(id: int, request: Request, response: Response, db: Session = Depends(get_cached_read_db), current_user = Depends(require_user)):
+    """
+    Retrieve product details by ID.
+
+    Carries a weak ETag; with a matching If-None-Match the answer is a 304
+    without a body. Served from the response cache while the product is
+    unchanged.
+    """
+    def load() -> CachedResponse:
+        product = db.query(Product).filter(Product.id == id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        response.headers[ETAG_HEADER] = weak_etag(product_version(product))
+        return CachedResponse.render(PRODUCT, product, response)
+
+    return response_cache.get_or_load(cache_key("product", id=id), (f"product:{id}", "product:*"), load).respond(request)
 
 @router.put("/{id}", response_model=ProductResponse)
 def update_product(id: int, product_in: ProductUpdate, db: Session = Depends(get_db), current_user = Depends(require_admin)):
@@ -119,12 +201,36 @@ def update_product(id: int, product_in: ProductUpdate, db: Session = Depends(get
     if product_in.section is not None:
         product.section = product_in.section
     if product_in.stock is not None:
-        product.stock = product_in.stock
+        if product.stock_shards:
+            set_hot_stock_total(db, id, product_in.stock)
+        else:
+            product.stock = product_in.stock
     if product_in.expiry_date is not None:
         product.expiry_date = product_in.expiry_date
     if product_in.images is not None:
         product.images = json.dumps(product_in.images)
     db.commit()
+    response_cache.invalidate(*product_tags(id))
+    db.refresh(product)
+    return product
+
+@router.put("/{id}/stock-shards", response_model=ProductResponse)
+def update_stock_shards(id: int, shards_in: ProductStockShardsUpdate, db: Session = Depends(get_db), current_user = Depends(require_admin)):
+    """
+    Turn sharded stock on or off for a product.
+
+    A hot product (shards > 0) has its stock split across that many
+    sub-counters, so concurrent orders decrement different rows instead of
+    queueing on one; reads still return the total. The stock is kept as is
+    when switching, and shards=0 folds it back into the product row.
+    Requires admin privileges.
+    """
+    product = db.query(Product).filter(Product.id == id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    set_stock_shards(db, product, shards_in.shards)
+    db.commit()
+    response_cache.invalidate(*product_tags(id))
     db.refresh(product)
     return product
 
@@ -136,4 +242,5 @@ def delete_product(id: int, db: Session = Depends(get_db), current_user = Depend
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(product)
     db.commit()
+    response_cache.invalidate(*product_tags(id))
     return None
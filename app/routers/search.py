@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.crud.search import MIN_QUERY_LENGTH, search_clients_query, search_products_query
+from app.schemas.schemas import ClientResponse, ProductResponse, SearchResults
+from app.auth.deps import get_read_db, require_user
+
+router = APIRouter(tags=["search"])
+
+@router.get("/", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=100, description="Text contained in a client name or email, or a product description"),
+    skip: int = Query(0, ge=0, description="Number of records to skip in each list"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return in each list"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(require_user),
+):
+    """
+    Search clients and products at once, closest matches first in each list.
+    Suports pagination using skip and limit.
+    """
+    return {
+        "clients": db.execute(search_clients_query(q, limit, skip)).scalars().all(),
+        "products": db.execute(search_products_query(q, limit, skip)).scalars().all(),
+    }
+
+@router.get("/clients", response_model=List[ClientResponse])
+def search_clients(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=100, description="Text contained in the client name or email"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(require_user),
+):
+    """
+    Search clients by name or email, closest matches first.
+    Suports pagination using skip and limit.
+    """
+    return db.execute(search_clients_query(q, limit, skip)).scalars().all()
+
+@router.get("/products", response_model=List[ProductResponse])
+def search_products(
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=100, description="Text contained in the product description"),
+    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return"),
+    db: Session = Depends(get_read_db),
+    current_user = Depends(require_user),
+):
+    """
+    Search products by description, closest matches first.
+    Suports pagination using skip and limit.
+    """
+    return db.execute(search_products_query(q, limit, skip)).scalars().all()
@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.schemas.schemas import UserResponse, UserUpdate
 from app.crud import user as user_crud
-from app.auth.deps import get_db, require_admin, require_user, get_current_user
-from app.models.models import User
+from app.database import get_db
+from app.auth.deps import get_read_db, require_admin, require_user, get_current_user
+from app.auth.principal_cache import Principal
+from app.pagination import next_page
 
 router = APIRouter(
     tags=["users"],
 )
 
 @router.get("/", response_model=List[UserResponse], dependencies=[Depends(require_admin)])
-def list_users(db: Session = Depends(get_db)):
-    return user_crud.list_users(db)
+def list_users(
+    response: Response,
+    db: Session = Depends(get_read_db),
+    skip: int = Query(0, ge=0, description="Records to skip"),
+    limit: int = Query(10, ge=1, le=100, description="Max records to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+):
+    users = user_crud.list_users(db, limit, skip, cursor)
+    return next_page(users, user_crud.USER_SORT_KEY, limit, "users", response)
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user),
 ):
     db_user = user_crud.get_user_by_id(db, user_id)
     if not db_user:
@@ -33,13 +42,16 @@ def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     db_user = user_crud.get_user_by_id(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not (current_user.is_admin() or current_user.id == user_id):
+    if not (current_user.is_admin or current_user.id == user_id):
         raise HTTPException(status_code=403, detail="Not authorized")
+    # Users may edit their own profile, but only an admin grants roles
+    if user_update.role is not None and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can change roles")
     updated_user = user_crud.update_user(db, user_id, user_update)
     return updated_user
 
@@ -1,7 +1,8 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import date, datetime
-from pydantic import BaseModel, EmailStr, field_validator
-from app.models.models import UserRole as UserRoleEnum
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, field_validator, model_validator
+from app.config import settings
+from app.models.models import MAX_STOCK_SHARDS, UserRole as UserRoleEnum
 from enum import Enum
 from decimal import Decimal
 import json
@@ -67,6 +68,21 @@ class ClientResponse(ClientBase):
     class Config:
         from_attributes = True
 
+class ClientBatchCreate(BaseModel):
+    # Validated one by one against ClientCreate, so a bad row is reported
+    # instead of rejecting the whole batch
+    clients: List[Dict[str, Any]] = Field(..., min_length=1, max_length=settings.CLIENT_BATCH_MAX_SIZE)
+
+class ClientBatchError(BaseModel):
+    row: int  # 0-based index in the batch
+    email: Optional[str] = None
+    cpf: Optional[str] = None
+    error: str
+
+class ClientBatchResult(BaseModel):
+    created: List[ClientResponse]
+    errors: List[ClientBatchError]
+
 
 # PRODUCT SCHEMAS
 
@@ -93,6 +109,9 @@ class ProductUpdate(BaseModel):
 
 class ProductResponse(ProductBase):
     id: int
+    # Current stock: the sum of the shards for a hot product
+    stock: int = Field(validation_alias=AliasChoices("available_stock", "stock"))
+    stock_shards: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -115,6 +134,24 @@ class ProductResponse(ProductBase):
             Decimal: lambda v: str(v)
         }
 
+class ProductStockShardsUpdate(BaseModel):
+    shards: int = Field(ge=0, le=MAX_STOCK_SHARDS, description="0 for plain stock, N to split it across N shards")
+
+class ProductImportError(BaseModel):
+    row: int  # 1-based position in the upload, CSV header not counted
+    barcode: Optional[str] = None
+    error: str
+
+class ProductImportReport(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+    unchanged: int
+    superseded: int  # replaced by a later row with the same barcode
+    failed: int
+    errors: List[ProductImportError]
+    errors_truncated: bool = False
+
 
 # ORDER SCHEMAS
 
@@ -128,10 +165,33 @@ class OrderBase(BaseModel):
     client_id: int
     status: OrderStatusEnum
 
+class OrderItem(BaseModel):
+    product_id: int
+    quantity: int = Field(1, ge=1)
+
+    class Config:
+        from_attributes = True
+
 class OrderCreate(OrderBase):
     client_id: int
     status: str
-    product_ids: List[int]
+    product_ids: List[int] = []  # one unit of each
+    items: List[OrderItem] = []
+
+    @model_validator(mode="after")
+    def require_lines(self):
+        if not self.product_ids and not self.items:
+            raise ValueError("An order needs product_ids or items")
+        return self
+
+    def quantities(self) -> dict[int, int]:
+        """Units per product id, adding up repeated products."""
+        quantities: dict[int, int] = {}
+        for product_id in self.product_ids:
+            quantities[product_id] = quantities.get(product_id, 0) + 1
+        for item in self.items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        return quantities
 
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatusEnum] = None
@@ -142,11 +202,35 @@ class OrderResponse(OrderBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     products: List[ProductResponse]
+    items: List[OrderItem] = []
     client: ClientResponse
 
     class Config:
         from_attributes = True
 
+class OrderBatchCreate(BaseModel):
+    # Validated one by one against OrderCreate, so a bad order is reported
+    # instead of rejecting the whole batch
+    orders: List[Dict[str, Any]] = Field(..., min_length=1, max_length=settings.ORDER_BATCH_MAX_SIZE)
+
+class OrderBatchOutcome(BaseModel):
+    row: int  # 0-based index in the batch
+    order: Optional[OrderResponse] = None
+    error: Optional[str] = None
+
+class OrderBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchOutcome]
+
+
+# SEARCH SCHEMAS
+
+class SearchResults(BaseModel):
+    # Each list is ranked and paginated on its own
+    clients: List[ClientResponse]
+    products: List[ProductResponse]
+
 
 # AUTH SCHEMAS
 
@@ -1,51 +1,139 @@
 # app/services/auth.py
-from app.auth.jwt import create_access_token, create_refresh_token,verify_token
-from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
-from fastapi import HTTPException, status
+from app.auth.jwt import REFRESH_TOKEN, create_access_token, create_refresh_token, verify_token
+from datetime import datetime, timezone
+from fastapi import BackgroundTasks, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from app.database import SessionLocal
 from app.crud import user as user_crud
+from app.services.hashing import hashing_pool, HashingPoolSaturated
+from app.auth.revocation import revocation_store
+from app.auth.throttle import login_throttle, LoginThrottled
 from app.schemas.schemas import UserCreate, UserLogin, Token
 from app.models.models import User
-import os
-from dotenv import load_dotenv
+import logging
+import math
+import uuid
 
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY", "segredo-sombrio")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+logger = logging.getLogger(__name__)
 
 class AuthService:
-    def create_access_token(self, data: dict, expires_delta: timedelta | None = None):
-        to_encode = data.copy()
-        expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-        to_encode.update({"exp": expire})
-        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    def _access_claims(self, user: User) -> dict:
+        # Self-contained claims let AUTH_MODE=claims authorize without a user lookup
+        return {
+            "sub": str(user.id),
+            "role": user.role.value,
+            "active": user.is_active,
+            "token_version": user.token_version,
+        }
+
+    def _refresh_claims(self, user: User) -> dict:
+        # Every refresh token gets its own jti so it can be consumed exactly once
+        return {
+            "sub": str(user.id),
+            "token_version": user.token_version,
+            "jti": uuid.uuid4().hex,
+        }
+
+    def _consume_refresh_token(self, payload: dict) -> bool:
+        try:
+            return revocation_store.consume(
+                payload["jti"],
+                int(payload["sub"]),
+                datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            )
+        except RuntimeError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente",
+                headers={"Retry-After": "1"},
+            )
+
+    async def _run_hashing(self, job):
+        try:
+            return await job
+        except HashingPoolSaturated:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente",
+                headers={"Retry-After": "1"},
+            )
 
-    def authenticate_user(self, db: Session, email: str, password: str) -> User | None:
-        user = user_crud.get_user_by_email(db, email)
-        if not user or not user_crud.verify_password(password, user.hashed_password):
+    async def authenticate_user(
+        self, db: Session, email: str, password: str, background_tasks: BackgroundTasks | None = None
+    ) -> User | None:
+        user = await run_in_threadpool(user_crud.get_user_by_email, db, email)
+        if not user:
             return None
+        matches, needs_update = await self._run_hashing(hashing_pool.verify(password, user.hashed_password))
+        if not matches:
+            return None
+        if needs_update and background_tasks is not None:
+            # Upgrade outdated hashes after the login response has been sent
+            background_tasks.add_task(self._rehash_password, user.id, user.hashed_password, password)
         return user
 
-    def register_user(self, db: Session, user_data: UserCreate) -> User:
-        existing_user = user_crud.get_user_by_email(db, user_data.email)
+    async def _rehash_password(self, user_id: int, old_hash: str, password: str) -> None:
+        try:
+            hashed_password = await hashing_pool.hash(password)
+            await run_in_threadpool(self._store_password_hash, user_id, old_hash, hashed_password)
+        except Exception:
+            # Best effort: the old hash still verifies and will be retried next login
+            logger.exception("Failed to rehash password for user %s", user_id)
+
+    def _store_password_hash(self, user_id: int, old_hash: str, hashed_password: str) -> None:
+        with SessionLocal() as db:
+            if not user_crud.update_password_hash(db, user_id, old_hash, hashed_password):
+                # The password changed since this login verified it; keep the new one
+                logger.info("Skipped rehash for user %s: password changed meanwhile", user_id)
+
+    async def register_user(self, db: Session, user_data: UserCreate) -> User:
+        existing_user = await run_in_threadpool(user_crud.get_user_by_email, db, user_data.email)
         if existing_user:
             raise ValueError("Usuário já existe")
-        return user_crud.create_user(db, user_data)
+        hashed_password = await self._run_hashing(hashing_pool.hash(user_data.password))
+        return await run_in_threadpool(user_crud.create_user, db, user_data, hashed_password)
     
 
-    def login_user(self, db: Session, email: str, password: str):
-        user = self.authenticate_user(db, email, password)
+    async def _check_login_throttle(self, email: str, client_ip: str | None) -> None:
+        try:
+            if login_throttle.backend.blocking:
+                await run_in_threadpool(login_throttle.check, email, client_ip)
+            else:
+                login_throttle.check(email, client_ip)
+        except LoginThrottled as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas de login, tente novamente mais tarde",
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+
+    async def _record_login_success(self, email: str) -> None:
+        if login_throttle.backend.blocking:
+            await run_in_threadpool(login_throttle.record_success, email)
+        else:
+            login_throttle.record_success(email)
+
+    async def login_user(
+        self,
+        db: Session,
+        email: str,
+        password: str,
+        client_ip: str | None = None,
+        background_tasks: BackgroundTasks | None = None,
+    ):
+        # Throttled attempts are rejected before any password hashing happens
+        await self._check_login_throttle(email, client_ip)
+        user = await self.authenticate_user(db, email, password, background_tasks)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou senha incorretos",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        new_access_token = create_access_token(data={"sub": str(user.id)}) #data={}
-        new_refresh_token = create_refresh_token(data={"sub": str(user.id)})#data={}
+        await self._record_login_success(email)
+        new_access_token = create_access_token(data=self._access_claims(user))
+        new_refresh_token = create_refresh_token(data=self._refresh_claims(user))
         return {
             "access_token": new_access_token,
             "refresh_token": new_refresh_token,
@@ -59,17 +147,22 @@ class AuthService:
         }
 
     def refresh_token(self, db: Session, refresh_token: str):
-            payload = verify_token(refresh_token)
-            if not payload or "sub" not in payload:
+            payload = verify_token(refresh_token, REFRESH_TOKEN)
+            if not payload or "sub" not in payload or "jti" not in payload:
                 raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
             
             user_id =int(payload["sub"])
             user = user_crud.get_user_by_id(db, user_id)
             if not user:
                 raise HTTPException(status_code=404, detail="Usuário não encontrado")
+            if payload.get("token_version", 0) != user.token_version:
+                raise HTTPException(status_code=401, detail="Refresh token revogado")
+            # Refresh tokens are single-use: a replayed jti is rejected
+            if not self._consume_refresh_token(payload):
+                raise HTTPException(status_code=401, detail="Refresh token já utilizado")
             
-            new_access_token = create_access_token(data={"sub": str(user.id)}) #data={}
-            new_refresh_token = create_refresh_token(data={"sub": str(user.id)})#data={}
+            new_access_token = create_access_token(data=self._access_claims(user))
+            new_refresh_token = create_refresh_token(data=self._refresh_claims(user))
             
             return {
                 "access_token": new_access_token,
@@ -82,5 +175,9 @@ class AuthService:
                     "role": user.role
                 }
             }
-        
-        
+
+    def revoke_refresh_token(self, refresh_token: str) -> None:
+        payload = verify_token(refresh_token, REFRESH_TOKEN)
+        if not payload or "sub" not in payload or "jti" not in payload:
+            raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+        self._consume_refresh_token(payload)
@@ -0,0 +1,100 @@
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Client
+from app.response_cache import client_tags, response_cache
+from app.schemas.schemas import ClientCreate
+
+
+def _error(row: int, record, error: str) -> dict:
+    record = record if isinstance(record, dict) else {}
+    email, cpf = record.get("email"), record.get("cpf")
+    return {
+        "row": row,
+        "email": None if email is None else str(email),
+        "cpf": None if cpf is None else str(cpf),
+        "error": error,
+    }
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+
+
+def create_clients(db: Session, records: list[dict[str, Any]]) -> dict:
+    """
+    Create many clients in a fixed number of statements.
+
+    Each record is validated with ClientCreate (including the CPF check).
+    One query finds the emails and CPFs already registered; of the rows left,
+    the first one wins for an email or CPF repeated within the batch. The
+    survivors go in with a single multi-row INSERT ... ON CONFLICT DO NOTHING,
+    so a client created concurrently by another request is reported instead
+    of failing the batch.
+
+    Returns:
+        dict: the created clients and the rejected rows with their reason,
+        see ClientBatchResult.
+    """
+    errors = []
+    valid: list[tuple[int, dict, ClientCreate]] = []
+    for row, record in enumerate(records):
+        try:
+            valid.append((row, record, ClientCreate.model_validate(record)))
+        except ValidationError as e:
+            errors.append(_error(row, record, _validation_message(e)))
+
+    existing_emails, existing_cpfs = set(), set()
+    if valid:
+        existing = db.execute(
+            select(Client.email, Client.cpf).where(or_(
+                Client.email.in_({c.email for _, _, c in valid}),
+                Client.cpf.in_({c.cpf for _, _, c in valid}),
+            ))
+        ).all()
+        existing_emails = {email for email, _ in existing}
+        existing_cpfs = {cpf for _, cpf in existing}
+
+    candidates: list[tuple[int, dict, ClientCreate]] = []
+    emails_seen: dict[str, int] = {}
+    cpfs_seen: dict[str, int] = {}
+    for row, record, client_in in valid:
+        if client_in.email in existing_emails:
+            errors.append(_error(row, record, "Email already registered"))
+        elif client_in.cpf in existing_cpfs:
+            errors.append(_error(row, record, "CPF already registered"))
+        elif client_in.email in emails_seen:
+            errors.append(_error(row, record, f"Email repeated in the batch (row {emails_seen[client_in.email]})"))
+        elif client_in.cpf in cpfs_seen:
+            errors.append(_error(row, record, f"CPF repeated in the batch (row {cpfs_seen[client_in.cpf]})"))
+        else:
+            emails_seen[client_in.email] = row
+            cpfs_seen[client_in.cpf] = row
+            candidates.append((row, record, client_in))
+
+    created = []
+    if candidates:
+        # Plain rows rather than ORM objects: nothing to expire and reload
+        # one by one after the commit
+        table = Client.__table__
+        inserted = db.execute(
+            insert(table)
+            .values([{"name": c.name, "email": c.email, "cpf": c.cpf} for _, _, c in candidates])
+            .on_conflict_do_nothing()
+            .returning(*table.c)
+        ).all()
+        db.commit()
+        response_cache.invalidate(*client_tags())
+        by_email = {client.email: client for client in inserted}
+        for row, record, client_in in candidates:
+            client = by_email.get(client_in.email)
+            if client is None:
+                errors.append(_error(row, record, "Email or CPF already registered"))
+            else:
+                created.append(client)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.auth import utils as password_utils
+from app.config import settings
+
+
+class HashingPoolSaturated(RuntimeError):
+    """Raised when too many hashing jobs are already queued."""
+
+
+class HashingPool:
+    """
+    Bounded pool that runs password hashing away from the event loop and the
+    request threadpool.
+
+    Jobs go to a dedicated process pool so bcrypt scales across cores without
+    contending for the GIL. Once `max_pending` jobs are queued or running, new
+    jobs are rejected immediately instead of piling up behind the burst.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                # max_workers=0 keeps hashing in-process (development, tests)
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hashing")
+        return self._executor
+
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on the pool and await its result.
+
+        Raises:
+            HashingPoolSaturated: if the queue-depth limit has been reached.
+        """
+        # Only ever touched from the event loop thread, so no lock is needed.
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingPoolSaturated("Password hashing queue is full")
+        self.pending += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+            return await asyncio.wrap_future(future)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(password_utils.hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> tuple[bool, bool]:
+        """
+        Returns (matches, needs_update) for the stored hash.
+        """
+        return await self.run(password_utils.verify_password_and_policy, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    max_workers=settings.HASH_POOL_WORKERS,
+    max_pending=settings.HASH_POOL_MAX_PENDING,
+)
@@ -0,0 +1,110 @@
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.crud.stock import lock_stock, take_locked_stock
+from app.models.models import Client, Order, OrderItem, OrderStatus
+from app.response_cache import product_tags, response_cache
+from app.schemas.schemas import OrderCreate
+
+STATUSES = {status.value for status in OrderStatus}
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors())
+
+def _summary(results: list[dict]) -> dict:
+    created = sum(result["order"] is not None for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+def create_orders(db: Session, records: list[dict[str, Any]]) -> dict:
+    """
+    Create many orders in one transaction and a fixed number of statements.
+
+    Each record is validated with OrderCreate. The clients are looked up in
+    one query and the products in another, which locks them (and the shards
+    of hot products) in id order, so concurrent batches and single orders
+    always wait on each other in the same order and cannot deadlock. Orders
+    are then accepted in batch order while the locked stock covers them;
+    an order with an unknown client or product, or one the stock left by
+    the orders before it cannot cover, is reported and reserves nothing.
+    The stock of the accepted orders is decremented with one UPDATE, and
+    the orders and their lines go in with multi-row INSERTs.
+
+    Returns:
+        dict: one result per record, in batch order, with the created order
+        or the reason it was rejected; see OrderBatchResult.
+    """
+    results = [{"row": row, "order": None, "error": None} for row in range(len(records))]
+    valid: list[tuple[int, OrderCreate, dict[int, int]]] = []
+    for row, record in enumerate(records):
+        try:
+            order_in = OrderCreate.model_validate(record)
+        except ValidationError as e:
+            results[row]["error"] = _validation_message(e)
+            continue
+        if order_in.status not in STATUSES:
+            results[row]["error"] = f"status: must be one of {', '.join(sorted(STATUSES))}"
+            continue
+        valid.append((row, order_in, order_in.quantities()))
+
+    if not valid:
+        return _summary(results)
+
+    # FOR KEY SHARE keeps the clients from being deleted before the commit
+    clients = set(db.execute(
+        select(Client.id)
+        .where(Client.id.in_({order_in.client_id for _, order_in, _ in valid}))
+        .with_for_update(read=True, key_share=True)
+    ).scalars())
+    stock = lock_stock(db, {product_id for _, _, quantities in valid for product_id in quantities})
+
+    accepted: list[tuple[int, OrderCreate, dict[int, int]]] = []
+    totals: dict[int, int] = {}
+    for row, order_in, quantities in valid:
+        missing = sorted(set(quantities) - stock.keys())
+        short = sorted(p for p, q in quantities.items() if p in stock and stock[p] < q)
+        if order_in.client_id not in clients:
+            results[row]["error"] = "Client not found"
+        elif missing:
+            results[row]["error"] = f"Products not found: {missing}"
+        elif short:
+            results[row]["error"] = f"Insufficient stock for products: {short}"
+        else:
+            for product_id, quantity in quantities.items():
+                stock[product_id] -= quantity
+                totals[product_id] = totals.get(product_id, 0) + quantity
+            accepted.append((row, order_in, quantities))
+
+    if not accepted:
+        db.rollback()
+        return _summary(results)
+
+    take_locked_stock(db, totals)
+    order_ids = db.execute(
+        insert(Order).returning(Order.id, sort_by_parameter_order=True),
+        [{"client_id": order_in.client_id, "status": order_in.status} for _, order_in, _ in accepted],
+    ).scalars().all()
+    db.execute(
+        insert(OrderItem),
+        [
+            {"order_id": order_id, "product_id": product_id, "quantity": quantity}
+            for order_id, (_, _, quantities) in zip(order_ids, accepted)
+            for product_id, quantity in quantities.items()
+        ],
+    )
+    db.commit()
+    response_cache.invalidate(*product_tags(*totals))
+
+    orders = db.execute(
+        select(Order)
+        .options(selectinload(Order.products), selectinload(Order.items), selectinload(Order.client))
+        .where(Order.id.in_(order_ids))
+    ).scalars().all()
+    by_id = {order.id: order for order in orders}
+    for order_id, (row, _, _) in zip(order_ids, accepted):
+        results[row]["order"] = by_id[order_id]
+    return _summary(results)
@@ -0,0 +1,257 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+from typing import BinaryIO, Iterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.crud.stock import set_hot_stock_total
+from app.models.models import Product
+from app.schemas.schemas import ProductCreate
+
+COLUMNS = ("description", "price", "barcode", "section", "stock", "expiry_date", "images")
+
+# Per-connection scratch table; ON COMMIT DELETE ROWS empties it after every chunk
+STAGING_DDL = text(
+    "CREATE TEMPORARY TABLE IF NOT EXISTS product_import_staging ("
+    "description varchar(255), price numeric(10, 2), barcode varchar(64), section varchar(64), "
+    "stock integer, expiry_date date, images jsonb"
+    ") ON COMMIT DELETE ROWS"
+)
+COPY_SQL = f"COPY product_import_staging ({', '.join(COLUMNS)}) FROM STDIN"
+
+# Rows whose values did not change are left alone (no new row version, no WAL);
+# xmax = 0 tells a freshly inserted row from an updated one.
+UPSERT_SQL = text(
+    "WITH upserted AS ("
+    f"INSERT INTO products ({', '.join(COLUMNS)}) "
+    f"SELECT {', '.join(COLUMNS)} FROM product_import_staging "
+    "ON CONFLICT (barcode) DO UPDATE SET "
+    + ", ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS if c != "barcode")
+    + ", updated_at = now() "
+    f"WHERE ({', '.join('products.' + c for c in COLUMNS)}) "
+    f"IS DISTINCT FROM ({', '.join('EXCLUDED.' + c for c in COLUMNS)}) "
+    "RETURNING xmax = 0 AS inserted"
+    ") SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted"
+)
+# The imported stock of a hot product replaces what is in its shards
+HOT_PRODUCTS_SQL = text(
+    "SELECT products.id, staging.stock FROM products "
+    "JOIN product_import_staging AS staging ON staging.barcode = products.barcode "
+    "WHERE products.stock_shards > 0"
+)
+
+_MAX_INTEGER = 2**31 - 1
+_MAX_PRICE = Decimal(10) ** (Product.__table__.c.price.type.precision - Product.__table__.c.price.type.scale)
+_LENGTHS = {name: Product.__table__.c[name].type.length for name in ("description", "barcode", "section")}
+
+
+class ImportRowError(ValueError):
+    """A record that cannot be imported; the message goes to the report."""
+
+
+def _read_csv(text_stream) -> Iterator[dict]:
+    for record in csv.DictReader(text_stream):
+        record.pop(None, None)  # values beyond the header
+        if record.get("images"):
+            try:
+                record["images"] = json.loads(record["images"])
+            except ValueError:
+                record["images"] = record["images"].split("|")
+        yield {key: value for key, value in record.items() if value not in ("", None)}
+
+def _read_ndjson(text_stream) -> Iterator[dict]:
+    for line in text_stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield ImportRowError(f"Invalid JSON: {e}")
+            continue
+        yield record if isinstance(record, dict) else ImportRowError("Expected a JSON object")
+
+def upload_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Guess "csv" or "ndjson" from an upload's file name or content type."""
+    name = (filename or "").lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if name.endswith(".csv") or content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+def read_records(file: BinaryIO, fmt: str) -> Iterator[tuple[int, object]]:
+    """
+    Yield (row number, record) from a CSV (with a header row) or NDJSON upload,
+    reading it incrementally. The record is a dict, or an ImportRowError for a
+    line that could not be parsed. A CSV that stops being parseable ends the
+    stream with an error for the row it stopped at.
+
+    In CSV, images is a JSON array or a "|"-separated list.
+    """
+    text_stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    records = _read_csv(text_stream) if fmt == "csv" else _read_ndjson(text_stream)
+    row = 0
+    while True:
+        row += 1
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except (csv.Error, UnicodeDecodeError) as e:
+            yield row, ImportRowError(f"Unreadable {fmt.upper()}: {e}")
+            return
+        yield row, record
+
+def _validate(record) -> ProductCreate:
+    if isinstance(record, ImportRowError):
+        raise record
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as e:
+        raise ImportRowError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    # Constraints of the products table, checked here so one bad row cannot
+    # fail the statement for the whole chunk
+    for name, length in _LENGTHS.items():
+        value = getattr(product, name)
+        if not value.strip():
+            raise ImportRowError(f"{name}: must not be empty")
+        if len(value) > length:
+            raise ImportRowError(f"{name}: at most {length} characters")
+    if not 0 <= product.stock <= _MAX_INTEGER:
+        raise ImportRowError("stock: must be between 0 and 2147483647")
+    if not product.price.is_finite() or not -_MAX_PRICE < product.price < _MAX_PRICE:
+        raise ImportRowError(f"price: must be less than {_MAX_PRICE}")
+    return product
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, list):
+        value = json.dumps(value)
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+def _copy_buffer(products) -> io.StringIO:
+    buffer = io.StringIO()
+    for product in products:
+        buffer.write("\t".join(_copy_value(getattr(product, column)) for column in COLUMNS))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+
+class ImportReport:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.received = self.inserted = self.updated = self.unchanged = self.superseded = self.failed = 0
+        self.errors: list[dict] = []
+
+    def fail(self, row: int, record, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            barcode = record.get("barcode") if isinstance(record, dict) else None
+            self.errors.append({"row": row, "barcode": None if barcode is None else str(barcode), "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _merge(db: Session, rows: list[tuple[int, object, ProductCreate]], report: ImportReport) -> None:
+    # COPY and the upsert bypass the session, so flag the write for read-your-writes
+    db.info["wrote"] = True
+    connection = db.connection()
+    try:
+        connection.execute(STAGING_DDL)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(COPY_SQL, _copy_buffer(product for _, _, product in rows))
+        inserted, updated = connection.execute(UPSERT_SQL).one()
+        for product_id, stock in connection.execute(HOT_PRODUCTS_SQL).all():
+            set_hot_stock_total(db, product_id, stock)
+        db.commit()
+    except (DBAPIError, connection.dialect.loaded_dbapi.Error) as e:
+        # COPY goes through the driver's cursor, so its errors arrive unwrapped
+        db.rollback()
+        if len(rows) > 1:
+            # Retry in halves until the rows the database rejects are isolated;
+            # the rest of the chunk still goes in
+            middle = len(rows) // 2
+            _merge(db, rows[:middle], report)
+            _merge(db, rows[middle:], report)
+            return
+        error = str(getattr(e, "orig", None) or e).strip().splitlines()[0]
+        row, record, _ = rows[0]
+        report.fail(row, record, f"Rejected by the database: {error}")
+        return
+    report.inserted += inserted
+    report.updated += updated
+    report.unchanged += len(rows) - inserted - updated
+
+def _load_chunk(db: Session, chunk: list[tuple[int, object]], report: ImportReport) -> None:
+    # Last row wins for a barcode repeated within the chunk, as it does across chunks
+    valid: dict[str, tuple[int, object, ProductCreate]] = {}
+    for row, record in chunk:
+        try:
+            product = _validate(record)
+        except ImportRowError as e:
+            report.fail(row, record, str(e))
+            continue
+        if valid.pop(product.barcode, None) is not None:
+            report.superseded += 1
+        valid[product.barcode] = (row, record, product)
+    if valid:
+        _merge(db, list(valid.values()), report)
+
+
+def import_products(
+    db: Session,
+    records: Iterator[tuple[int, object]],
+    chunk_size: Optional[int] = None,
+    max_errors: Optional[int] = None,
+) -> dict:
+    """
+    Upsert products by barcode from (row number, record) pairs, as produced
+    by read_records().
+
+    Records are validated against ProductCreate and the table constraints,
+    `chunk_size` at a time; the valid ones are COPYed into a temporary staging
+    table and merged into products with INSERT ... ON CONFLICT (barcode) DO
+    UPDATE, one transaction per chunk. Memory use is bounded by the chunk size
+    whatever the size of the upload. Invalid rows are skipped and reported;
+    a chunk the database rejects is retried in halves, down to single rows,
+    so only the rows it rejects are reported. A row followed by another with
+    the same barcode in its chunk is counted as superseded.
+
+    Returns:
+        dict: counts (received, inserted, updated, unchanged, superseded,
+        failed) and the first `max_errors` row errors, see ProductImportReport.
+    """
+    records = iter(records)
+    chunk_size = chunk_size or settings.PRODUCT_IMPORT_CHUNK_SIZE
+    report = ImportReport(settings.PRODUCT_IMPORT_MAX_ERRORS if max_errors is None else max_errors)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        report.received += len(chunk)
+        _load_chunk(db, chunk, report)
+    return report.as_dict()
@@ -0,0 +1,102 @@
+import logging
+import threading
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.crud.stock import consolidate_hot_stock
+from app.database import SessionLocal
+from app.models.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+class StockConsolidator:
+    """
+    Background upkeep of hot products (sharded stock).
+
+    Every `interval` seconds it folds each hot product's shards back into
+    Product.stock, so plain reads of the column stay close to the truth, and
+    evens the shards out when orders have drained some of them, so orders
+    keep finding a shard that can serve them without locking the others.
+    Each product is handled in its own short transaction; a product locked by
+    an admin change or by another worker's consolidator is skipped until the
+    next pass, so running one per worker is harmless.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.passes = 0
+        self.consolidated = 0
+        self.rebalanced = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def start(self) -> None:
+        """Start the background thread, unless disabled by a zero interval."""
+        if self.interval <= 0:
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="stock-consolidator", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stopping:
+                    self._cond.wait(self.interval)
+                if self._stopping:
+                    return
+            self.run_once()
+
+    def run_once(self) -> int:
+        """
+        Consolidate every hot product once. Returns how many were consolidated.
+        """
+        self.passes += 1
+        done = 0
+        try:
+            with SessionLocal() as db:
+                hot = db.execute(select(Product.id).where(Product.stock_shards > 0).order_by(Product.id)).scalars().all()
+                db.rollback()
+                for product_id in hot:
+                    result = consolidate_hot_stock(db, product_id)
+                    db.commit()
+                    if result is None:
+                        self.skipped += 1
+                        continue
+                    done += 1
+                    if result[1]:
+                        self.rebalanced += 1
+        except Exception:
+            self.failures += 1
+            logger.exception("Failed to consolidate hot product stock")
+        self.consolidated += done
+        return done
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "passes": self.passes,
+            "consolidated": self.consolidated,
+            "rebalanced": self.rebalanced,
+            "skipped": self.skipped,
+            "failures": self.failures,
+        }
+
+
+stock_consolidator = StockConsolidator(interval=settings.STOCK_CONSOLIDATE_INTERVAL)
@@ -0,0 +1,76 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def register_and_login():
+    """Register a new user with the given role and return its token pair."""
+    def register_and_login(role="user"):
+        email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+        client.post(
+            "/auth/register",
+            json={"name": email, "email": email, "password": "testpassword", "role": role},
+        )
+        response = client.post("/auth/login", data={"username": email, "password": "testpassword"})
+        assert response.status_code == 200
+        return response.json()
+    return register_and_login
+
+@pytest.fixture
+def login_headers(register_and_login):
+    """Authorization headers for a new user with the given role."""
+    def login_headers(role="user"):
+        return {"Authorization": f"Bearer {register_and_login(role)['access_token']}"}
+    return login_headers
+
+@pytest.fixture
+def admin_headers(login_headers):
+    return login_headers("admin")
+
+@pytest.fixture
+def create_product(admin_headers):
+    """Create a product and return its id, optionally with its stock split into shards."""
+    def create_product(stock=1, section="tests", *, shards=0, description="item", price="1.00"):
+        response = client.post(
+            "/products/",
+            json={
+                "description": description,
+                "price": price,
+                "barcode": uuid.uuid4().hex[:13],
+                "section": section,
+                "stock": stock,
+            },
+            headers=admin_headers,
+        )
+        assert response.status_code == 201
+        product_id = response.json()["id"]
+        if shards:
+            response = client.put(f"/products/{product_id}/stock-shards", json={"shards": shards}, headers=admin_headers)
+            assert response.status_code == 200
+        return product_id
+    return create_product
+
+@pytest.fixture
+def create_client(admin_headers):
+    """Create a client with a fresh CPF and return its id."""
+    def create_client(name="tests"):
+        cpf = str(uuid.uuid4().int)[:11]
+        response = client.post(
+            "/clients/", json={"name": name, "email": f"{cpf}@example.com", "cpf": cpf}, headers=admin_headers
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+    return create_client
+
+@pytest.fixture
+def stock_of(admin_headers):
+    """The stock GET /products/{id} reports."""
+    def stock_of(product_id):
+        return client.get(f"/products/{product_id}", headers=admin_headers).json()["stock"]
+    return stock_of
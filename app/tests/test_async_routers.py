@@ -0,0 +1,134 @@
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import database
+from app.auth.principal_cache import principal_cache
+from app.config import settings
+from app.main import create_app
+
+
+@pytest.fixture(scope="module")
+def client():
+    """The app as DB_ASYNC=true builds it, on an async engine of its own."""
+    async_engine, async_session = database.create_async_database(settings.DB_URL)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(database, "async_engine", async_engine)
+        monkeypatch.setattr(database, "AsyncSessionLocal", async_session)
+        # One client for the module: pooled asyncpg connections belong to its event loop
+        with TestClient(create_app(db_async=True)) as client:
+            yield client
+
+@contextmanager
+def count_checkouts():
+    checkouts = {"sync": 0, "async": 0}
+    def on_sync(dbapi_connection, connection_record, connection_proxy):
+        checkouts["sync"] += 1
+    def on_async(dbapi_connection, connection_record, connection_proxy):
+        checkouts["async"] += 1
+    async_engine = database.async_engine.sync_engine
+    event.listen(database.engine, "checkout", on_sync)
+    event.listen(async_engine, "checkout", on_async)
+    try:
+        yield checkouts
+    finally:
+        event.remove(database.engine, "checkout", on_sync)
+        event.remove(async_engine, "checkout", on_async)
+
+def new_client(client, headers, name="async"):
+    cpf = str(uuid.uuid4().int)[:11]
+    response = client.post("/clients/", json={"name": name, "email": f"{cpf}@example.com", "cpf": cpf}, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_catalog_and_orders(client, admin_headers):
+    section = f"async-{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/products/",
+        json={"description": "async item", "price": "2.50", "barcode": uuid.uuid4().hex[:13], "section": section, "stock": 5},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+    product_id = response.json()["id"]
+    product = client.get(f"/products/{product_id}", headers=admin_headers)
+    assert product.json()["stock"] == 5
+    assert client.get(
+        f"/products/{product_id}", headers={**admin_headers, "If-None-Match": product.headers["etag"]}
+    ).status_code == 304
+    assert client.put(f"/products/{product_id}", json={"price": "3.00"}, headers=admin_headers).json()["price"] == "3.00"
+    listed = client.get("/products/", params={"section": section}, headers=admin_headers).json()
+    assert [(p["id"], p["price"]) for p in listed] == [(product_id, "3.00")]
+
+    client_id = new_client(client, admin_headers)["id"]
+    order = {"client_id": client_id, "status": "pending", "items": [{"product_id": product_id, "quantity": 2}]}
+    response = client.post("/orders/", json=order, headers=admin_headers)
+    assert response.status_code == 201
+    order_id = response.json()["id"]
+    assert client.get(f"/products/{product_id}", headers=admin_headers).json()["stock"] == 3
+    response = client.post("/orders/", json={**order, "items": [{"product_id": product_id, "quantity": 4}]}, headers=admin_headers)
+    assert response.status_code == 400
+
+    assert client.post("/orders/batch", json={"orders": [order]}, headers=admin_headers).json()["created"] == 1
+    assert client.get(f"/products/{product_id}", headers=admin_headers).json()["stock"] == 1
+    orders = client.get("/orders/", params={"client_id": client_id}, headers=admin_headers).json()
+    assert len(orders) == 2
+    assert client.get("/orders/", params={"section": section}, headers=admin_headers).json() == orders
+
+    response = client.put(f"/orders/{order_id}", json={"status": "cancelled"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get(f"/orders/{order_id}", headers=admin_headers).json()["status"] == "cancelled"
+    assert client.delete(f"/orders/{order_id}", headers=admin_headers).status_code == 204
+    assert client.get(f"/orders/{order_id}", headers=admin_headers).status_code == 404
+
+def test_clients_and_search(client, admin_headers):
+    token = uuid.uuid4().hex[:10]
+    created = new_client(client, admin_headers, f"Async {token}")
+    assert client.get(f"/clients/{created['id']}", headers=admin_headers).json() == created
+    response = client.put(f"/clients/{created['id']}", json={"name": f"Renamed {token}"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/clients/", params={"email": created["email"]}, headers=admin_headers).json()[0]["name"] == f"Renamed {token}"
+    assert [c["id"] for c in client.get("/search/clients", params={"q": f"renamed {token}"}, headers=admin_headers).json()][:1] == [created["id"]]
+    found = client.get("/search/", params={"q": f"renamed {token}"}, headers=admin_headers).json()
+    assert [c["id"] for c in found["clients"]] == [created["id"]] and found["products"] == []
+
+    cpf = str(uuid.uuid4().int)[:11]
+    batch = client.post("/clients/batch", json={"clients": [{"name": "batch", "email": f"{cpf}@example.com", "cpf": cpf}]}, headers=admin_headers)
+    assert len(batch.json()["created"]) == 1
+    assert client.delete(f"/clients/{created['id']}", headers=admin_headers).status_code == 204
+    assert client.get(f"/clients/{created['id']}", headers=admin_headers).status_code == 404
+
+def test_users_and_auth(client, register_and_login, admin_headers):
+    tokens = register_and_login()
+    user_id = tokens["user"]["id"]
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    assert client.get(f"/users/{user_id}", headers=headers).json()["email"] == tokens["user"]["email"]
+    name = f"renamed-{user_id}"
+    assert client.put(f"/users/{user_id}", json={"name": name}, headers=headers).json()["name"] == name
+    assert client.put(f"/users/{user_id}", json={"role": "admin"}, headers=headers).status_code == 403
+    assert client.get("/users/", headers=headers).status_code == 403
+    assert client.get("/metrics/", headers=headers).status_code == 403
+    assert client.post("/products/", json={}, headers=headers).status_code == 403
+    assert client.get("/clients/", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}).status_code == 401
+    assert client.get("/metrics/", headers=admin_headers).status_code == 200
+
+def test_claims_mode_revokes_on_role_change(client, monkeypatch, register_and_login, admin_headers):
+    monkeypatch.setattr(settings, "AUTH_MODE", "claims")
+    tokens = register_and_login()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/products/", headers=headers).status_code == 200
+    response = client.put(f"/users/{tokens['user']['id']}", json={"role": "admin"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert client.get("/products/", headers=headers).status_code == 401
+
+def test_request_uses_only_the_async_pool(client, admin_headers):
+    # Cold principal cache: the auth lookup and the handler share one AsyncSession
+    principal_cache.clear()
+    with count_checkouts() as checkouts:
+        response = client.get("/clients/", headers=admin_headers)
+    assert response.status_code == 200
+    assert checkouts == {"sync": 0, "async": 1}
@@ -118,3 +118,52 @@ def test_protected_endpoint_requires_auth():
 def test_protected_endpoint_no_token():
     response = client.get("/users/")
     assert response.status_code == 401 or response.status_code == 403
+
+def test_refresh_token_is_single_use():
+    client.post(
+        "/auth/register",
+        json={
+            "name": "refreshuser",
+            "email": "refreshuser@example.com",
+            "password": "testpassword",
+            "role": "user"
+        }
+    )
+    login_response = client.post(
+        "/auth/login",
+        data={
+            "username": "refreshuser@example.com",
+            "password": "testpassword"
+        }
+    )
+    refresh_token = login_response.json()["refresh_token"]
+
+    response = client.post("/auth/refresh-token", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    assert response.json()["refresh_token"] != refresh_token
+
+    # Replaying the consumed token must fail
+    response = client.post("/auth/refresh-token", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+def test_tokens_only_work_for_their_own_purpose(register_and_login):
+    tokens = register_and_login()
+    access, refresh = tokens["access_token"], tokens["refresh_token"]
+
+    # A refresh token is not a bearer token, before or after it is revoked
+    as_bearer = {"Authorization": f"Bearer {refresh}"}
+    assert client.get("/clients/", headers=as_bearer).status_code == 401
+    cpf = "98765432100"
+    response = client.post(
+        "/clients/",
+        json={"name": "x", "email": "typ@example.com", "cpf": cpf},
+        headers={**as_bearer, "Idempotency-Key": "typ-check"},
+    )
+    assert response.status_code == 401
+    assert client.post("/auth/logout", json={"refresh_token": refresh}).status_code == 204
+    assert client.get("/clients/", headers=as_bearer).status_code == 401
+
+    # Nor is an access token a refresh token
+    assert client.post("/auth/refresh-token", json={"refresh_token": access}).status_code == 401
+    assert client.post("/auth/logout", json={"refresh_token": access}).status_code == 401
+    assert client.get("/clients/", headers={"Authorization": f"Bearer {access}"}).status_code == 200
@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_claims_mode_reads_need_no_users_query(monkeypatch, register_and_login):
+    monkeypatch.setattr(settings, "AUTH_MODE", "claims")
+    tokens = register_and_login()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    client.get("/products/", headers=headers)  # warms the version map
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        response = client.get("/products/", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 200
+    assert not any("users" in statement for statement in statements)
+
+
+def test_claims_mode_rejects_token_after_role_change(monkeypatch, register_and_login):
+    monkeypatch.setattr(settings, "AUTH_MODE", "claims")
+    admin = register_and_login(role="admin")
+    user = register_and_login()
+    user_headers = {"Authorization": f"Bearer {user['access_token']}"}
+    assert client.get("/products/", headers=user_headers).status_code == 200
+
+    response = client.put(
+        f"/users/{user['user']['id']}",
+        json={"role": "admin"},
+        headers={"Authorization": f"Bearer {admin['access_token']}"},
+    )
+    assert response.status_code == 200
+    assert client.get("/products/", headers=user_headers).status_code == 401
@@ -0,0 +1,52 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def new_cpf():
+    return str(uuid.uuid4().int)[:11]
+
+
+def test_batch_creates_valid_rows_and_reports_the_rest(admin_headers):
+    existing_cpf = new_cpf()
+    response = client.post(
+        "/clients/", json={"name": "old", "email": f"{existing_cpf}@example.com", "cpf": existing_cpf}, headers=admin_headers
+    )
+    assert response.status_code == 201
+
+    cpfs = [new_cpf() for _ in range(3)]
+    rows = [
+        {"name": "Ana", "email": f"{cpfs[0]}@example.com", "cpf": cpfs[0]},
+        {"name": "Bia", "email": f"{cpfs[1]}@example.com", "cpf": "123"},
+        {"name": "Caio", "email": f"{cpfs[0]}@example.com", "cpf": cpfs[2]},
+        {"name": "Duda", "email": f"{cpfs[2]}@example.com", "cpf": cpfs[0]},
+        {"name": "Eva", "email": f"{existing_cpf}@example.com", "cpf": cpfs[1]},
+        {"name": "Fabi", "email": f"{cpfs[1]}@example.com", "cpf": existing_cpf},
+        {"name": "Gil", "email": f"{cpfs[2]}@example.com", "cpf": cpfs[2]},
+        {"name": "no email", "cpf": new_cpf()},
+    ]
+    response = client.post("/clients/batch", json={"clients": rows}, headers=admin_headers)
+    assert response.status_code == 200
+    result = response.json()
+
+    assert [c["name"] for c in result["created"]] == ["Ana", "Gil"]
+    assert all(c["id"] and c["created_at"] for c in result["created"])
+    errors = {e["row"]: e["error"] for e in result["errors"]}
+    assert sorted(errors) == [1, 2, 3, 4, 5, 7]
+    assert "CPF must contain 11 numeric digits" in errors[1]
+    assert errors[2] == "Email repeated in the batch (row 0)"
+    assert errors[3] == "CPF repeated in the batch (row 0)"
+    assert errors[4] == "Email already registered"
+    assert errors[5] == "CPF already registered"
+    assert errors[7].startswith("email")
+
+    # Created clients are visible through the regular endpoints
+    created_id = result["created"][0]["id"]
+    assert client.get(f"/clients/{created_id}", headers=admin_headers).json()["cpf"] == cpfs[0]
+
+def test_batch_size_is_bounded(admin_headers):
+    assert client.post("/clients/batch", json={"clients": []}, headers=admin_headers).status_code == 422
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.config import settings
+from app.database import engine
+from app.db_pool import InstrumentedQueuePool, engine_options, pool_telemetry
+
+
+def test_connections_carry_session_settings():
+    with engine.connect() as conn:
+        name = conn.execute(text("SELECT current_setting('application_name')")).scalar()
+    assert name == settings.DB_APPLICATION_NAME
+
+def test_checkouts_are_timed():
+    before = pool_telemetry.stats()["pools"]["primary"]["checkouts"]
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert pool_telemetry.stats()["pools"]["primary"]["checked_out"] >= 1
+    stats = pool_telemetry.stats()["pools"]["primary"]
+    assert stats["checkouts"] == before + 1
+    assert stats["wait_ms_buckets"]["le_inf"] >= stats["checkouts"]
+
+def test_pool_exhaustion_is_counted_as_timeout():
+    options = dict(engine_options(settings.DB_URL), pool_size=1, max_overflow=0, pool_timeout=0.05)
+    small = create_engine(settings.DB_URL, **options)
+    assert isinstance(small.pool, InstrumentedQueuePool)
+    pool_telemetry.register("test_small", small)
+    try:
+        with small.connect():
+            with pytest.raises(exc.TimeoutError):
+                small.connect()
+        stats = pool_telemetry.stats()["pools"]["test_small"]
+        assert stats["timeouts"] == 1
+        assert stats["wait_ms_max"] >= 50
+        assert stats["connects"] == 1
+    finally:
+        small.dispose()
@@ -0,0 +1,136 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def create_order(headers, client_id, product_id, quantity=1):
+    response = client.post(
+        "/orders/",
+        json={"client_id": client_id, "status": "pending", "items": [{"product_id": product_id, "quantity": quantity}]},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def revalidate(url, headers, etag, **params):
+    return client.get(url, params=params, headers={**headers, "If-None-Match": etag})
+
+
+def test_product_not_modified_until_it_changes(admin_headers, create_product, create_client):
+    product_id = create_product(5)
+    url = f"/products/{product_id}"
+
+    first = client.get(url, headers=admin_headers)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    cached = revalidate(url, admin_headers, etag)
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert revalidate(url, admin_headers, f'"other", {etag.removeprefix("W/")}').status_code == 304
+    assert revalidate(url, admin_headers, "*").status_code == 304
+
+    client.put(url, json={"price": "2.00"}, headers=admin_headers)
+    changed = revalidate(url, admin_headers, etag)
+    assert changed.status_code == 200
+    assert changed.json()["price"] == "2.00"
+    assert changed.headers["etag"] != etag
+
+    # Stock taken by an order changes the product too
+    etag = changed.headers["etag"]
+    create_order(admin_headers, create_client(), product_id)
+    assert revalidate(url, admin_headers, etag).status_code == 200
+
+def test_hot_product_changes_with_its_shards(admin_headers, create_product, create_client):
+    product_id = create_product(6)
+    client.put(f"/products/{product_id}/stock-shards", json={"shards": 3}, headers=admin_headers)
+    etag = client.get(f"/products/{product_id}", headers=admin_headers).headers["etag"]
+
+    create_order(admin_headers, create_client(), product_id)
+    response = revalidate(f"/products/{product_id}", admin_headers, etag)
+    assert response.status_code == 200
+    assert response.json()["stock"] == 5
+
+def test_client_not_modified_until_it_changes(admin_headers, create_client):
+    client_id = create_client()
+    url = f"/clients/{client_id}"
+
+    etag = client.get(url, headers=admin_headers).headers["etag"]
+    assert revalidate(url, admin_headers, etag).status_code == 304
+    client.put(url, json={"name": "renamed"}, headers=admin_headers)
+    assert revalidate(url, admin_headers, etag).status_code == 200
+
+def test_order_follows_its_client_and_products(admin_headers, create_product, create_client):
+    client_id, product_id = create_client(), create_product(10)
+    url = f"/orders/{create_order(admin_headers, client_id, product_id)}"
+
+    etag = client.get(url, headers=admin_headers).headers["etag"]
+    assert revalidate(url, admin_headers, etag).status_code == 304
+
+    # The order shows the product's stock and the client's name
+    create_order(admin_headers, client_id, product_id)
+    response = revalidate(url, admin_headers, etag)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    client.put(f"/clients/{client_id}", json={"name": "renamed"}, headers=admin_headers)
+    response = revalidate(url, admin_headers, etag)
+    assert response.status_code == 200
+    assert response.json()["client"]["name"] == "renamed"
+    etag = response.headers["etag"]
+    client.put(url, json={"status": "cancelled"}, headers=admin_headers)
+    assert revalidate(url, admin_headers, etag).status_code == 200
+
+    assert revalidate("/orders/999999999", admin_headers, "*").status_code == 404
+    assert revalidate("/products/999999999", admin_headers, "*").status_code == 404
+
+def test_lists_carry_etags_per_page(admin_headers, create_product):
+    section = f"etags-{uuid.uuid4().hex[:8]}"
+    products = [create_product(5, section) for _ in range(3)]
+
+    first = client.get("/products/", params={"section": section, "limit": 2}, headers=admin_headers)
+    etag, cursor = first.headers["etag"], first.headers["x-next-cursor"]
+    cached = revalidate("/products/", admin_headers, etag, section=section, limit=2)
+    assert cached.status_code == 304
+    assert cached.headers["x-next-cursor"] == cursor
+    second = client.get("/products/", params={"section": section, "limit": 2, "cursor": cursor}, headers=admin_headers)
+    assert second.headers["etag"] != etag
+
+    client.put(f"/products/{products[1]}", json={"stock": 1}, headers=admin_headers)
+    assert revalidate("/products/", admin_headers, etag, section=section, limit=2).status_code == 200
+
+    etag = client.get("/clients/", params={"limit": 5}, headers=admin_headers).headers["etag"]
+    assert revalidate("/clients/", admin_headers, etag, limit=5).status_code == 304
+
+def test_unchanged_orders_page_skips_loading_the_orders(admin_headers, create_product, create_client):
+    client_id, product_id = create_client(), create_product(10)
+    for _ in range(3):
+        create_order(admin_headers, client_id, product_id)
+
+    def statements_for(etag):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = revalidate("/orders/", admin_headers, etag, client_id=client_id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return response, statements
+
+    full, loaded = statements_for('"stale"')
+    assert full.status_code == 200
+    cached, skipped = statements_for(full.headers["etag"])
+    assert cached.status_code == 304
+    # Nor the orders, nor their products, items and clients
+    assert len(loaded) - len(skipped) == 4
+
+    client.put(f"/clients/{client_id}", json={"name": "renamed"}, headers=admin_headers)
+    response = revalidate("/orders/", admin_headers, full.headers["etag"], client_id=client_id)
+    assert response.status_code == 200
+    assert len(response.json()) == 3
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_product_export_streams_every_filtered_row_from_one_cursor(monkeypatch, admin_headers, create_product):
+    section = f"export-{uuid.uuid4().hex[:8]}"
+    ids = [create_product(2, section, price="3.50") for _ in range(5)]
+    create_product(2, section, price="99.00")
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM products" in statement:
+            statements.append(context.execution_options)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            "/products/export", params={"section": section, "max_price": "10"}, headers=admin_headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["price"] == "3.50"
+    assert len(statements) == 1 and statements[0]["stream_results"]
+
+def test_order_export_as_csv_lists_product_ids(admin_headers, create_product):
+    section = f"export-{uuid.uuid4().hex[:8]}"
+    product_ids = [create_product(2, section) for _ in range(2)]
+    cpf = str(uuid.uuid4().int)[:11]
+    client_id = client.post(
+        "/clients/", json={"name": "export", "email": f"{cpf}@example.com", "cpf": cpf}, headers=admin_headers
+    ).json()["id"]
+    order = client.post("/orders/", json={"client_id": client_id, "status": "pending", "product_ids": product_ids}, headers=admin_headers)
+    assert order.status_code == 201
+
+    response = client.get("/orders/export", params={"format": "csv", "client_id": client_id}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="orders.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["id"] == str(order.json()["id"])
+    assert json.loads(rows[0]["product_ids"]) == sorted(product_ids)
+
+def test_client_export_honours_list_filters(admin_headers):
+    name = f"export-{uuid.uuid4().hex[:8]}"
+    cpf = str(uuid.uuid4().int)[:11]
+    client.post("/clients/", json={"name": name, "email": f"{cpf}@example.com", "cpf": cpf}, headers=admin_headers)
+
+    response = client.get("/clients/export", params={"format": "csv", "name": name}, headers=admin_headers)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["name"], row["cpf"]) for row in rows] == [(name, cpf)]
+    assert client.get("/clients/export", params={"format": "xml"}, headers=admin_headers).status_code == 422
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.hashing import hashing_pool
+
+client = TestClient(app)
+
+
+def test_saturated_pool_answers_503(monkeypatch):
+    # In-process pool with room for a single job, taken by one that blocks
+    hashing_pool.shutdown()
+    monkeypatch.setattr(hashing_pool, "max_workers", 0)
+    monkeypatch.setattr(hashing_pool, "max_pending", 1)
+    release = threading.Event()
+    busy = threading.Thread(target=asyncio.run, args=(hashing_pool.run(release.wait, 10),))
+    busy.start()
+    try:
+        deadline = time.monotonic() + 5
+        while hashing_pool.pending < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        rejected = hashing_pool.rejected
+
+        email = f"saturated-{uuid.uuid4().hex[:8]}@example.com"
+        response = client.post(
+            "/auth/register",
+            json={"name": email, "email": email, "password": "testpassword", "role": "user"},
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert hashing_pool.rejected == rejected + 1
+    finally:
+        release.set()
+        busy.join()
+        hashing_pool.shutdown()
+
+    # Once the job is done the pool takes work again
+    assert hashing_pool.pending == 0
+    response = client.post(
+        "/auth/register",
+        json={"name": email, "email": email, "password": "testpassword", "role": "user"},
+    )
+    assert response.status_code == 201
@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import Product, ProductStockShard
+from app.services.stock_consolidator import stock_consolidator
+
+client = TestClient(app)
+
+
+def place_order(headers, client_id, items):
+    return client.post(
+        "/orders/",
+        json={"client_id": client_id, "status": "pending", "items": [{"product_id": p, "quantity": q} for p, q in items]},
+        headers=headers,
+    )
+
+def shards_of(product_id):
+    with SessionLocal() as db:
+        return db.execute(
+            select(ProductStockShard.stock).where(ProductStockShard.product_id == product_id).order_by(ProductStockShard.shard)
+        ).scalars().all()
+
+def column_stock_of(product_id):
+    with SessionLocal() as db:
+        return db.execute(select(Product.stock).where(Product.id == product_id)).scalar()
+
+
+def test_switching_shards_keeps_the_stock(admin_headers, create_product):
+    product_id = create_product(10)
+
+    response = client.put(f"/products/{product_id}/stock-shards", json={"shards": 4}, headers=admin_headers)
+    assert response.status_code == 200
+    assert (response.json()["stock"], response.json()["stock_shards"]) == (10, 4)
+    assert shards_of(product_id) == [3, 3, 2, 2]
+
+    response = client.put(f"/products/{product_id}/stock-shards", json={"shards": 0}, headers=admin_headers)
+    assert (response.json()["stock"], response.json()["stock_shards"]) == (10, 0)
+    assert shards_of(product_id) == []
+
+    assert client.put(f"/products/{product_id}/stock-shards", json={"shards": 65}, headers=admin_headers).status_code == 422
+    assert client.put("/products/999999999/stock-shards", json={"shards": 2}, headers=admin_headers).status_code == 404
+
+def test_reads_sum_the_shards(admin_headers, create_product, create_client):
+    client_id = create_client()
+    hot = create_product(12, "hot", shards=3)
+
+    assert place_order(admin_headers, client_id, [(hot, 5)]).status_code == 201
+    assert sum(shards_of(hot)) == 7
+    assert column_stock_of(hot) == 12  # not consolidated yet
+    assert client.get(f"/products/{hot}", headers=admin_headers).json()["stock"] == 7
+    listed = client.get("/products/", params={"section": "hot", "available": True, "limit": 100}, headers=admin_headers).json()
+    assert {p["id"]: p["stock"] for p in listed}[hot] == 7
+
+    # A line bigger than any single shard is served from several
+    assert place_order(admin_headers, client_id, [(hot, 7)]).status_code == 201
+    assert shards_of(hot) == [0, 0, 0]
+    assert place_order(admin_headers, client_id, [(hot, 1)]).status_code == 400
+    unavailable = client.get("/products/", params={"section": "hot", "available": False, "limit": 100}, headers=admin_headers).json()
+    assert hot in [p["id"] for p in unavailable]
+
+def test_mixed_order_is_all_or_nothing(admin_headers, create_product, create_client):
+    client_id = create_client()
+    plain, hot = create_product(5), create_product(2, shards=2)
+
+    response = place_order(admin_headers, client_id, [(plain, 1), (hot, 3)])
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Insufficient stock for products: [{hot}]"
+    assert column_stock_of(plain) == 5
+    assert sum(shards_of(hot)) == 2
+
+    assert place_order(admin_headers, client_id, [(plain, 1), (hot, 2)]).status_code == 201
+    assert (column_stock_of(plain), sum(shards_of(hot))) == (4, 0)
+
+def test_setting_stock_redistributes_the_shards(admin_headers, create_product):
+    hot = create_product(4, shards=4)
+
+    response = client.put(f"/products/{hot}", json={"stock": 9}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["stock"] == 9
+    assert shards_of(hot) == [3, 2, 2, 2]
+    assert column_stock_of(hot) == 9
+
+def test_consolidation_folds_and_rebalances(admin_headers, create_product, create_client):
+    client_id = create_client()
+    hot = create_product(40, shards=4)
+    with SessionLocal() as db:
+        db.execute(
+            ProductStockShard.__table__.update()
+            .where(ProductStockShard.product_id == hot)
+            .values(stock=ProductStockShard.shard * 2)
+        )
+        db.commit()
+    assert shards_of(hot) == [0, 2, 4, 6]
+
+    rebalanced = stock_consolidator.rebalanced
+    assert stock_consolidator.run_once() >= 1
+    assert column_stock_of(hot) == 12
+    assert shards_of(hot) == [3, 3, 3, 3]
+    assert stock_consolidator.rebalanced > rebalanced
+
+    assert place_order(admin_headers, client_id, [(hot, 1)]).status_code == 201
+    stock_consolidator.run_once()
+    assert column_stock_of(hot) == 11
+    assert sorted(shards_of(hot)) == [2, 3, 3, 3]  # not skewed enough to move
+
+def test_sharded_hot_sku_is_never_oversold(admin_headers, create_product, create_client):
+    client_id = create_client()
+    hot = create_product(20, shards=8)
+
+    def buy(_):
+        return place_order(admin_headers, client_id, [(hot, 1)]).status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(buy, range(50)))
+
+    assert statuses.count(201) == 20
+    assert statuses.count(400) == 30
+    assert shards_of(hot) == [0] * 8
+    assert client.get(f"/products/{hot}", headers=admin_headers).json()["stock"] == 0
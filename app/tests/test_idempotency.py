@@ -0,0 +1,150 @@
+import hashlib
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.auth.jwt import decode_token
+from app.database import engine
+from app.idempotency import idempotency_store
+from app.main import app
+from app.models.models import IdempotencyKey
+
+client = TestClient(app)
+
+
+def orders_of(headers, client_id):
+    return client.get("/orders/", params={"client_id": client_id, "limit": 100}, headers=headers).json()
+
+def post_order(headers, key, body):
+    return client.post("/orders/", content=body, headers={**headers, "Idempotency-Key": key, "Content-Type": "application/json"})
+
+def order_body(client_id, product_id, quantity=1):
+    return json.dumps({"client_id": client_id, "status": "pending", "items": [{"product_id": product_id, "quantity": quantity}]}).encode()
+
+
+def test_retry_replays_the_stored_response(admin_headers, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(10)
+    key = uuid.uuid4().hex
+    body = order_body(client_id, product_id, 3)
+
+    first = post_order(admin_headers, key, body)
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+    retry = post_order(admin_headers, key, body)
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert stock_of(product_id) == 7
+    assert len(orders_of(admin_headers, client_id)) == 1
+
+    # Another worker, or this one after its cache dropped the entry: the table answers
+    idempotency_store._cache.clear()
+    replays = idempotency_store.db_replays
+    assert post_order(admin_headers, key, body).json() == first.json()
+    assert idempotency_store.db_replays == replays + 1
+
+def test_key_reused_for_another_request_is_rejected(admin_headers, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(10)
+    key = uuid.uuid4().hex
+
+    assert post_order(admin_headers, key, order_body(client_id, product_id, 1)).status_code == 201
+    response = post_order(admin_headers, key, order_body(client_id, product_id, 2))
+    assert response.status_code == 422
+    assert "already used" in response.json()["detail"]
+    cpf = str(uuid.uuid4().int)[:11]
+    response = client.post(
+        "/clients/", json={"name": "idem", "email": f"{cpf}@example.com", "cpf": cpf}, headers={**admin_headers, "Idempotency-Key": key}
+    )
+    assert response.status_code == 422
+    assert stock_of(product_id) == 9
+
+def test_keys_are_per_user_and_optional(admin_headers, login_headers, create_product, create_client, stock_of):
+    other = login_headers("admin")
+    client_id, product_id = create_client(), create_product(10)
+    key = uuid.uuid4().hex
+    body = order_body(client_id, product_id)
+
+    assert post_order(admin_headers, key, body).status_code == 201
+    response = post_order(other, key, body)
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert client.post("/orders/", content=body, headers={**admin_headers, "Content-Type": "application/json"}).status_code == 201
+    assert stock_of(product_id) == 7
+
+    assert post_order(admin_headers, "x" * 256, body).status_code == 400
+    assert post_order({}, key, body).status_code == 401
+
+def test_client_errors_are_replayed_too(admin_headers, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(1)
+    key = uuid.uuid4().hex
+    body = order_body(client_id, product_id, 2)
+
+    assert post_order(admin_headers, key, body).status_code == 400
+    client.put(f"/products/{product_id}", json={"stock": 5}, headers=admin_headers)
+    response = post_order(admin_headers, key, body)
+    assert response.status_code == 400
+    assert response.headers["idempotent-replayed"] == "true"
+    assert stock_of(product_id) == 5
+
+def test_retryable_errors_release_the_key(admin_headers, register_and_login, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(5)
+    tokens = register_and_login()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    key = uuid.uuid4().hex
+    body = order_body(client_id, product_id)
+
+    # A 403 is not stored: once the user may create orders, the retry runs
+    assert post_order(headers, key, body).status_code == 403
+    client.put(f"/users/{tokens['user']['id']}", json={"role": "admin"}, headers=admin_headers)
+    response = post_order(headers, key, body)
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+    assert post_order(headers, key, body).headers["idempotent-replayed"] == "true"
+    assert stock_of(product_id) == 4
+
+def test_concurrent_duplicates_run_once(admin_headers, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(100)
+    key = uuid.uuid4().hex
+    body = order_body(client_id, product_id)
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        responses = list(pool.map(lambda _: post_order(admin_headers, key, body), range(10)))
+
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum("idempotent-replayed" in r.headers for r in responses) == 9
+    assert stock_of(product_id) == 99
+    assert len(orders_of(admin_headers, client_id)) == 1
+
+def test_claims_in_flight_elsewhere(admin_headers, create_product, create_client, stock_of):
+    client_id, product_id = create_client(), create_product(10)
+    user_id = int(decode_token(admin_headers["Authorization"].split()[1])["sub"])
+    body = order_body(client_id, product_id)
+    fingerprint = hashlib.sha256(b"\n".join([b"POST", b"/orders/", body])).hexdigest()
+    now = datetime.now(timezone.utc)
+    busy, dead = uuid.uuid4().hex, uuid.uuid4().hex
+    with engine.begin() as conn:
+        conn.execute(insert(IdempotencyKey), [
+            {"user_id": user_id, "key": busy, "fingerprint": fingerprint,
+             "locked_until": now + timedelta(minutes=5), "expires_at": now + timedelta(days=1)},
+            {"user_id": user_id, "key": dead, "fingerprint": fingerprint,
+             "locked_until": now - timedelta(seconds=1), "expires_at": now + timedelta(days=1)},
+        ])
+
+    wait_timeout = idempotency_store.wait_timeout
+    idempotency_store.wait_timeout = 0.2
+    try:
+        response = post_order(admin_headers, busy, body)
+    finally:
+        idempotency_store.wait_timeout = wait_timeout
+    assert response.status_code == 409
+    assert stock_of(product_id) == 10
+
+    # The owner of this one is gone: the retry takes the key over and runs
+    assert post_order(admin_headers, dead, body).status_code == 201
+    assert post_order(admin_headers, dead, body).headers["idempotent-replayed"] == "true"
+    assert stock_of(product_id) == 9
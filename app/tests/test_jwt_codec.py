@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+import pytest
+from jose import JWTError, jwt
+
+from app.auth.jwt import KeyRing, TokenCodec
+
+OLD_KEY = {"kid": "2024", "alg": "HS256", "key": "old-secret"}
+NEW_KEY = {"kid": "2025", "alg": "HS512", "key": "new-secret"}
+
+
+def test_round_trip_and_jose_compatibility():
+    codec = TokenCodec(KeyRing([OLD_KEY], "2024"))
+    token = codec.encode({"sub": "1"}, timedelta(minutes=5))
+    assert codec.decode(token)["sub"] == "1"
+    # Tokens stay standard JWTs
+    assert jwt.decode(token, "old-secret", algorithms=["HS256"])["sub"] == "1"
+
+def test_rotated_keys_keep_verifying_old_tokens():
+    old_token = TokenCodec(KeyRing([OLD_KEY], "2024")).encode({"sub": "1"}, timedelta(minutes=5))
+    codec = TokenCodec(KeyRing([OLD_KEY, NEW_KEY], "2025"))
+    new_token = codec.encode({"sub": "2"}, timedelta(minutes=5))
+    assert jwt.get_unverified_header(new_token)["kid"] == "2025"
+    assert codec.decode(old_token)["sub"] == "1"
+    assert codec.decode(new_token)["sub"] == "2"
+
+def test_rejects_tampered_and_expired_tokens():
+    codec = TokenCodec(KeyRing([OLD_KEY], "2024"))
+    token = codec.encode({"sub": "1"}, timedelta(minutes=5))
+    header, payload, signature = token.split(".")
+    forged = jwt.encode({"sub": "2"}, "other-secret", algorithm="HS256", headers={"kid": "2024"})
+    with pytest.raises(JWTError):
+        codec.decode(".".join([header, forged.split(".")[1], signature]))
+    with pytest.raises(JWTError):
+        codec.decode(codec.encode({"sub": "1"}, timedelta(seconds=-1)))
+
+def test_memoised_token_still_expires(monkeypatch):
+    codec = TokenCodec(KeyRing([OLD_KEY], "2024"))
+    token = codec.encode({"sub": "1"}, timedelta(seconds=30))
+    codec.decode(token)
+    monkeypatch.setattr("app.auth.jwt.time.time", lambda: 10**12)
+    with pytest.raises(JWTError):
+        codec.decode(token)
@@ -0,0 +1,49 @@
+import json
+
+from sqlalchemy import select, text
+
+from app.database import SessionLocal
+from app.models.models import Order, OrderStatus, Product, order_product
+from app.pagination import ExplainJSON, seek
+
+
+def plan_nodes(query):
+    """Plan nodes of `query`, with sequential and bitmap scans ruled out so the
+    small test tables do not hide whether an index scan could be used."""
+    with SessionLocal() as db:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        db.execute(text("SET LOCAL enable_bitmapscan = off"))
+        plan = db.execute(ExplainJSON(query)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes, pending = [], [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get("Plans", []))
+    return nodes
+
+def index_names(query):
+    return {node["Index Name"] for node in plan_nodes(query) if "Index Name" in node}
+
+
+def test_filtered_order_pages_are_read_in_index_order():
+    sort_key = (Order.created_at, Order.id)
+    for column, value, index in [
+        (Order.client_id, 1, "ix_orders_client_id_created_at_id"),
+        (Order.status, OrderStatus.PENDING, "ix_orders_status_created_at_id"),
+    ]:
+        query = seek(select(Order.id).where(column == value), sort_key, 10)
+        assert index in index_names(query)
+        # The index order is the page order: no sort step on top
+        assert not any(node["Node Type"] == "Sort" for node in plan_nodes(query))
+
+def test_product_filters_use_indexes():
+    sort_key = (Product.created_at, Product.id)
+    query = seek(select(Product.id).where(Product.section == "x"), sort_key, 10)
+    assert "ix_products_section_created_at_id" in index_names(query)
+    assert "ix_products_price" in index_names(select(Product.id).where(Product.price >= 10))
+
+def test_order_lines_by_product_use_index():
+    query = select(order_product.c.order_id).where(order_product.c.product_id == 1)
+    assert "ix_order_product_product_id" in index_names(query)
@@ -0,0 +1,94 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.throttle import DatabaseBucketBackend, InMemoryBucketBackend, LoginThrottle, LoginThrottled, login_throttle
+from app.main import app
+from app.services import hashing
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("backend_class", [InMemoryBucketBackend, DatabaseBucketBackend])
+def test_bucket_sheds_after_burst(backend_class):
+    backend = backend_class()
+    key = f"test:{uuid.uuid4().hex}"
+    assert backend.take(key, rate=0.1, capacity=2) == 0
+    assert backend.take(key, rate=0.1, capacity=2) == 0
+    retry_after = backend.take(key, rate=0.1, capacity=2)
+    assert 0 < retry_after <= 10
+
+@pytest.mark.parametrize("backend_class", [InMemoryBucketBackend, DatabaseBucketBackend])
+def test_give_returns_a_token(backend_class):
+    backend = backend_class()
+    key = f"test:{uuid.uuid4().hex}"
+    assert backend.take(key, rate=0.1, capacity=1) == 0
+    backend.give(key, rate=0.1, capacity=1)
+    backend.give(key, rate=0.1, capacity=1)
+    # Never beyond the capacity
+    assert backend.take(key, rate=0.1, capacity=1) == 0
+    assert 0 < backend.take(key, rate=0.1, capacity=1) <= 10
+
+def test_throttle_keys_on_normalized_email():
+    throttle = LoginThrottle(InMemoryBucketBackend(), email_rate=0.01, email_burst=1, ip_rate=1, ip_burst=100)
+    throttle.check("Someone@Example.com ", "10.0.0.1")
+    with pytest.raises(LoginThrottled) as shed:
+        throttle.check("someone@example.com", "10.0.0.2")
+    assert shed.value.scope == "email"
+    assert throttle.stats()["shed"]["email"] == 1
+
+def test_only_failed_logins_count_against_the_email(monkeypatch, register_and_login):
+    monkeypatch.setattr(login_throttle, "backend", InMemoryBucketBackend())
+    monkeypatch.setattr(login_throttle, "email_burst", 1)
+    email = register_and_login()["user"]["email"]
+    for _ in range(3):
+        assert client.post("/auth/login", data={"username": email, "password": "testpassword"}).status_code == 200
+
+    assert client.post("/auth/login", data={"username": email, "password": "wrong"}).status_code == 401
+    shed = login_throttle.shed["email"]
+    response = client.post("/auth/login", data={"username": email, "password": "testpassword"})
+    assert response.status_code == 429
+    assert login_throttle.shed["email"] == shed + 1
+
+def test_parallel_attempts_are_held_to_the_burst(monkeypatch, register_and_login):
+    monkeypatch.setattr(login_throttle, "backend", InMemoryBucketBackend())
+    monkeypatch.setattr(login_throttle, "email_burst", 3)
+    email = register_and_login()["user"]["email"]
+    verify = hashing.hashing_pool.verify
+    checks = []
+    def counting_verify(password, hashed):
+        checks.append(password)
+        return verify(password, hashed)
+    monkeypatch.setattr(hashing.hashing_pool, "verify", counting_verify)
+
+    def attempt(_):
+        return client.post("/auth/login", data={"username": email, "password": "wrong"}).status_code
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        statuses = list(pool.map(attempt, range(10)))
+    assert sorted(statuses) == [401] * 3 + [429] * 7
+    assert len(checks) == 3
+
+def test_login_returns_429_before_hashing(monkeypatch):
+    monkeypatch.setattr(login_throttle, "backend", InMemoryBucketBackend())
+    monkeypatch.setattr(login_throttle, "email_burst", 1)
+    email = f"throttled-{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/auth/login", data={"username": email, "password": "wrong"})
+
+    completed = hashing.hashing_pool.completed
+    shed = dict(login_throttle.shed)
+    response = client.post("/auth/login", data={"username": email, "password": "wrong"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert hashing.hashing_pool.completed == completed
+    assert login_throttle.shed == {"ip": shed["ip"], "email": shed["email"] + 1}
+
+def test_ip_limit_spans_emails(monkeypatch):
+    monkeypatch.setattr(login_throttle, "backend", InMemoryBucketBackend())
+    monkeypatch.setattr(login_throttle, "ip_burst", 2)
+    shed = dict(login_throttle.shed)
+    emails = [f"ip-{uuid.uuid4().hex[:8]}@example.com" for _ in range(3)]
+    statuses = [client.post("/auth/login", data={"username": e, "password": "wrong"}).status_code for e in emails]
+    assert statuses == [401, 401, 429]
+    assert login_throttle.shed == {"ip": shed["ip"] + 1, "email": shed["email"]}
@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def order(client_id, *items, status="pending"):
+    return {"client_id": client_id, "status": status, "items": [{"product_id": p, "quantity": q} for p, q in items]}
+
+
+def test_batch_creates_orders_and_reports_the_rest(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    a, b = create_product(5), create_product(2)
+
+    orders = [
+        order(client_id, (a, 2), (b, 1)),
+        order(999_999_999, (a, 1)),
+        order(client_id, (a, 1), (999_999_999, 1)),
+        order(client_id, (b, 2)),  # only 1 left after row 0
+        {"client_id": client_id, "status": "pending"},
+        order(client_id, (a, 1), status="lost"),
+        order(client_id, (a, 3)),
+    ]
+    response = client.post("/orders/batch", json={"orders": orders}, headers=admin_headers)
+    assert response.status_code == 200
+    result = response.json()
+
+    assert (result["created"], result["failed"]) == (2, 5)
+    assert [r["row"] for r in result["results"]] == list(range(7))
+    errors = {r["row"]: r["error"] for r in result["results"] if r["error"]}
+    assert errors[1] == "Client not found"
+    assert errors[2] == "Products not found: [999999999]"
+    assert errors[3] == f"Insufficient stock for products: [{b}]"
+    assert "An order needs product_ids or items" in errors[4]
+    assert errors[5].startswith("status:")
+
+    created = [r["order"] for r in result["results"] if r["order"]]
+    assert [o["items"] for o in created] == [
+        [{"product_id": a, "quantity": 2}, {"product_id": b, "quantity": 1}],
+        [{"product_id": a, "quantity": 3}],
+    ]
+    assert all(o["client"]["id"] == client_id and o["products"] for o in created)
+    assert (stock_of(a), stock_of(b)) == (0, 1)
+    assert client.get(f"/orders/{created[1]['id']}", headers=admin_headers).json()["items"] == created[1]["items"]
+
+def test_batch_with_nothing_to_create(admin_headers, create_product, stock_of):
+    a = create_product(1)
+
+    response = client.post("/orders/batch", json={"orders": [order(999_999_999, (a, 1))]}, headers=admin_headers)
+    assert response.json()["created"] == 0
+    assert stock_of(a) == 1
+    assert client.post("/orders/batch", json={"orders": []}, headers=admin_headers).status_code == 422
+
+def test_batch_draws_on_sharded_stock(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    plain, hot = create_product(10), create_product(6, shards=3)
+
+    orders = [order(client_id, (plain, 1), (hot, 4)), order(client_id, (hot, 2)), order(client_id, (hot, 1))]
+    result = client.post("/orders/batch", json={"orders": orders}, headers=admin_headers).json()
+    assert [r["error"] for r in result["results"]] == [None, None, f"Insufficient stock for products: [{hot}]"]
+    assert (stock_of(plain), stock_of(hot)) == (9, 0)
+
+def test_statements_do_not_grow_with_the_batch(admin_headers, create_product, create_client):
+    client_id = create_client()
+    products = [create_product(100) for _ in range(5)]
+
+    def statements_for(orders):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.post("/orders/batch", json={"orders": orders}, headers=admin_headers)
+            assert response.json()["failed"] == 0
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return statements
+
+    two = statements_for([order(client_id, (products[0], 1)) for _ in range(2)])
+    fifty = statements_for([order(client_id, *((p, 1) for p in products)) for _ in range(50)])
+    assert len(two) == len(fifty)
+    assert sum("UPDATE products SET" in s for s in fifty) == 1
+
+def test_concurrent_batches_do_not_deadlock(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    products = [create_product(1000) for _ in range(4)]
+
+    def post(n):
+        # Each batch names the products in a different order
+        ordered = products if n % 2 else products[::-1]
+        orders = [order(client_id, *((p, 1) for p in ordered[i:] + ordered[:i])) for i in range(4)]
+        return client.post("/orders/batch", json={"orders": orders}, headers=admin_headers).json()["created"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        created = list(pool.map(post, range(24)))
+
+    assert created == [4] * 24
+    assert all(stock_of(p) == 1000 - 96 for p in products)
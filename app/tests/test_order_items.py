@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def place_order(headers, client_id, items):
+    return client.post(
+        "/orders/",
+        json={"client_id": client_id, "status": "pending", "items": [{"product_id": p, "quantity": q} for p, q in items]},
+        headers=headers,
+    )
+
+
+def test_order_reserves_quantities(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    a, b = create_product(10), create_product(5)
+
+    response = client.post(
+        "/orders/",
+        json={"client_id": client_id, "status": "pending", "product_ids": [b], "items": [{"product_id": a, "quantity": 3}, {"product_id": b, "quantity": 1}]},
+        headers=admin_headers,
+    )
+    assert response.status_code == 201
+    order = response.json()
+    assert order["items"] == [{"product_id": a, "quantity": 3}, {"product_id": b, "quantity": 2}]
+    assert sorted(p["id"] for p in order["products"]) == [a, b]
+    assert (stock_of(a), stock_of(b)) == (7, 3)
+    assert client.get(f"/orders/{order['id']}", headers=admin_headers).json()["items"] == order["items"]
+
+def test_order_with_a_short_line_reserves_nothing(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    a, b = create_product(10), create_product(1)
+
+    response = place_order(admin_headers, client_id, [(a, 2), (b, 2)])
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Insufficient stock for products: [{b}]"
+    assert (stock_of(a), stock_of(b)) == (10, 1)
+    assert client.get("/orders/", params={"client_id": client_id}, headers=admin_headers).json() == []
+
+    assert place_order(admin_headers, client_id, [(a, 1), (999_999_999, 1)]).status_code == 404
+    assert stock_of(a) == 10
+
+def test_round_trips_do_not_grow_with_lines(admin_headers, create_product, create_client):
+    client_id = create_client()
+    products = [create_product(5) for _ in range(6)]
+
+    def statements_for(items):
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            assert place_order(admin_headers, client_id, items).status_code == 201
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return statements
+
+    one_line = statements_for([(products[0], 1)])
+    six_lines = statements_for([(p, 2) for p in products])
+    assert len(one_line) == len(six_lines)
+    reservations = [s for s in six_lines if "UPDATE products SET" in s]
+    assert len(reservations) == 1
+    # The rows are locked in id order by the statement itself, not by a separate SELECT
+    assert "ORDER BY products.id FOR NO KEY UPDATE" in reservations[0]
+    assert not any("FOR UPDATE" in s for s in six_lines)
+
+def test_hot_sku_is_never_oversold(admin_headers, create_product, create_client, stock_of):
+    client_id = create_client()
+    hot = create_product(20)
+
+    def buy(_):
+        return place_order(admin_headers, client_id, [(hot, 1)]).status_code
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        statuses = list(pool.map(buy, range(50)))
+
+    assert statuses.count(201) == 20
+    assert statuses.count(400) == 30
+    assert stock_of(hot) == 0
+    sold = 20
+    lines = client.get("/orders/", params={"client_id": client_id, "limit": 100}, headers=admin_headers).json()
+    assert sum(item["quantity"] for order in lines for item in order["items"]) == sold
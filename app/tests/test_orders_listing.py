@@ -0,0 +1,39 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_section_filter_pages_by_order_not_by_product_line(admin_headers, create_product, create_client):
+    section = f"multi-{uuid.uuid4().hex[:8]}"
+    client_id = create_client()
+    product_ids = [create_product(10, section) for _ in range(4)]
+    for _ in range(3):
+        response = client.post(
+            "/orders/",
+            json={"client_id": client_id, "status": "pending", "product_ids": product_ids},
+            headers=admin_headers,
+        )
+        assert response.status_code == 201
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/orders/", params={"section": section, "limit": 2}, headers=admin_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    orders = response.json()
+    assert len(orders) == 2
+    assert all(len(order["products"]) == 4 for order in orders)
+    assert "X-Next-Cursor" in response.headers
+    # ids page, then orders, products, line items and clients by IN batch
+    assert len(statements) == 5
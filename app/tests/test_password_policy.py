@@ -0,0 +1,63 @@
+import asyncio
+import time
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.auth import utils
+from app.crud import user as user_crud
+from app.database import SessionLocal
+from app.main import app
+from app.services.auth import AuthService
+from app.services.hashing import hashing_pool
+
+client = TestClient(app)
+
+
+def test_policy_flags_hashes_with_other_costs():
+    cheap = utils.build_password_context(["bcrypt"], bcrypt_rounds=4)
+    stronger = utils.build_password_context(["bcrypt"], bcrypt_rounds=5)
+    hashed = cheap.hash("secret")
+    assert not cheap.needs_update(hashed)
+    assert stronger.needs_update(hashed)
+    assert stronger.verify("secret", hashed)
+
+def test_outdated_hash_is_upgraded_on_login(monkeypatch):
+    # Hash in-process so the patched policy applies to the pool's jobs
+    hashing_pool.shutdown()
+    monkeypatch.setattr(hashing_pool, "max_workers", 0)
+    monkeypatch.setattr(utils, "pwd_context", utils.build_password_context(["bcrypt"], bcrypt_rounds=4))
+
+    email = f"rehash-{uuid.uuid4().hex[:8]}@example.com"
+    client.post("/auth/register", json={"name": email, "email": email, "password": "testpassword", "role": "user"})
+    monkeypatch.setattr(utils, "pwd_context", utils.build_password_context(["bcrypt"], bcrypt_rounds=5))
+
+    response = client.post("/auth/login", data={"username": email, "password": "testpassword"})
+    assert response.status_code == 200
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with SessionLocal() as db:
+            hashed = user_crud.get_user_by_email(db, email).hashed_password
+        if hashed.startswith("$2b$05$"):
+            break
+        time.sleep(0.05)
+    assert hashed.startswith("$2b$05$")
+    hashing_pool.shutdown()
+
+def test_rehash_does_not_overwrite_a_password_change(monkeypatch, register_and_login):
+    hashing_pool.shutdown()
+    monkeypatch.setattr(hashing_pool, "max_workers", 0)
+    tokens = register_and_login()
+    user_id, email = tokens["user"]["id"], tokens["user"]["email"]
+    with SessionLocal() as db:
+        verified_hash = user_crud.get_user_by_email(db, email).hashed_password
+
+    # The password changes between the login's verify and the background rehash
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.put(f"/users/{user_id}", json={"password": "newpassword"}, headers=headers).status_code == 200
+    asyncio.run(AuthService()._rehash_password(user_id, verified_hash, "testpassword"))
+
+    assert client.post("/auth/login", data={"username": email, "password": "newpassword"}).status_code == 200
+    assert client.post("/auth/login", data={"username": email, "password": "testpassword"}).status_code == 401
+    hashing_pool.shutdown()
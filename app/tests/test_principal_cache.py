@@ -0,0 +1,34 @@
+from app.auth.principal_cache import Principal, PrincipalCache
+from app.models.models import UserRole
+
+
+def test_cache_hit_and_miss_counters():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    assert cache.get(1) is None
+    cache.set(Principal(id=1, role=UserRole.USER, is_active=True))
+    assert cache.get(1).id == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_cache_evicts_least_recently_used():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    for user_id in (1, 2):
+        cache.set(Principal(id=user_id, role=UserRole.USER, is_active=True))
+    cache.get(1)
+    cache.set(Principal(id=3, role=UserRole.USER, is_active=True))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_entries_expire():
+    cache = PrincipalCache(maxsize=10, ttl=0)
+    cache.set(Principal(id=1, role=UserRole.ADMIN, is_active=True))
+    assert cache.get(1) is None
+
+def test_invalidate_removes_entry():
+    cache = PrincipalCache(maxsize=10, ttl=60)
+    cache.set(Principal(id=1, role=UserRole.ADMIN, is_active=True))
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.stats()["invalidations"] == 1
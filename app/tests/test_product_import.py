@@ -0,0 +1,112 @@
+import io
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal
+from app.main import app
+from app.models.models import Product
+from app.services.product_import import import_products, read_records
+
+client = TestClient(app)
+
+
+def upload(headers, filename, content, **params):
+    return client.post(
+        "/products/import", files={"file": (filename, content.encode())}, params=params, headers=headers
+    )
+
+def products_by_barcode(barcodes):
+    with SessionLocal() as db:
+        return {p.barcode: p for p in db.query(Product).filter(Product.barcode.in_(barcodes))}
+
+
+def test_csv_import_upserts_by_barcode_and_reports_bad_rows(admin_headers):
+    a, b, c = (uuid.uuid4().hex[:13] for _ in range(3))
+    content = (
+        "description,price,barcode,section,stock,expiry_date,images\n"
+        f"Arroz 5kg,21.90,{a},mercearia,10,,\n"
+        f"Feijao 1kg,8.50,{b},mercearia,-1,,\n"
+        f"\"Oleo, soja\",7.25,{c},mercearia,4,2027-01-31,a.png|b.png\n"
+        f"Sem preco,,{uuid.uuid4().hex[:13]},mercearia,1,,\n"
+    )
+    response = upload(admin_headers, "catalog.csv", content)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["received"], report["inserted"], report["updated"], report["failed"]) == (4, 2, 0, 2)
+    assert [(e["row"], e["barcode"]) for e in report["errors"]] == [(2, b), (4, report["errors"][1]["barcode"])]
+    assert report["errors"][0]["error"].startswith("stock")
+    assert report["errors"][1]["error"].startswith("price")
+
+    stored = products_by_barcode([a, c])
+    assert stored[c].description == "Oleo, soja"
+    assert stored[c].images == ["a.png", "b.png"]
+    assert str(stored[c].expiry_date) == "2027-01-31"
+
+    # An upsert replaces every field: new price for a, no expiry/images for c
+    content = (
+        "description,price,barcode,section,stock\n"
+        f"Arroz 5kg,19.90,{a},mercearia,10\n"
+        f"\"Oleo, soja\",7.25,{c},mercearia,4\n"
+    )
+    report = upload(admin_headers, "catalog.csv", content).json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (0, 2, 0)
+    # Importing the same file again rewrites nothing
+    report = upload(admin_headers, "catalog.csv", content).json()
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 0, 2)
+    assert str(products_by_barcode([a])[a].price) == "19.90"
+
+def test_ndjson_import_reports_unparseable_lines(admin_headers):
+    barcode = uuid.uuid4().hex[:13]
+    lines = [
+        json.dumps({"description": "Cafe", "price": "15.00", "barcode": barcode, "section": "bebidas", "stock": 3}),
+        "{not json",
+        "",
+        json.dumps(["not", "an", "object"]),
+    ]
+    response = upload(admin_headers, "catalog.txt", "\n".join(lines), format="ndjson")
+    report = response.json()
+    assert (report["received"], report["inserted"], report["failed"]) == (3, 1, 2)
+    assert [e["row"] for e in report["errors"]] == [2, 3]
+
+def test_unknown_upload_format_is_rejected(admin_headers):
+    assert upload(admin_headers, "catalog.bin", "x").status_code == 400
+
+def test_import_commits_chunk_by_chunk_and_last_duplicate_wins():
+    barcodes = [uuid.uuid4().hex[:13] for _ in range(3)]
+    lines = [
+        json.dumps({"description": f"item {i}", "price": "1.00", "barcode": barcode, "section": "s", "stock": i})
+        for i, barcode in enumerate(barcodes + [barcodes[0]])
+    ]
+    records = read_records(io.BytesIO("\n".join(lines).encode()), "ndjson")
+    with SessionLocal() as db:
+        report = import_products(db, records, chunk_size=2)
+    assert (report["received"], report["inserted"], report["updated"], report["failed"]) == (4, 3, 1, 0)
+    assert products_by_barcode(barcodes)[barcodes[0]].stock == 3
+
+def test_duplicates_within_a_chunk_are_counted_as_superseded():
+    barcode = uuid.uuid4().hex[:13]
+    lines = [
+        json.dumps({"description": "item", "price": "1.00", "barcode": barcode, "section": "s", "stock": stock})
+        for stock in (1, 2, 3)
+    ]
+    with SessionLocal() as db:
+        report = import_products(db, read_records(io.BytesIO("\n".join(lines).encode()), "ndjson"), chunk_size=10)
+    assert (report["inserted"], report["unchanged"], report["superseded"]) == (1, 0, 2)
+    assert products_by_barcode([barcode])[barcode].stock == 3
+
+def test_rows_the_database_rejects_are_isolated():
+    barcodes = [uuid.uuid4().hex[:13] for _ in range(5)]
+    # Passes validation, but Postgres text cannot hold a NUL character
+    descriptions = ["item", "item", "bad\u0000item", "item", "item"]
+    lines = [
+        json.dumps({"description": description, "price": "1.00", "barcode": barcode, "section": "s", "stock": 1})
+        for description, barcode in zip(descriptions, barcodes)
+    ]
+    with SessionLocal() as db:
+        report = import_products(db, read_records(io.BytesIO("\n".join(lines).encode()), "ndjson"), chunk_size=5)
+    assert (report["inserted"], report["failed"]) == (4, 1)
+    assert [(e["row"], e["barcode"]) for e in report["errors"]] == [(3, barcodes[2])]
+    assert report["errors"][0]["error"].startswith("Rejected by the database")
+    assert set(products_by_barcode(barcodes)) == set(barcodes) - {barcodes[2]}
@@ -0,0 +1,112 @@
+import io
+import json
+import uuid
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import engine
+from app.db_routing import ReplicaRouter, RoutingSession
+from app.models.models import Client
+from app.services.product_import import import_products, read_records
+
+# A second engine on the test database stands in for a replica
+replica = create_engine(settings.DB_URL)
+
+
+def make_sessionmaker(**router_options):
+    options = dict(max_lag=5, check_interval=60, sticky_seconds=60)
+    options.update(router_options)
+    router = ReplicaRouter([replica], **options)
+    return router, sessionmaker(class_=RoutingSession, bind=engine, autoflush=False, replica_router=router)
+
+def test_read_only_sessions_use_the_replica():
+    router, Session = make_sessionmaker()
+    with Session(info={"read_only": True}) as db:
+        assert db.get_bind() is replica
+    with Session() as db:
+        assert db.get_bind() is engine
+    assert router.stats()["replica_reads"] == 1
+
+def test_lagging_replica_falls_back_to_primary(monkeypatch):
+    router, Session = make_sessionmaker(max_lag=1)
+    monkeypatch.setattr(router, "measure_lag", lambda engine: 30.0)
+    with Session(info={"read_only": True}) as db:
+        assert db.get_bind() is engine
+    assert router.stats()["primary_fallbacks"] == 1
+
+def test_unreachable_replica_falls_back_to_primary(monkeypatch):
+    router, Session = make_sessionmaker()
+    def fail(engine):
+        raise ConnectionError("replica down")
+    monkeypatch.setattr(router, "measure_lag", fail)
+    with Session(info={"read_only": True}) as db:
+        assert db.get_bind() is engine
+
+def test_reads_after_a_write_stay_on_primary():
+    router, Session = make_sessionmaker()
+    email = f"replica-{uuid.uuid4().hex[:8]}@example.com"
+    with Session(info={"user_id": 4242}) as db:
+        client = Client(name="replica", email=email, cpf=uuid.uuid4().hex[:11])
+        db.add(client)
+        db.commit()
+        db.delete(client)
+        db.commit()
+
+    # The same user is sticky to the primary, other users are not
+    with Session(info={"read_only": True, "user_id": 4242}) as db:
+        assert db.get_bind() is engine
+    with Session(info={"read_only": True, "user_id": 1}) as db:
+        assert db.get_bind() is replica
+    assert router.stats()["sticky_reads"] == 1
+
+def test_read_only_session_that_flushes_moves_to_primary():
+    router, Session = make_sessionmaker()
+    with Session(info={"read_only": True}) as db:
+        db.add(Client(name="replica", email=f"replica-{uuid.uuid4().hex[:8]}@example.com", cpf=uuid.uuid4().hex[:11]))
+        db.flush()
+        assert db.get_bind() is engine
+        db.rollback()
+
+def test_expired_writers_are_swept(monkeypatch):
+    router, _ = make_sessionmaker(sticky_seconds=10)
+    now = 1000.0
+    monkeypatch.setattr("app.db_routing.time.monotonic", lambda: now)
+    router._swept_at = now
+    for user_id in range(100):
+        router.mark_write(user_id)
+    assert router.stats()["sticky_users"] == 100
+
+    # Users who never read again are dropped once their window has passed
+    now += 11
+    router.mark_write(100)
+    assert router.stats()["sticky_users"] == 1
+    assert router.is_sticky(100)
+    assert not router.is_sticky(0)
+
+def test_core_writes_make_the_user_sticky():
+    router, Session = make_sessionmaker()
+    emails = [f"core-{uuid.uuid4().hex[:8]}@example.com" for _ in range(2)]
+    with Session(info={"user_id": 4343}) as db:
+        db.execute(
+            insert(Client).on_conflict_do_nothing(),
+            [{"name": "core", "email": email, "cpf": uuid.uuid4().hex[:11]} for email in emails],
+        )
+        db.commit()
+        db.execute(delete(Client).where(Client.email.in_(emails)))
+        db.commit()
+
+    with Session(info={"read_only": True, "user_id": 4343}) as db:
+        assert db.get_bind() is engine
+    assert router.stats()["sticky_reads"] == 1
+
+def test_product_import_makes_the_user_sticky():
+    router, Session = make_sessionmaker()
+    line = json.dumps({"description": "item", "price": "1.00", "barcode": uuid.uuid4().hex[:13], "section": "s", "stock": 1})
+    with Session(info={"user_id": 4444}) as db:
+        assert import_products(db, read_records(io.BytesIO(line.encode()), "ndjson"))["inserted"] == 1
+
+    with Session(info={"read_only": True, "user_id": 4444}) as db:
+        assert db.get_bind() is engine
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.auth.principal_cache import principal_cache
+from app.database import engine
+from app.main import app
+
+client = TestClient(app)
+
+
+@contextmanager
+def count_checkouts():
+    checkouts = []
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+    event.listen(engine, "checkout", on_checkout)
+    try:
+        yield checkouts
+    finally:
+        event.remove(engine, "checkout", on_checkout)
+
+
+def test_authenticated_request_checks_out_one_connection(admin_headers):
+    headers = admin_headers
+    # Cold principal cache: the auth lookup and the handler share one session
+    principal_cache.clear()
+    with count_checkouts() as checkouts:
+        response = client.get("/clients/", headers=headers)
+    assert response.status_code == 200
+    assert len(checkouts) == 1
+
+def test_request_without_database_work_checks_out_nothing(admin_headers):
+    headers = admin_headers
+    client.get("/clients/", headers=headers)  # warm the principal cache
+    with count_checkouts() as checkouts:
+        response = client.get("/metrics/", headers=headers)
+    assert response.status_code == 200
+    assert checkouts == []
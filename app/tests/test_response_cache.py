@@ -0,0 +1,246 @@
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import engine, replica_router
+from app.main import app
+from app.response_cache import (
+    CachedResponse, DatabaseCacheBackend, LocalCacheBackend, ResponseCache, cache_key, response_cache,
+)
+
+client = TestClient(app)
+
+
+def product_queries(request):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM products" in statement:
+            statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return response, statements
+
+def rendered(text):
+    return CachedResponse(body=text.encode(), headers={})
+
+
+def test_product_reads_are_served_from_the_cache(admin_headers, create_product):
+    section = f"cache-{uuid.uuid4().hex[:8]}"
+    product_id = create_product(5, section, price="10.00")
+
+    first, statements = product_queries(lambda: client.get(f"/products/{product_id}", headers=admin_headers))
+    assert statements
+    second, statements = product_queries(lambda: client.get(f"/products/{product_id}", headers=admin_headers))
+    assert statements == []
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert client.get(f"/products/{product_id}", headers={**admin_headers, "If-None-Match": first.headers["etag"]}).status_code == 304
+
+    # The same filters spelled differently share an entry
+    page = client.get("/products/", params={"section": section, "min_price": "10", "available": "true"}, headers=admin_headers)
+    again, statements = product_queries(
+        lambda: client.get(f"/products/?available=1&min_price=10.00&section={section}", headers=admin_headers)
+    )
+    assert statements == []
+    assert again.json() == page.json() == [first.json()]
+
+def test_product_writes_invalidate(admin_headers, create_product, create_client):
+    section = f"cache-{uuid.uuid4().hex[:8]}"
+    product_id = create_product(5, section)
+    listing = lambda: client.get("/products/", params={"section": section}, headers=admin_headers).json()
+    stock_of = lambda: client.get(f"/products/{product_id}", headers=admin_headers).json()["stock"]
+    assert [p["stock"] for p in listing()] == [5] and stock_of() == 5
+
+    client.put(f"/products/{product_id}", json={"stock": 7}, headers=admin_headers)
+    assert [p["stock"] for p in listing()] == [7] and stock_of() == 7
+
+    client_id = create_client()
+    order = {"client_id": client_id, "status": "pending", "items": [{"product_id": product_id, "quantity": 2}]}
+    assert client.post("/orders/", json=order, headers=admin_headers).status_code == 201
+    assert [p["stock"] for p in listing()] == [5] and stock_of() == 5
+    assert client.post("/orders/batch", json={"orders": [order]}, headers=admin_headers).json()["created"] == 1
+    assert [p["stock"] for p in listing()] == [3] and stock_of() == 3
+
+    other = create_product(1, section)
+    assert {p["id"] for p in listing()} == {product_id, other}
+    client.delete(f"/products/{other}", headers=admin_headers)
+    assert client.get(f"/products/{other}", headers=admin_headers).status_code == 404
+    assert [p["id"] for p in listing()] == [product_id]
+
+def test_client_writes_invalidate(admin_headers, create_client):
+    client_id = create_client("cached")
+    url = f"/clients/{client_id}"
+    email = client.get(url, headers=admin_headers).json()["email"]
+    assert client.get("/clients/", params={"email": email}, headers=admin_headers).json()[0]["name"] == "cached"
+
+    client.put(url, json={"name": "renamed"}, headers=admin_headers)
+    assert client.get(url, headers=admin_headers).json()["name"] == "renamed"
+    assert client.get("/clients/", params={"email": email}, headers=admin_headers).json()[0]["name"] == "renamed"
+
+    cpf = str(uuid.uuid4().int)[:11]
+    batch = [{"name": "batch", "email": f"{cpf}@example.com", "cpf": cpf}]
+    listing = client.get("/clients/", params={"email": f"{cpf}@example.com"}, headers=admin_headers).json()
+    assert listing == []
+    client.post("/clients/batch", json={"clients": batch}, headers=admin_headers)
+    assert len(client.get("/clients/", params={"email": f"{cpf}@example.com"}, headers=admin_headers).json()) == 1
+
+@contextmanager
+def lagging_replica(monkeypatch):
+    """Route read-only sessions to a replica frozen at the current snapshot."""
+    with engine.connect() as holder:
+        holder.exec_driver_sql("BEGIN ISOLATION LEVEL REPEATABLE READ")
+        snapshot = holder.exec_driver_sql("SELECT pg_export_snapshot()").scalar()
+        replica = create_engine(settings.DB_URL)
+        @event.listens_for(replica, "begin")
+        def replay_the_past(conn):
+            conn.exec_driver_sql("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            conn.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+        monkeypatch.setattr(replica_router, "replicas", [replica])
+        monkeypatch.setattr(replica_router, "_cycle", itertools.cycle([0]))
+        monkeypatch.setattr(replica_router, "_lag", {0: 0.0})
+        monkeypatch.setattr(replica_router, "_checked_at", time.monotonic())
+        monkeypatch.setattr(replica_router, "check_interval", 3600)
+        try:
+            yield replica
+        finally:
+            replica.dispose()
+
+def test_misses_after_an_invalidation_are_not_loaded_from_a_lagging_replica(monkeypatch, admin_headers, login_headers, create_product):
+    product_id = create_product(5)
+    url = f"/products/{product_id}"
+    reader = login_headers()
+    assert client.get(url, headers=reader).json()["stock"] == 5
+
+    with lagging_replica(monkeypatch) as replica:
+        client.put(url, json={"stock": 7}, headers=admin_headers)
+        with replica.connect() as conn:
+            assert conn.execute(text("SELECT stock FROM products WHERE id = :id"), {"id": product_id}).scalar() == 5
+        # Another user, so read-your-writes stickiness does not hide the replica
+        assert client.get(url, headers=reader).json()["stock"] == 7
+    assert client.get(url, headers=reader).json()["stock"] == 7
+
+def test_concurrent_misses_load_once():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    loads = []
+    def load():
+        loads.append(1)
+        time.sleep(0.2)
+        return rendered("[]")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load("k", ("t",), load), range(8)))
+    assert len(loads) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["coalesced"] == 7
+
+    async def main():
+        cache = ResponseCache(maxsize=10, ttl=60)
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.1)
+            return rendered("[]")
+        return await asyncio.gather(*(cache.aget_or_load("k", ("t",), load) for _ in range(8)))
+    loads.clear()
+    assert len(asyncio.run(main())) == 8
+    assert len(loads) == 1
+
+def test_failed_loads_reach_every_waiter_and_are_not_kept():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    started = threading.Event()
+    def load():
+        started.set()
+        time.sleep(0.1)
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(cache.get_or_load, "k", ("t",), load)
+        started.wait()
+        follower = pool.submit(cache.get_or_load, "k", ("t",), load)
+        for future in (leader, follower):
+            with pytest.raises(HTTPException):
+                future.result()
+    assert cache.get_or_load("k", ("t",), lambda: rendered("ok")).body == b"ok"
+
+def test_load_overlapping_an_invalidation_is_not_kept():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    def load():
+        # A write commits while the rows are being read
+        cache.invalidate("products")
+        return rendered("stale")
+
+    assert cache.get_or_load("k", ("products",), load).body == b"stale"
+    assert cache.get_or_load("k", ("products",), lambda: rendered("fresh")).body == b"fresh"
+    assert cache.get_or_load("k", ("products",), lambda: rendered("again")).body == b"fresh"
+
+def test_tags_and_lru():
+    cache = ResponseCache(maxsize=2, ttl=60)
+    cache.get_or_load("a", ("product:1",), lambda: rendered("a"))
+    cache.get_or_load("b", ("product:2",), lambda: rendered("b"))
+    cache.invalidate("products", "product:1")
+    assert cache.get_or_load("a", ("product:1",), lambda: rendered("a2")).body == b"a2"
+    assert cache.get_or_load("b", ("product:2",), lambda: rendered("b2")).body == b"b"
+    cache.get_or_load("c", (), lambda: rendered("c"))
+    assert cache.stats()["evictions"] == 1
+    assert cache_key("products", min_price=None, section="x") == cache_key("products", section="x")
+
+def test_workers_share_entries_and_invalidations():
+    shared = LocalCacheBackend()
+    one, two = ResponseCache(maxsize=10, ttl=60, backend=shared), ResponseCache(maxsize=10, ttl=60, backend=shared)
+
+    one.get_or_load("k", ("product:1",), lambda: rendered("v1"))
+    assert two.get_or_load("k", ("product:1",), lambda: rendered("loaded")).body == b"v1"
+    assert two.stats()["shared_hits"] == 1
+
+    one.invalidate("product:1")
+    assert two.get_or_load("k", ("product:1",), lambda: rendered("v2")).body == b"v2"
+    assert one.get_or_load("k", ("product:1",), lambda: rendered("loaded")).body == b"v2"
+
+def test_database_backend_across_workers():
+    channel = f"response_cache_{uuid.uuid4().hex[:8]}"
+    backends = [DatabaseCacheBackend(channel=channel), DatabaseCacheBackend(channel=channel)]
+    one, two = (ResponseCache(maxsize=10, ttl=60, backend=backend) for backend in backends)
+    key = f"test-{uuid.uuid4().hex}"
+
+    def eventually(check):
+        deadline = time.monotonic() + 5
+        while not check():
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+    for cache in (one, two):
+        cache.start()
+    try:
+        eventually(lambda: all(backend._thread and backend.stats()["failures"] == 0 for backend in backends))
+        time.sleep(0.2)  # both listening
+        one.get_or_load(key, ("product:1",), lambda: rendered("v1"))
+        eventually(lambda: backends[0].stats()["stored"] == 1)
+        assert two.get_or_load(key, ("product:1",), lambda: rendered("loaded")).body == b"v1"
+
+        invalidations = two.stats()["invalidations"]
+        one.invalidate("product:1")
+        eventually(lambda: two.stats()["invalidations"] > invalidations)
+        assert two.stats()["size"] == 0
+        assert two.get_or_load(key, ("product:1",), lambda: rendered("v2")).body == b"v2"
+    finally:
+        for cache in (one, two):
+            cache.clear()
+            cache.stop()
+
+def test_cache_stats_in_metrics(admin_headers):
+    stats = client.get("/metrics/", headers=admin_headers).json()["response_cache"]
+    assert stats["maxsize"] == response_cache.maxsize
+    assert {"hits", "misses", "coalesced", "invalidations"} <= stats.keys()
@@ -0,0 +1,73 @@
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.crud.search import search_clients_query, search_products_query
+from app.database import SessionLocal
+from app.main import app
+from app.pagination import ExplainJSON
+
+client = TestClient(app)
+
+
+def index_names(query):
+    """Index names in the plan of `query`, with sequential scans ruled out so
+    the tiny test tables do not hide whether an index could be used."""
+    with SessionLocal() as db:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = db.execute(ExplainJSON(query)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    names, nodes = set(), [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Index Name" in node:
+            names.add(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return names
+
+
+def test_search_clients_ranks_closest_match_first(admin_headers, create_client):
+    token = uuid.uuid4().hex[:8]
+    loose = create_client(f"Maria {token} Aparecida da Silva Santos")
+    close = create_client(f"Maria {token}")
+    create_client("Someone Else")
+
+    response = client.get("/search/clients", params={"q": f"maria {token}"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == [close, loose]
+
+    response = client.get("/search/clients", params={"q": f"maria {token}", "skip": 1, "limit": 1}, headers=admin_headers)
+    assert [c["id"] for c in response.json()] == [loose]
+
+def test_search_products_matches_substring_and_escapes_wildcards(admin_headers, create_product):
+    token = uuid.uuid4().hex[:8]
+    product_id = create_product(description=f"Cafe torrado {token} 500g")
+
+    response = client.get("/search/products", params={"q": token[2:7]}, headers=admin_headers)
+    assert [p["id"] for p in response.json()] == [product_id]
+    # % and _ are literal characters, not LIKE wildcards
+    response = client.get("/search/products", params={"q": f"%{token[2:5]}_"}, headers=admin_headers)
+    assert response.json() == []
+
+def test_unified_search_returns_clients_and_products(admin_headers, create_client, create_product):
+    token = uuid.uuid4().hex[:8]
+    client_id = create_client(f"Loja {token}")
+    product_id = create_product(description=f"Produto {token}")
+
+    response = client.get("/search/", params={"q": token}, headers=admin_headers)
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()["clients"]] == [client_id]
+    assert [p["id"] for p in response.json()["products"]] == [product_id]
+    response = client.get("/search/", params={"q": token, "skip": 1}, headers=admin_headers)
+    assert response.json() == {"clients": [], "products": []}
+
+def test_search_requires_three_characters(admin_headers):
+    assert client.get("/search/clients", params={"q": "ab"}, headers=admin_headers).status_code == 422
+    assert client.get("/search/", params={"q": "ab"}, headers=admin_headers).status_code == 422
+
+def test_search_queries_use_trigram_indexes():
+    assert index_names(search_clients_query("maria")) >= {"ix_clients_name_trgm", "ix_clients_email_trgm"}
+    assert "ix_products_description_trgm" in index_names(search_products_query("cafe"))
@@ -0,0 +1,32 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_users_edit_their_own_profile_but_not_their_role(register_and_login, admin_headers):
+    tokens = register_and_login()
+    user_id = tokens["user"]["id"]
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    name = f"renamed-{uuid.uuid4().hex[:8]}"
+    response = client.put(f"/users/{user_id}", json={"name": name}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == name
+
+    response = client.put(f"/users/{user_id}", json={"role": "admin"}, headers=headers)
+    assert response.status_code == 403
+    # is_active is not part of UserUpdate and is ignored
+    response = client.put(f"/users/{user_id}", json={"is_active": False}, headers=headers)
+    assert response.status_code == 200
+    user = client.get(f"/users/{user_id}", headers=headers).json()
+    assert (user["role"], user["is_admin"], user["is_active"]) == ("user", False, True)
+
+    other = register_and_login()["user"]["id"]
+    assert client.put(f"/users/{other}", json={"name": "x"}, headers=headers).status_code == 403
+    response = client.put(f"/users/{user_id}", json={"role": "admin"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["is_admin"] is True
@@ -0,0 +1,116 @@
+"""
+Catalog reads per second with the response cache off and on.
+
+    python -m benchmarks.bench_catalog_cache --products 2000 --reads 5000 --concurrency 16
+
+Runs the app in process against the configured database. It seeds
+`--products` products over a few sections, then has `--concurrency` threads
+make `--reads` storefront-shaped reads: mostly GET /products/{id} on a hot
+subset, plus section listings with price filters. Each run happens twice,
+once with the cache disabled (size 0) and once enabled, with an admin price
+change every `--write-every` reads to exercise invalidation. Reports reads/s,
+p50/p99 latency and the SQL statements run per read.
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models.models import Product
+from app.response_cache import response_cache
+
+SECTIONS = ["grocery", "bakery", "dairy", "drinks", "frozen"]
+
+
+def admin_headers(client: TestClient) -> dict:
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+    client.post("/auth/register", json={"name": email, "email": email, "password": "bench-password", "role": "admin"})
+    response = client.post("/auth/login", data={"username": email, "password": "bench-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def seed(count: int) -> list[int]:
+    tag = uuid.uuid4().hex[:6]
+    with SessionLocal() as db:
+        ids = db.execute(
+            insert(Product).returning(Product.id),
+            [
+                {
+                    "description": f"bench {tag} {i}", "price": f"{random.randint(100, 5000) / 100:.2f}",
+                    "barcode": f"{tag}{i:07d}", "section": SECTIONS[i % len(SECTIONS)], "stock": 100,
+                }
+                for i in range(count)
+            ],
+        ).scalars().all()
+        db.commit()
+    return ids
+
+
+def run(client: TestClient, headers: dict, ids: list[int], reads: int, concurrency: int, write_every: int):
+    hot = ids[: max(1, len(ids) // 20)]
+    statements = 0
+    lock = threading.Lock()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        with lock:
+            statements += 1
+
+    def read(n):
+        if write_every and n % write_every == 0:
+            client.put(f"/products/{random.choice(hot)}", json={"price": f"{random.randint(100, 5000) / 100:.2f}"}, headers=headers)
+        started = time.perf_counter()
+        if n % 5:
+            response = client.get(f"/products/{random.choice(hot)}", headers=headers)
+        else:
+            params = {"section": random.choice(SECTIONS), "max_price": random.choice(["10", "25", "50"]), "limit": 20}
+            response = client.get("/products/", params=params, headers=headers)
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(read, range(reads)))
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return reads / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], statements / reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--write-every", type=int, default=500, help="Reads between price changes; 0 for none")
+    args = parser.parse_args()
+
+    ids = seed(args.products)
+    maxsize = response_cache.maxsize or 10000
+    with TestClient(app) as client:
+        headers = admin_headers(client)
+        print(f"{'cache':<8} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'SQL/read':>9}")
+        rates = {}
+        for mode, size in (("off", 0), ("on", maxsize)):
+            response_cache.maxsize = size
+            response_cache.clear()
+            rate, p50, p99, per_read = run(client, headers, ids, args.reads, args.concurrency, args.write_every)
+            rates[mode] = rate
+            print(f"{mode:<8} {rate:>9.0f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f} {per_read:>9.2f}")
+        print(f"speedup: {rates['on'] / rates['off']:.2f}x")
+        stats = response_cache.stats()
+        print(f"hits {stats['hits']}, misses {stats['misses']}, coalesced {stats['coalesced']}, discarded {stats['discarded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Client onboarding throughput: POST /clients/ one by one against
+POST /clients/batch.
+
+Run against a live deployment (e.g. `uvicorn app.main:app`):
+
+    python benchmarks/bench_client_batch.py --base-url http://localhost:8000 --clients 5000
+
+Creates the same number of new clients through each path, sequentially from
+one connection, and reports clients per second. The single-row path costs
+two lookups, an insert, a commit and a refresh per client; the batch path a
+fixed number of statements per batch.
+"""
+import argparse
+import time
+import uuid
+
+import httpx
+
+
+def admin_token(client: httpx.Client) -> str:
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+    client.post(
+        "/auth/register",
+        json={"name": email, "email": email, "password": "bench-password", "role": "admin"},
+    ).raise_for_status()
+    response = client.post("/auth/login", data={"username": email, "password": "bench-password"})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def new_client() -> dict:
+    cpf = str(uuid.uuid4().int)[:11]
+    return {"name": f"Lead {cpf}", "email": f"lead-{cpf}@example.com", "cpf": cpf}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=5000, help="Clients created through each path")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        client.headers["Authorization"] = f"Bearer {admin_token(client)}"
+
+        started = time.perf_counter()
+        for _ in range(args.clients):
+            client.post("/clients/", json=new_client()).raise_for_status()
+        single = time.perf_counter() - started
+
+        created = 0
+        started = time.perf_counter()
+        for offset in range(0, args.clients, args.batch_size):
+            rows = [new_client() for _ in range(min(args.batch_size, args.clients - offset))]
+            response = client.post("/clients/batch", json={"clients": rows})
+            response.raise_for_status()
+            created += len(response.json()["created"])
+        batch = time.perf_counter() - started
+
+    print(f"{'path':<24} {'clients':>8} {'seconds':>8} {'clients/s':>10}")
+    print(f"{'POST /clients/':<24} {args.clients:>8} {single:>8.2f} {args.clients / single:>10.0f}")
+    print(f"{'POST /clients/batch':<24} {created:>8} {batch:>8.2f} {created / batch:>10.0f}")
+    print(f"speedup: {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
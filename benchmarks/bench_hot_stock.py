@@ -0,0 +1,178 @@
+"""
+Orders per second on a single hot SKU, with its stock in the product row
+against split across stock shards.
+
+Run against a live deployment (e.g. `uvicorn app.main:app --workers 4`):
+
+    python benchmarks/bench_hot_stock.py --base-url http://localhost:8000 --concurrency 32 --orders 2000
+
+Creates one product with enough stock for every order, then places
+`--orders` one-unit orders on it from `--concurrency` threads, once with
+plain stock and once after PUT /products/{id}/stock-shards. With plain
+stock every order queues on the product row lock from its UPDATE until its
+commit; with shards, concurrent orders mostly decrement different rows.
+Reports orders per second and latency percentiles for each mode, and checks
+that the stock went down by exactly the number of orders accepted.
+
+With --direct, the orders skip HTTP and run only the stock reservation of
+POST /orders/ against the configured database, so the comparison is not
+drowned by request handling on a small machine:
+
+    python -m benchmarks.bench_hot_stock --direct --commit-latency-ms 5
+
+--commit-latency-ms stands in for what a real deployment spends between the
+reservation and the end of the commit (network round trip, WAL flush on
+networked storage), during which plain stock keeps the product row locked.
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def admin_token(client: httpx.Client) -> str:
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+    client.post(
+        "/auth/register",
+        json={"name": email, "email": email, "password": "bench-password", "role": "admin"},
+    ).raise_for_status()
+    response = client.post("/auth/login", data={"username": email, "password": "bench-password"})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def run(base_url: str, headers: dict, client_id: int, product_id: int, orders: int, concurrency: int):
+    local = threading.local()
+
+    def place(_):
+        if not hasattr(local, "client"):
+            local.client = httpx.Client(base_url=base_url, headers=headers, timeout=60)
+        started = time.perf_counter()
+        response = local.client.post(
+            "/orders/",
+            json={"client_id": client_id, "status": "pending", "items": [{"product_id": product_id, "quantity": 1}]},
+        )
+        return response.status_code, time.perf_counter() - started
+
+    return _timed(place, orders, concurrency)
+
+
+def run_direct(product_id: int, orders: int, concurrency: int, commit_latency: float):
+    from sqlalchemy import text
+
+    from app.crud.stock import reserve_hot_stock, reserve_stock_statement
+    from app.database import SessionLocal
+
+    def place(_):
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            quantities = {product_id: 1}
+            reserved = set(db.execute(reserve_stock_statement(quantities)).scalars()) or reserve_hot_stock(db, quantities)
+            if commit_latency:
+                db.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": commit_latency})
+            db.commit()
+        return (201 if reserved else 400), time.perf_counter() - started
+
+    return _timed(place, orders, concurrency)
+
+
+def _timed(place, orders: int, concurrency: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(place, range(orders)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for status, latency in results if status == 201)
+    accepted = len(latencies)
+    p50 = statistics.median(latencies) if latencies else 0.0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return accepted, orders - accepted, elapsed, p50, p99
+
+
+def compare(shards: int, set_shards, stock_of, run_mode):
+    print(f"{'mode':<16} {'orders':>7} {'failed':>7} {'seconds':>8} {'orders/s':>9} {'p50 ms':>7} {'p99 ms':>7}")
+    rates = {}
+    for mode, count in (("plain", 0), (f"{shards} shards", shards)):
+        set_shards(count)
+        before = stock_of()
+        accepted, failed, elapsed, p50, p99 = run_mode()
+        after = stock_of()
+        assert before - after == accepted, f"{mode}: stock went down by {before - after}, {accepted} orders accepted"
+        rates[mode] = accepted / elapsed
+        print(f"{mode:<16} {accepted:>7} {failed:>7} {elapsed:>8.2f} {rates[mode]:>9.0f} {p50 * 1000:>7.1f} {p99 * 1000:>7.1f}")
+    plain, sharded = rates.values()
+    print(f"speedup: {sharded / plain:.2f}x")
+
+
+def main_direct(args):
+    from app.crud.stock import set_stock_shards
+    from app.database import SessionLocal
+    from app.models.models import Product
+
+    with SessionLocal() as db:
+        product = Product(description="Hot SKU", price="9.90", barcode=uuid.uuid4().hex[:13], section="bench", stock=args.orders * 2)
+        db.add(product)
+        db.commit()
+        product_id = product.id
+
+    def set_shards(shards):
+        with SessionLocal() as db:
+            set_stock_shards(db, db.get(Product, product_id), shards)
+            db.commit()
+
+    def stock_of():
+        with SessionLocal() as db:
+            return db.get(Product, product_id).available_stock
+
+    try:
+        compare(
+            args.shards,
+            set_shards,
+            stock_of,
+            lambda: run_direct(product_id, args.orders, args.concurrency, args.commit_latency_ms / 1000),
+        )
+    finally:
+        with SessionLocal() as db:
+            db.delete(db.get(Product, product_id))
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--orders", type=int, default=2000, help="Orders placed in each mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--direct", action="store_true", help="Reserve stock on the configured database instead of over HTTP")
+    parser.add_argument("--commit-latency-ms", type=float, default=0.0, help="With --direct, time spent before each commit")
+    args = parser.parse_args()
+
+    if args.direct:
+        main_direct(args)
+        return
+
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        headers = {"Authorization": f"Bearer {admin_token(client)}"}
+        client.headers.update(headers)
+        cpf = str(uuid.uuid4().int)[:11]
+        client_id = client.post(
+            "/clients/", json={"name": "Bench", "email": f"bench-{cpf}@example.com", "cpf": cpf}
+        ).json()["id"]
+        product_id = client.post(
+            "/products/",
+            json={"description": "Hot SKU", "price": "9.90", "barcode": uuid.uuid4().hex[:13], "section": "bench", "stock": args.orders * 2},
+        ).json()["id"]
+
+        compare(
+            args.shards,
+            lambda shards: client.put(f"/products/{product_id}/stock-shards", json={"shards": shards}).raise_for_status(),
+            lambda: client.get(f"/products/{product_id}").json()["stock"],
+            lambda: run(args.base_url, headers, client_id, product_id, args.orders, args.concurrency),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Login throughput next to CRUD latency.
+
+Run against a live deployment (e.g. `docker-compose up` or
+`uvicorn app.main:app --workers N`):
+
+    python benchmarks/bench_login.py --base-url http://localhost:8000 --cores 4
+
+A pool of threads hammers POST /auth/login while a single probe thread keeps
+calling GET /products/ and records its latency, so the report shows how many
+logins per second each hashing core sustains and what that does to the
+latency of ordinary CRUD traffic.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+
+import httpx
+
+
+def register_and_login(client: httpx.Client, role: str = "admin") -> tuple[str, str, str]:
+    email = f"bench-{uuid.uuid4().hex[:10]}@example.com"
+    password = "bench-password"
+    client.post(
+        "/auth/register",
+        json={"name": email, "email": email, "password": password, "role": role},
+    ).raise_for_status()
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return email, password, response.json()["access_token"]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent login threads")
+    parser.add_argument("--cores", type=int, default=int(os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1)),
+                        help="Hashing cores on the server, used for the per-core figure")
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=30) as setup:
+        email, password, token = register_and_login(setup)
+
+    stop = threading.Event()
+    counts = {"ok": 0, "busy": 0, "other": 0}
+    counts_lock = threading.Lock()
+    crud_latencies: list[float] = []
+
+    def login_worker():
+        with httpx.Client(base_url=args.base_url, timeout=30) as client:
+            while not stop.is_set():
+                response = client.post("/auth/login", data={"username": email, "password": password})
+                key = "ok" if response.status_code == 200 else "busy" if response.status_code == 503 else "other"
+                with counts_lock:
+                    counts[key] += 1
+
+    def crud_probe():
+        headers = {"Authorization": f"Bearer {token}"}
+        with httpx.Client(base_url=args.base_url, timeout=30, headers=headers) as client:
+            while not stop.is_set():
+                started = time.perf_counter()
+                client.get("/products/", params={"limit": 10})
+                crud_latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=login_worker) for _ in range(args.concurrency)]
+    threads.append(threading.Thread(target=crud_probe))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    logins_per_sec = counts["ok"] / elapsed
+    print(f"duration            {elapsed:8.1f} s")
+    print(f"logins ok           {counts['ok']:8d}  ({logins_per_sec:.1f}/s, {logins_per_sec / args.cores:.1f}/s per core)")
+    print(f"logins shed (503)   {counts['busy']:8d}")
+    print(f"logins other        {counts['other']:8d}")
+    print(f"GET /products p50   {statistics.median(crud_latencies) if crud_latencies else 0:8.1f} ms")
+    print(f"GET /products p99   {percentile(crud_latencies, 99):8.1f} ms")
+    print(f"GET /products n     {len(crud_latencies):8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Page latency by depth: OFFSET pagination against keyset (cursor) pagination.
+
+    python -m benchmarks.bench_pagination --rows 2000000
+
+Seeds a temporary table shaped like the listing tables (created_at, id with
+an index on both) on the configured database, then times fetching one page
+at increasing depths. OFFSET grows linearly with depth; the keyset query,
+built with the same app.pagination.seek() the routers use, stays flat.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+
+from app.database import engine
+from app.pagination import encode_cursor, seek
+
+metadata = MetaData()
+items = Table(
+    "bench_pagination_items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("name", String(100)),
+    prefixes=["TEMPORARY"],
+)
+SORT_KEY = (items.c.created_at, items.c.id)
+
+
+def median_ms(conn, query, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(query).all()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        print(f"Seeding {args.rows:,} rows...")
+        metadata.create_all(conn)
+        conn.execute(text(
+            "INSERT INTO bench_pagination_items (id, created_at, name) "
+            "SELECT g, now() - make_interval(secs => :rows - g), 'item ' || g "
+            "FROM generate_series(1, :rows) AS g"
+        ), {"rows": args.rows})
+        conn.execute(text("CREATE INDEX ON bench_pagination_items (created_at, id)"))
+        conn.execute(text("ANALYZE bench_pagination_items"))
+
+        depths = [0]
+        depth = 1000
+        while depth < args.rows:
+            depths.append(depth)
+            depth *= 10
+        depths.append(args.rows - args.page_size)
+
+        print(f"{'depth':>12} {'offset ms':>12} {'cursor ms':>12}")
+        for depth in depths:
+            offset_query = seek(select(items), SORT_KEY, args.page_size, skip=depth)
+            # The cursor a client would hold after reading `depth` rows
+            if depth:
+                last = conn.execute(select(*SORT_KEY).order_by(*SORT_KEY).offset(depth - 1).limit(1)).one()
+                cursor = encode_cursor("bench", list(last))
+            else:
+                cursor = None
+            cursor_query = seek(select(items), SORT_KEY, args.page_size, cursor=cursor, scope="bench")
+            print(
+                f"{depth:>12,} {median_ms(conn, offset_query, args.repeat):>12.2f}"
+                f" {median_ms(conn, cursor_query, args.repeat):>12.2f}"
+            )
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Bulk product import throughput and memory.
+
+    python -m benchmarks.bench_product_import --rows 200000
+
+Writes a CSV of generated products to a temporary file, imports it twice
+with app.services.product_import (the first pass inserts, the second updates
+every row) on the configured database, and prints rows per minute and the
+peak Python memory of each pass. The products are deleted afterwards.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import delete
+
+from app.database import SessionLocal
+from app.models.models import Product
+from app.services.product_import import import_products, read_records
+
+
+def write_csv(file, rows: int, prefix: str, price: str) -> None:
+    file.write(b"description,price,barcode,section,stock,expiry_date,images\n")
+    for i in range(rows):
+        file.write(f"Bench product {i},{price},{prefix}{i},bench,{i % 100},2030-01-01,a.png|b.png\n".encode())
+    file.seek(0)
+
+
+def run(rows: int, prefix: str, price: str, chunk_size: int) -> None:
+    with tempfile.TemporaryFile() as file:
+        write_csv(file, rows, prefix, price)
+        tracemalloc.start()
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            report = import_products(db, read_records(file, "csv"), chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    print(
+        f"inserted={report['inserted']:,} updated={report['updated']:,} failed={report['failed']:,} "
+        f"in {elapsed:.1f}s: {rows / elapsed * 60:,.0f} rows/min, peak {peak / 2**20:.1f} MiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-"
+    try:
+        run(args.rows, prefix, "9.90", args.chunk_size)
+        run(args.rows, prefix, "10.90", args.chunk_size)
+    finally:
+        with SessionLocal() as db:
+            db.execute(delete(Product).where(Product.barcode.startswith(prefix)))
+            db.commit()
+
+
+if __name__ == "__main__":
+    main()